@@ -632,6 +632,11 @@ class WorkspaceCommand(SubCommandCommand):
         run_parser.add_argument('op_name', metavar='OP',
                                 help='Operation name or Workflow file path. '
                                      'Type "cate op list" to list available operations.')
+        run_parser.add_argument('-p', '--profile', dest='profile', action='store_true',
+                                help='Profile the workflow steps and the operation and print a summary table.')
+        run_parser.add_argument('--trace', dest='trace_file', metavar='TRACE_FILE',
+                                help='Write a profiling trace in Chrome Trace Event format to TRACE_FILE. '
+                                     'Implies --profile.')
         run_parser.add_argument('op_args', metavar='...', nargs=argparse.REMAINDER,
                                 help=OP_ARGS_RES_HELP)
         run_parser.set_defaults(sub_command_function=cls._execute_run)
@@ -741,6 +746,22 @@ class WorkspaceCommand(SubCommandCommand):
         op_args, op_kwargs = _parse_op_args(command_args.op_args, input_props=op.op_meta_info.inputs)
         if op_args:
             raise CommandError("positional arguments not yet supported, please provide keyword=value pairs only")
+        if command_args.profile or command_args.trace_file:
+            import json
+            from cate.core.profiler import WorkflowProfiler
+
+            profile = workspace_manager.profile_op_in_workspace(_base_dir(command_args.base_dir),
+                                                                command_args.op_name,
+                                                                op_kwargs,
+                                                                monitor=cls.new_monitor())
+            print("Operation '%s' executed." % command_args.op_name)
+            profiler = WorkflowProfiler.from_json_dict(profile)
+            print(profiler.format_summary())
+            if command_args.trace_file:
+                with open(command_args.trace_file, 'w') as fp:
+                    json.dump(profiler.to_chrome_trace(), fp)
+                print('Trace written to %s' % command_args.trace_file)
+            return
         workspace_manager.run_op_in_workspace(_base_dir(command_args.base_dir),
                                               command_args.op_name,
                                               op_kwargs,
@@ -28,7 +28,7 @@ from typing import Any, Dict, Optional, Sequence, Union
 
 from .defaults import GLOBAL_CONF_FILE, LOCAL_CONF_FILE, LOCATION_FILE, VERSION_CONF_FILE, \
     VARIABLE_DISPLAY_SETTINGS, DEFAULT_DATA_PATH, DEFAULT_VERSION_DATA_PATH, DEFAULT_COLOR_MAP, DEFAULT_RES_PATTERN, \
-    WEBAPI_USE_WORKSPACE_IMAGERY_CACHE, DEFAULT_VARIABLES, DATASET_PERSISTENCE_FORMAT
+    WEBAPI_USE_WORKSPACE_IMAGERY_CACHE, DEFAULT_VARIABLES, DATASET_PERSISTENCE_FORMAT, LAZY_WORKSPACE_OPEN
 
 _CONFIG = None
 
@@ -72,10 +72,24 @@ def get_data_stores_path() -> str:
     return get_config_path('data_stores_path', os.path.join(DEFAULT_DATA_PATH, 'data_stores'))
 
 
+def get_regrid_weights_path() -> str:
+    """
+    Get the path to the directory where Cate caches the weights used for conservative regridding.
+
+    :return: Effectively reads the value of the configuration parameter ``regrid_weights_path``, if any.
+             Otherwise return the default value ``~/.cate/regrid_weights``.
+    """
+    return get_config_path('regrid_weights_path', os.path.join(DEFAULT_DATA_PATH, 'regrid_weights'))
+
+
 def get_dataset_persistence_format() -> str:
     return get_config_value('dataset_persistence_format', DATASET_PERSISTENCE_FORMAT)
 
 
+def get_lazy_workspace_open() -> bool:
+    return get_config_value('lazy_workspace_open', LAZY_WORKSPACE_OPEN)
+
+
 def get_use_workspace_imagery_cache() -> bool:
     return get_config_value('use_workspace_imagery_cache', WEBAPI_USE_WORKSPACE_IMAGERY_CACHE)
 
@@ -40,6 +40,7 @@ SCRATCH_WORKSPACES_PATH = os.path.join(DEFAULT_DATA_PATH, SCRATCH_WORKSPACES_DIR
 WORKSPACE_CACHE_DIR_NAME = '.cate-cache'
 WORKSPACE_DATA_DIR_NAME = '.cate-workspace'
 WORKSPACE_WORKFLOW_FILE_NAME = 'workflow.json'
+WORKSPACE_RESOURCES_FILE_NAME = 'resources.json'
 
 DEFAULT_RES_PATTERN = 'res_{index}'
 
@@ -51,6 +52,9 @@ _ONE_GIB = 1024 * _ONE_MIB
 #: The data format to be used when persisting datasets in the workspace.
 DATASET_PERSISTENCE_FORMAT = 'netcdf4'
 
+#: Whether workspace resources are loaded or computed only when first accessed.
+LAZY_WORKSPACE_OPEN = False
+
 #: Use a per-workspace file imagery cache, see REST "/res/tile/" API
 WEBAPI_USE_WORKSPACE_IMAGERY_CACHE = False
 
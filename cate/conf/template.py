@@ -22,10 +22,23 @@
 #
 # data_stores_path = '~/.cate/data_stores'
 
+# 'regrid_weights_path' denotes a directory where Cate caches the weights computed for conservative
+# regridding by the 'coregister' operation. The directory can be deleted at any time.
+# Use the tilde '~' (also on Windows) within the path to point to your home directory.
+#
+# regrid_weights_path = '~/.cate/regrid_weights'
+
 # 'dataset_persistence_format' names the data format to be used when persisting datasets in the workspace.
-# Possible values are 'netcdf4' or 'zarr'.
+# Possible values are 'netcdf4' or 'zarr'. Zarr datasets are written in parallel using their dask chunks
+# and are opened lazily when a workspace is reopened.
+# Data frames are always persisted as (Geo)Parquet.
 # dataset_persistence_format = 'netcdf4'
 
+# If 'lazy_workspace_open' is True, opening a workspace will neither read persisted resources nor
+# compute the workflow. Resources are described by metadata cached when the workspace was saved and
+# are read or computed only when they are first accessed.
+# lazy_workspace_open = False
+
 # If 'use_workspace_imagery_cache' is True, Cate will maintain a per-workspace
 # cache for imagery generated from dataset variables. Such cache can accelerate
 # image display, however at the cost of disk space.
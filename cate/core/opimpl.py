@@ -19,18 +19,21 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
 import warnings
 from datetime import datetime
 from typing import Optional, Sequence, Union, Tuple
 
+import dask.array as da
+import numba
 import numpy as np
 import pandas as pd
+import shapely.wkb
 import xarray as xr
 from jdcal import jd2gcal
-from matplotlib import path
-from shapely.geometry import box, LineString, Polygon
+from shapely.geometry import box, LineString, Polygon, MultiPolygon
 
-from .types import PolygonLike, ValidationError
+from .types import GeometryLike, PolygonLike, ValidationError
 from ..util.misc import to_list
 from ..util.monitor import Monitor
 
@@ -206,15 +209,17 @@ def _normalize_lon_360(ds: xr.Dataset) -> xr.Dataset:
     new_vars = dict()
     for var_name in var_names:
         var = ds[var_name]
-        if len(var.dims) >= 1 and var.dims[-1] == 'lon':
-            values = np.copy(var.values)
-            temp = np.copy(values[..., : lon_size_05])
-            values[..., : lon_size_05] = values[..., lon_size_05:]
-            values[..., lon_size_05:] = temp
-            # import matplotlib.pyplot as plt
-            # im = values[(len(values.shape) - 2) * [0] + [slice(None), slice(None)]]
-            # plt.imshow(im)
-            new_vars[var_name] = xr.DataArray(values, dims=var.dims, attrs=var.attrs, encoding=var.encoding)
+        if 'lon' in var.dims:
+            # Swap the halves without loading the data, so that dask arrays stay lazy
+            axis = var.get_axis_num('lon')
+            data = var.data
+            halves = (data[(slice(None),) * axis + (slice(lon_size_05, None),)],
+                      data[(slice(None),) * axis + (slice(None, lon_size_05),)])
+            if isinstance(data, da.Array):
+                data = da.concatenate(halves, axis=axis)
+            else:
+                data = np.concatenate(halves, axis=axis)
+            new_vars[var_name] = var.copy(data=data)
 
     return ds.assign(**new_vars)
 
@@ -728,12 +733,7 @@ def get_extents(region: PolygonLike.TYPE) -> Tuple[Tuple[float, float, float, fl
                 explicit_coords = True
     except BaseException:
         # The polygon must be convertible, but it's complex
-        polygon = PolygonLike.convert(region)
-        if not polygon.is_valid:
-            # Heal polygon, see #506 and Shapely User Manual
-            region = polygon.buffer(0)
-        else:
-            region = polygon
+        region = _to_polygonal(region)
         # Get the bounding box
         extents = region.bounds
 
@@ -803,7 +803,7 @@ def subset_spatial_impl(ds: xr.Dataset,
     Do a spatial subset of the dataset
 
     :param ds: Dataset to subset
-    :param region: Spatial region to subset
+    :param region: Spatial region to subset, a polygon or multi-polygon, which may have holes
     :param mask: Should values falling in the bounding box of the polygon but
     not the polygon itself be masked with NaN.
     :param monitor: optional progress monitor
@@ -821,10 +821,7 @@ def subset_spatial_impl(ds: xr.Dataset,
 
     monitor.start('Subset', 10)
     # Validate input
-    try:
-        polygon = PolygonLike.convert(region)
-    except BaseException as e:
-        raise e
+    polygon = _to_polygonal(region)
 
     extents, explicit_coords = get_extents(region)
 
@@ -846,19 +843,17 @@ def subset_spatial_impl(ds: xr.Dataset,
     # Pad extents to include crossed pixels
     lon_min, lat_min, lon_max, lat_max = _pad_extents(ds, extents)
 
-    crosses_antimeridian = (lon_min > lon_max) if explicit_coords else _crosses_antimeridian(polygon)
+    if explicit_coords:
+        crosses_antimeridian = lon_min > lon_max
+    else:
+        # Multi-polygons are expected to be split at the anti-meridian
+        crosses_antimeridian = isinstance(polygon, Polygon) and _crosses_antimeridian(polygon)
     lat_inverted = _lat_inverted(ds.lat)
     if lat_inverted:
         lat_index = slice(lat_max, lat_min)
     else:
         lat_index = slice(lat_min, lat_max)
 
-    if crosses_antimeridian and not simple_polygon and mask:
-        # Unlikely but plausible
-        raise NotImplementedError('Spatial subsets crossing the anti-meridian'
-                                  ' are currently implemented for simple,'
-                                  ' rectangular polygons only, or complex polygons'
-                                  ' without masking.')
     monitor.progress(1)
     if crosses_antimeridian:
         # Shapely messes up longitudes if the polygon crosses the antimeridian
@@ -878,7 +873,10 @@ def subset_spatial_impl(ds: xr.Dataset,
         # Preserve the original longitude dimension, masking elements that
         # do not belong to the polygon with NaN.
         with monitor.observing('subset'):
-            return reset_non_spatial(ds, retset.reindex_like(ds.lon))
+            retset = retset.reindex_like(ds.lon)
+            if mask and not simple_polygon and not explicit_coords:
+                retset = retset.where(_get_pixel_mask(polygon, retset, wrap_lon=True))
+            return reset_non_spatial(ds, retset)
 
     lon_slice = slice(lon_min, lon_max)
     indexers = {'lat': lat_index, 'lon': lon_slice}
@@ -893,82 +891,178 @@ def subset_spatial_impl(ds: xr.Dataset,
         with monitor.observing('subset'):
             return reset_non_spatial(ds, retset)
 
-    # Create the mask array. The result of this is a lon/lat DataArray where
+    # Create the mask array. The result of this is a lat/lon DataArray where
     # all pixels falling in the region or on its boundary are denoted with True
-    # and all the rest with False. Works on polygon exterior
-
-    polypath = path.Path(np.column_stack([polygon.exterior.coords.xy[0],
-                                          polygon.exterior.coords.xy[1]]))
-
-    # Handle also a single pixel and 1D edge cases
-    if len(retset.lat) == 1 or len(retset.lon) == 1:
-        # Create a mask directly on pixel centers
-        lonm, latm = np.meshgrid(retset.lon.values, retset.lat.values)
-        grid_points = [(lon, lat) for lon, lat in zip(lonm.ravel(), latm.ravel())]
-        mask_arr = polypath.contains_points(grid_points)
-        mask_arr = mask_arr.reshape(lonm.shape)
-        mask_arr = xr.DataArray(mask_arr,
-                                coords={'lon': retset.lon.values, 'lat': retset.lat.values},
-                                dims=['lat', 'lon'])
+    # and all the rest with False.
+    monitor.progress(1)
+    mask_arr = _get_pixel_mask(polygon, retset)
+    monitor.progress(1)
 
-        with monitor.observing('subset'):
-            # Apply the mask to data
+    with monitor.observing('subset'):
+        # Apply the mask to data
+        if len(retset.lat) == 1 or len(retset.lon) == 1:
             retset = retset.where(mask_arr, drop=True)
+        else:
+            retset = retset.where(mask_arr, drop=False)
 
-        return reset_non_spatial(ds, retset)
-
-    # The normal case
-    # Create a grid of pixel vertices
-    lon_pixel = abs(ds.lon.values[1] - ds.lon.values[0])
-    lat_pixel = abs(ds.lat.values[1] - ds.lat.values[0])
-    lon_min = retset.lon.values[0] - lon_pixel / 2
-    lon_max = retset.lon.values[-1] + lon_pixel / 2
-    lat_min = retset.lat.values[0] - lat_pixel / 2
-    lat_max = retset.lat.values[-1] + lat_pixel / 2
-
-    lat_grid = np.linspace(lat_min, lat_max, len(retset.lat.values) + 1, dtype='float32')
-    lon_grid = np.linspace(lon_min, lon_max, len(retset.lon.values) + 1, dtype='float32')
-
-    try:
-        lonm, latm = np.meshgrid(lon_grid, lat_grid)
-    except MemoryError:
-        raise ValidationError('Not enough memory to mask the dataset with the given'
-                              ' polygon. Try subsetting with masking disabled')
+    monitor.done()
+    return reset_non_spatial(ds, retset)
 
-    # Mark all grid points falling within the polygon as True
 
-    monitor.progress(1)
-    try:
-        grid_points = np.empty((len(lat_grid) * len(lon_grid), 2), dtype='float32')
-    except MemoryError:
-        raise ValidationError('Not enough memory to mask the dataset with the given'
-                              ' polygon. Try subsetting with masking disabled')
-    for i, el in enumerate(((lon, lat) for lon, lat in zip(lonm.ravel(), latm.ravel()))):
-        grid_points[i] = el
+def _to_polygonal(region) -> Union[Polygon, MultiPolygon]:
+    """
+    Convert the given region into a valid polygon or multi-polygon.
+    """
+    if isinstance(region, MultiPolygon) \
+            or isinstance(region, str) and region.lstrip().upper().startswith('MULTIPOLYGON'):
+        geometry = GeometryLike.convert(region)
+        if not geometry.is_valid:
+            # Heal polygon, see #506 and Shapely User Manual
+            geometry = geometry.buffer(0)
+        if not isinstance(geometry, (Polygon, MultiPolygon)) or geometry.is_empty:
+            raise ValidationError('Polygon expected.')
+        return geometry
+    return PolygonLike.convert(region)
 
-    monitor.progress(1)
-    try:
-        mask_arr = polypath.contains_points(grid_points)
-    except MemoryError:
-        raise ValidationError('Not enough memory to mask the dataset with the given'
-                              ' polygon. Try subsetting with masking disabled')
 
-    monitor.progress(1)
+def _get_pixel_mask(polygon: Union[Polygon, MultiPolygon],
+                    ds: Union[xr.Dataset, xr.DataArray],
+                    wrap_lon: bool = False) -> xr.DataArray:
+    """
+    Get a lat/lon mask of the pixels of the given dataset that fall into the given polygon
+    or on its boundary.
 
-    mask_arr = mask_arr.reshape(lonm.shape)
-    # Vectorized 'rolling window' numpy magic to go from pixel vertices to pixel centers
-    mask_arr = mask_arr[1:, 1:] + mask_arr[1:, :-1] + mask_arr[:-1, 1:] + mask_arr[:-1, :-1]
+    Pixels are selected if any of their vertices fall into the polygon. If the dataset has
+    a single row or column of pixels, pixels are selected if their center falls into the polygon.
 
-    mask_arr = xr.DataArray(mask_arr,
-                            coords={'lon': retset.lon.values, 'lat': retset.lat.values},
-                            dims=['lat', 'lon'])
+    :param polygon: Polygon or multi-polygon, may have holes
+    :param ds: Dataset with equidistant 1D lat and lon coordinates
+    :param wrap_lon: Whether longitudes of the polygon are to be unwrapped, because it crosses the anti-meridian
+    :return: Boolean DataArray with dimensions lat and lon
+    """
+    lon = ds.lon.values
+    lat = ds.lat.values
+    lon_step = float(lon[1] - lon[0]) if lon.size > 1 else 1.
+    lat_step = float(lat[1] - lat[0]) if lat.size > 1 else 1.
+    if lat.size == 1 or lon.size == 1:
+        # Create a mask directly on pixel centers
+        mask_arr = get_polygon_mask_impl(polygon,
+                                         (float(lon[0]), lon_step, lon.size),
+                                         (float(lat[0]), lat_step, lat.size),
+                                         wrap_lon=wrap_lon)
+    else:
+        # Create a mask on pixel vertices, then go from pixel vertices to pixel centers
+        vertex_mask = get_polygon_mask_impl(polygon,
+                                            (float(lon[0]) - lon_step / 2, lon_step, lon.size + 1),
+                                            (float(lat[0]) - lat_step / 2, lat_step, lat.size + 1),
+                                            wrap_lon=wrap_lon)
+        mask_arr = vertex_mask[1:, 1:] | vertex_mask[1:, :-1] | vertex_mask[:-1, 1:] | vertex_mask[:-1, :-1]
+    return xr.DataArray(mask_arr, coords={'lat': lat, 'lon': lon}, dims=['lat', 'lon'])
+
+
+def get_polygon_mask_impl(polygon: Union[Polygon, MultiPolygon],
+                          lon_grid: Tuple[float, float, int],
+                          lat_grid: Tuple[float, float, int],
+                          wrap_lon: bool = False) -> np.ndarray:
+    """
+    Get a mask of the points of a regular lon/lat grid that fall into the given polygon
+    or on its boundary. Holes and multiple polygons are handled using the even-odd rule.
 
-    with monitor.observing('subset'):
-        # Apply the mask to data
-        retset = retset.where(mask_arr, drop=False)
+    The mask is computed by a scanline rasteriser in time proportional to the number of grid points
+    plus the number of polygon edges. Masks are cached, so the returned array must not be modified.
 
-    monitor.done()
-    return reset_non_spatial(ds, retset)
+    :param polygon: Polygon or multi-polygon, may have holes
+    :param lon_grid: tuple (first longitude, longitude step, number of longitudes)
+    :param lat_grid: tuple (first latitude, latitude step, number of latitudes)
+    :param wrap_lon: Whether longitudes of the polygon are to be unwrapped, because it crosses the anti-meridian
+    :return: Boolean array of shape (number of latitudes, number of longitudes)
+    """
+    return _get_polygon_mask(polygon.wkb, tuple(lon_grid), tuple(lat_grid), wrap_lon)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_polygon_mask(polygon_wkb: bytes,
+                      lon_grid: Tuple[float, float, int],
+                      lat_grid: Tuple[float, float, int],
+                      wrap_lon: bool) -> np.ndarray:
+    geometry = shapely.wkb.loads(polygon_wkb)
+    polygons = geometry.geoms if isinstance(geometry, MultiPolygon) else [geometry]
+    lon_0, lon_step, lon_size = lon_grid
+    lat_0, lat_step, lat_size = lat_grid
+
+    edges = []
+    for poly in polygons:
+        for ring in [poly.exterior] + list(poly.interiors):
+            coords = np.array(ring.coords, dtype=np.float64)[:, :2]
+            x = coords[:, 0]
+            if wrap_lon:
+                x = np.unwrap(x, period=360.)
+            # Transform into grid index space
+            x = (x - lon_0) / lon_step
+            y = (coords[:, 1] - lat_0) / lat_step
+            edges.append(np.stack([x[:-1], y[:-1], x[1:], y[1:]]))
+    edges = np.concatenate(edges, axis=1) if edges else np.zeros((4, 0))
+    if wrap_lon:
+        # Rasterise copies of the polygon shifted by a full turn to either side as well
+        shift = 360. / lon_step
+        edges = np.concatenate([edges + np.array([[offset], [0.], [offset], [0.]])
+                                for offset in (-shift, 0., shift)], axis=1)
+
+    mask_arr = _rasterize_edges(edges[0], edges[1], edges[2], edges[3], int(lon_size), int(lat_size))
+    mask_arr.setflags(write=False)
+    return mask_arr
+
+
+@numba.jit(nopython=True, nogil=True)
+def _rasterize_edges(x0, y0, x1, y1, width, height):
+    # Count the crossings of polygon edges with each grid row. A row i is crossed
+    # by an edge if min(y0, y1) <= i < max(y0, y1).
+    offsets = np.zeros(height + 1, dtype=np.int64)
+    for e in range(x0.size):
+        i0 = max(int(np.ceil(min(y0[e], y1[e]))), 0)
+        i1 = min(int(np.ceil(max(y0[e], y1[e]))), height)
+        for i in range(i0, i1):
+            offsets[i + 1] += 1
+    for i in range(height):
+        offsets[i + 1] += offsets[i]
+
+    # Compute the crossings' x-coordinates row by row
+    crossings = np.empty(offsets[height], dtype=np.float64)
+    counts = np.zeros(height, dtype=np.int64)
+    for e in range(x0.size):
+        i0 = max(int(np.ceil(min(y0[e], y1[e]))), 0)
+        i1 = min(int(np.ceil(max(y0[e], y1[e]))), height)
+        for i in range(i0, i1):
+            crossings[offsets[i] + counts[i]] = x0[e] + (i - y0[e]) * (x1[e] - x0[e]) / (y1[e] - y0[e])
+            counts[i] += 1
+
+    # Fill the grid points between pairs of crossings, x0 <= j < x1
+    mask = np.zeros((height, width), dtype=np.bool_)
+    for i in range(height):
+        row = np.sort(crossings[offsets[i]:offsets[i + 1]])
+        for k in range(0, row.size - 1, 2):
+            j0 = max(int(np.ceil(row[k])), 0)
+            j1 = min(int(np.ceil(row[k + 1])), width)
+            for j in range(j0, j1):
+                mask[i, j] = True
+
+    # Add the grid points on the polygon edges, which the half-open scanline fill
+    # misses on the upper and right edges and on vertices
+    eps = 1e-9
+    for e in range(x0.size):
+        i0 = max(int(np.ceil(min(y0[e], y1[e]) - eps)), 0)
+        i1 = min(int(np.floor(max(y0[e], y1[e]) + eps)), height - 1)
+        for i in range(i0, i1 + 1):
+            if abs(y1[e] - y0[e]) <= eps:
+                # Horizontal edge
+                xa, xb = min(x0[e], x1[e]), max(x0[e], x1[e])
+            else:
+                xa = xb = x0[e] + (i - y0[e]) * (x1[e] - x0[e]) / (y1[e] - y0[e])
+            j0 = max(int(np.ceil(xa - eps)), 0)
+            j1 = min(int(np.floor(xb + eps)), width - 1)
+            for j in range(j0, j1 + 1):
+                mask[i, j] = True
+    return mask
 
 
 def _crosses_antimeridian(region: Polygon) -> bool:
@@ -0,0 +1,296 @@
+# The MIT License (MIT)
+# Copyright (c) 2016, 2017 by the ESA CCI Toolbox development team and contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Description
+===========
+
+Provides the :py:class:`WorkflowProfiler` which records execution statistics of workflow nodes.
+
+A profiler is activated by passing it as ``profiler`` entry of the execution context of
+:py:meth:`cate.core.workflow.Node.invoke`. For every invoked node, a :py:class:`StepProfile` is recorded
+that comprises the wall time, CPU time, peak RSS delta, output size, value cache hit or miss,
+and the number and duration of dask tasks computed.
+
+Recorded profiles can be exported as Chrome trace JSON (see ``chrome://tracing``) or as a plain-text summary table.
+
+Components
+==========
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
+
+from .types import GeoDataFrame
+
+_ONE_MIB = 1024 * 1024
+
+
+class StepProfile:
+    """
+    Execution statistics of a single node invocation.
+
+    Times are given in seconds, sizes in bytes. Values that could not be determined are ``None``.
+    """
+
+    def __init__(self,
+                 step_id: str,
+                 op_name: str = None,
+                 depth: int = 0,
+                 thread_id: int = 0,
+                 start_time: float = 0.0,
+                 wall_time: float = None,
+                 cpu_time: float = None,
+                 dask_time: float = None,
+                 dask_task_count: int = None,
+                 peak_rss_delta: int = None,
+                 output_size: int = None,
+                 cache_hit: bool = None):
+        self.step_id = step_id
+        self.op_name = op_name
+        self.depth = depth
+        self.thread_id = thread_id
+        self.start_time = start_time
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.dask_time = dask_time
+        self.dask_task_count = dask_task_count
+        self.peak_rss_delta = peak_rss_delta
+        self.output_size = output_size
+        self.cache_hit = cache_hit
+
+    @classmethod
+    def from_json_dict(cls, json_dict: Dict[str, Any]) -> 'StepProfile':
+        return StepProfile(**json_dict)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return dict(step_id=self.step_id,
+                    op_name=self.op_name,
+                    depth=self.depth,
+                    thread_id=self.thread_id,
+                    start_time=self.start_time,
+                    wall_time=self.wall_time,
+                    cpu_time=self.cpu_time,
+                    dask_time=self.dask_time,
+                    dask_task_count=self.dask_task_count,
+                    peak_rss_delta=self.peak_rss_delta,
+                    output_size=self.output_size,
+                    cache_hit=self.cache_hit)
+
+
+class WorkflowProfiler:
+    """
+    Records a :py:class:`StepProfile` for every node invoked within :py:meth:`profiling`.
+
+    Note that dask tasks are counted using a global dask callback. If multiple threads compute
+    dask graphs at the same time, tasks of other threads are counted too.
+
+    :param step_profiles: Optional step profiles recorded so far, e.g. restored from JSON.
+    """
+
+    def __init__(self, step_profiles: List[StepProfile] = None):
+        self._step_profiles = list(step_profiles) if step_profiles else []
+        self._t0 = time.perf_counter()
+        self._thread_local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def step_profiles(self) -> List[StepProfile]:
+        """The recorded step profiles in order of invocation."""
+        with self._lock:
+            return list(self._step_profiles)
+
+    @contextmanager
+    def profiling(self, node):
+        """
+        Return a context manager that records a :py:class:`StepProfile` for the invocation of *node*.
+        The step profile is returned by the context manager's ``__enter__`` method so that the node can
+        set its ``cache_hit`` attribute.
+
+        :param node: A workflow node, usually a :py:class:`cate.core.workflow.Step`.
+        """
+        depth = getattr(self._thread_local, 'depth', 0)
+        step_profile = StepProfile(node.id,
+                                   op_name=node.op_meta_info.qualified_name,
+                                   depth=depth,
+                                   thread_id=threading.get_ident(),
+                                   start_time=time.perf_counter() - self._t0)
+        with self._lock:
+            self._step_profiles.append(step_profile)
+
+        self._thread_local.depth = depth + 1
+        dask_callback = _new_dask_callback()
+        peak_rss_0 = _get_peak_rss()
+        cpu_time_0 = time.process_time()
+        wall_time_0 = time.perf_counter()
+        try:
+            if dask_callback is not None:
+                with dask_callback:
+                    yield step_profile
+            else:
+                yield step_profile
+        finally:
+            step_profile.wall_time = time.perf_counter() - wall_time_0
+            step_profile.cpu_time = time.process_time() - cpu_time_0
+            peak_rss = _get_peak_rss()
+            if peak_rss is not None and peak_rss_0 is not None:
+                step_profile.peak_rss_delta = peak_rss - peak_rss_0
+            if dask_callback is not None:
+                step_profile.dask_time = dask_callback.dask_time
+                step_profile.dask_task_count = dask_callback.dask_task_count
+            step_profile.output_size = _get_outputs_size(node)
+            self._thread_local.depth = depth
+
+    @classmethod
+    def from_json_dict(cls, json_dict: Dict[str, Any]) -> 'WorkflowProfiler':
+        step_profiles = json_dict.get('step_profiles') or []
+        return WorkflowProfiler([StepProfile.from_json_dict(step_profile) for step_profile in step_profiles])
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return dict(step_profiles=[step_profile.to_json_dict() for step_profile in self.step_profiles])
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Convert the recorded step profiles into the Chrome Trace Event Format.
+        The JSON-serialized result can be loaded into ``chrome://tracing``.
+
+        :return: A JSON-serializable dictionary.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for step_profile in self.step_profiles:
+            args = step_profile.to_json_dict()
+            del args['step_id'], args['depth'], args['thread_id'], args['start_time']
+            trace_events.append(dict(name=step_profile.step_id,
+                                     cat=step_profile.op_name or 'step',
+                                     ph='X',
+                                     ts=round(step_profile.start_time * 1e6),
+                                     dur=round((step_profile.wall_time or 0.0) * 1e6),
+                                     pid=pid,
+                                     tid=step_profile.thread_id,
+                                     args=args))
+        return dict(traceEvents=trace_events, displayTimeUnit='ms')
+
+    def format_summary(self) -> str:
+        """
+        Format the recorded step profiles as a plain-text table.
+        Nested invocations are indented by their depth.
+
+        :return: The summary table.
+        """
+        header = ('Step', 'Wall [s]', 'CPU [s]', 'Dask [s]', 'Tasks', 'RSS+ [MiB]', 'Output [MiB]', 'Cache')
+        rows = []
+        for step_profile in self.step_profiles:
+            rows.append(('  ' * step_profile.depth + step_profile.step_id,
+                         _format_number(step_profile.wall_time, 3),
+                         _format_number(step_profile.cpu_time, 3),
+                         _format_number(step_profile.dask_time, 3),
+                         _format_number(step_profile.dask_task_count, 0),
+                         _format_number(step_profile.peak_rss_delta, 1, _ONE_MIB),
+                         _format_number(step_profile.output_size, 1, _ONE_MIB),
+                         '' if step_profile.cache_hit is None else 'hit' if step_profile.cache_hit else 'miss'))
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+        lines = []
+        for row in [header] + rows:
+            cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append('  '.join(cells).rstrip())
+        lines.insert(1, '-' * len(lines[0]))
+        return '\n'.join(lines)
+
+
+def _format_number(value, ndigits: int, unit: float = 1) -> str:
+    if value is None:
+        return '-'
+    return '%.*f' % (ndigits, value / unit)
+
+
+def _get_peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS, in kilobytes otherwise
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def _get_outputs_size(node) -> Optional[int]:
+    total_size = 0
+    for output in node.outputs[:]:
+        size = _get_object_size(output.value)
+        if size is None:
+            return None
+        total_size += size
+    return total_size
+
+
+def _get_object_size(obj) -> Optional[int]:
+    if obj is None:
+        return 0
+    if isinstance(obj, GeoDataFrame):
+        # Avoid instantiating the proxy's data frame
+        return None
+    if hasattr(obj, 'memory_usage'):
+        # A pandas DataFrame or Series
+        memory_usage = obj.memory_usage()
+        return int(memory_usage.sum() if hasattr(memory_usage, 'sum') else memory_usage)
+    if hasattr(obj, 'nbytes'):
+        # A numpy ndarray, dask array or xarray Dataset/DataArray
+        return int(obj.nbytes)
+    return sys.getsizeof(obj)
+
+
+def _new_dask_callback():
+    try:
+        # noinspection PyUnresolvedReferences,PyPackageRequirements
+        from dask.callbacks import Callback
+    except ImportError:
+        return None
+
+    class _DaskProfiler(Callback):
+        """Counts the tasks and measures the time of dask computations."""
+
+        def __init__(self):
+            super().__init__()
+            self.dask_time = 0.0
+            self.dask_task_count = 0
+            self._start_time = None
+
+        # noinspection PyUnusedLocal
+        def _start(self, dsk):
+            self._start_time = time.perf_counter()
+
+        # noinspection PyUnusedLocal
+        def _posttask(self, key, result, dsk, state, worker_id):
+            self.dask_task_count += 1
+
+        # noinspection PyUnusedLocal
+        def _finish(self, dsk, state, errored):
+            if self._start_time is not None:
+                self.dask_time += time.perf_counter() - self._start_time
+                self._start_time = None
+
+    return _DaskProfiler()
@@ -312,10 +312,19 @@ class Node(metaclass=ABCMeta):
         :py:attr:`input`. Output values in :py:attr:`output` will
         be set from the underlying operation's return value(s).
 
+        If the *context* contains a ``profiler`` entry, e.g. a :py:class:`cate.core.profiler.WorkflowProfiler`,
+        the invocation is profiled and the current step profile is passed as ``step_profile`` context entry.
+
         :param context: An optional execution context.
         :param monitor: An optional progress monitor.
         """
-        self._invoke_impl(_new_context(context, step=self), monitor=monitor)
+        context = _new_context(context, step=self)
+        profiler = context.get('profiler')
+        if profiler is not None:
+            with profiler.profiling(self) as step_profile:
+                self._invoke_impl(_new_context(context, step_profile=step_profile), monitor=monitor)
+        else:
+            self._invoke_impl(context, monitor=monitor)
 
     @abstractmethod
     def _invoke_impl(self, context: Dict, monitor: Monitor = Monitor.NONE) -> None:
@@ -974,13 +983,18 @@ class OpStepBase(Step, metaclass=ABCMeta):
         self._set_context_values(context, input_values)
 
         value_cache = self._get_value_cache(context)
-        if value_cache is not None and self.id in value_cache and value_cache[self.id] is not UNDEFINED:
+        cache_hit = value_cache is not None and self.id in value_cache and value_cache[self.id] is not UNDEFINED
+        if cache_hit:
             return_value = value_cache[self.id]
         else:
             return_value = self._op(monitor=monitor, **input_values)
             if value_cache is not None:
                 value_cache[self.id] = return_value
 
+        step_profile = context.get('step_profile')
+        if step_profile is not None and value_cache is not None:
+            step_profile.cache_hit = cache_hit
+
         if self.op_meta_info.has_named_outputs:
             for output_name, output_value in return_value.items():
                 self.outputs[output_name].value = output_value
@@ -1527,11 +1541,19 @@ class ValueCache(dict):
     ``ValueCache`` is a closable dictionary that maintains unique IDs for it's keys.
     If a ``ValueCache`` is closed, all closable values are also closed.
     A value is closeable if it has a ``close`` attribute whose value is a callable.
+
+    Child caches created by :py:meth:`child` are kept in a separate registry and are
+    therefore not part of the dictionary's items.
     """
 
     def __init__(self):
         super(ValueCache, self).__init__()
+        # key --> (id, update_count)
         self._id_infos = dict()
+        # id --> key, reverse index of self._id_infos
+        self._id_keys = dict()
+        # key --> child ValueCache
+        self._child_caches = dict()
         self._last_id = 0
 
     def __del__(self):
@@ -1552,7 +1574,9 @@ class ValueCache(dict):
         if id_info:
             self._id_infos[key] = id_info[0], id_info[1] + 1
         else:
-            self._id_infos[key] = self._gen_id(), 0
+            new_id = self._gen_id()
+            self._id_infos[key] = new_id, 0
+            self._id_keys[new_id] = key
         if old_value is not value:
             self._close_value(old_value)
 
@@ -1563,9 +1587,10 @@ class ValueCache(dict):
         """Override the ``dict`` method to close the value and remove its ID."""
         old_value = self.get(key)
         self._del(key)
-        del self._id_infos[key]
+        self._remove_id(key)
         if old_value is not None:
             self._close_value(old_value)
+        self._close_child(key)
 
     def get_value_by_id(self, id: int, default=UNDEFINED):
         """Return the value for the given integer *id* or return *default*."""
@@ -1584,17 +1609,19 @@ class ValueCache(dict):
 
     def get_key(self, id: int):
         """Return the key for given integer *id* or ``None``."""
-        for key, id_info in self._id_infos.items():
-            if id_info[0] == id:
-                return key
-        return None
+        return self._id_keys.get(id)
 
     def child(self, key: str) -> 'ValueCache':
         """Return the child ``ValueCache`` for given *key*."""
-        child_key = key + '._child'
-        if child_key not in self:
-            self._set(child_key, ValueCache())
-        return self[child_key]
+        child_cache = self._child_caches.get(key)
+        if child_cache is None:
+            child_cache = ValueCache()
+            self._child_caches[key] = child_cache
+        return child_cache
+
+    def has_child(self, key: str) -> bool:
+        """Test whether a child ``ValueCache`` exists for given *key*."""
+        return key in self._child_caches
 
     def rename_key(self, key: str, new_key: str) -> None:
         """
@@ -1610,23 +1637,22 @@ class ValueCache(dict):
         self._del(key)
         self._set(new_key, value)
 
-        id_info = self._id_infos[key]
-        del self._id_infos[key]
+        id_info = self._id_infos.pop(key)
         self._id_infos[new_key] = id_info
+        self._id_keys[id_info[0]] = new_key
 
-        child_key = key + '._child'
-        if child_key in self:
-            child_cache = self[child_key]
-            self._del(child_key)
-            self._set(new_key + '._child', child_cache)
+        child_cache = self._child_caches.pop(key, None)
+        if child_cache is not None:
+            self._child_caches[new_key] = child_cache
 
     def pop(self, key, default=None):
         """Override the ``dict`` method to close the value and remove its ID."""
         existed_before = key in self
-        value = super(ValueCache, self).pop(key, default=default)
+        value = super(ValueCache, self).pop(key, default)
         if existed_before:
             self._close_value(value)
-            del self._id_infos[key]
+            self._remove_id(key)
+            self._close_child(key)
         return value
 
     def clear(self) -> None:
@@ -1634,15 +1660,30 @@ class ValueCache(dict):
         self._close_values()
         super(ValueCache, self).clear()
         self._id_infos.clear()
+        self._id_keys.clear()
+        self._child_caches.clear()
 
     def close(self) -> None:
         """Close all values and remove all IDs."""
         self.clear()
 
+    def _remove_id(self, key) -> None:
+        id_info = self._id_infos.pop(key, None)
+        if id_info:
+            self._id_keys.pop(id_info[0], None)
+
+    def _close_child(self, key) -> None:
+        child_cache = self._child_caches.pop(key, None)
+        if child_cache is not None:
+            child_cache.close()
+
     def _close_values(self) -> None:
         values = list(self.values())
         for value in values:
             self._close_value(value)
+        child_caches = list(self._child_caches.values())
+        for child_cache in child_caches:
+            child_cache.close()
 
     @classmethod
     def _close_value(cls, value):
@@ -23,20 +23,24 @@
 This module defines the ``Workspace`` class.
 """
 
+import concurrent.futures
+import json
 import logging
 import os
 import shutil
 from collections import OrderedDict
 from threading import RLock
-from typing import List, Any, Dict, Optional
+from typing import List, Any, Dict, Optional, Tuple
 
 import fiona
+import geopandas as gpd
 import pandas as pd
 import xarray as xr
 
 from .workflow import Workflow, OpStep, NodePort, ValueCache
 from ..conf import conf
-from ..conf.defaults import WORKSPACE_DATA_DIR_NAME, WORKSPACE_WORKFLOW_FILE_NAME, SCRATCH_WORKSPACES_PATH
+from ..conf.defaults import WORKSPACE_DATA_DIR_NAME, WORKSPACE_WORKFLOW_FILE_NAME, WORKSPACE_RESOURCES_FILE_NAME, \
+    SCRATCH_WORKSPACES_PATH
 from ..core.cdm import get_tiling_scheme
 from ..core.op import OP_REGISTRY
 from ..core.types import GeoDataFrame, ValidationError
@@ -52,8 +56,61 @@ __author__ = "Norman Fomferra (Brockmann Consult GmbH)"
 
 _LOG = logging.getLogger('cate')
 
-_RESOURCE_PERSISTENCE_FORMATS = dict(netcdf4=('nc', xr.open_dataset, 'to_netcdf'),
-                                     zarr=('zarr', xr.open_zarr, 'to_zarr'))
+
+def _write_netcdf(dataset: xr.Dataset, path: str):
+    dataset.to_netcdf(path)
+
+
+def _write_zarr(dataset: xr.Dataset, path: str):
+    # Zarr requires regular chunks. We use the first dask chunk of each dimension so that
+    # the Zarr chunks match the dask chunks and dask can write all chunks in parallel.
+    chunks = dict()
+    for variable in dataset.variables.values():
+        chunk_sizes = get_chunk_size(variable) if variable.chunks else None
+        if chunk_sizes:
+            for dim, chunk_size in zip(variable.dims, chunk_sizes):
+                chunks[dim] = max(chunks.get(dim, 0), chunk_size)
+    dataset = dataset.chunk(chunks) if chunks else dataset.copy(deep=False)
+    # Chunk encodings of the source format may not be compatible with the new chunks
+    for variable in dataset.variables.values():
+        variable.encoding = {k: v for k, v in variable.encoding.items() if k not in ('chunks', 'chunksizes')}
+    dataset.to_zarr(path, mode='w')
+
+
+def _read_parquet(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+
+def _write_parquet(data_frame: pd.DataFrame, path: str):
+    data_frame.to_parquet(path)
+
+
+def _read_geo_parquet(path: str) -> gpd.GeoDataFrame:
+    return gpd.read_parquet(path)
+
+
+def _write_geo_parquet(data_frame: gpd.GeoDataFrame, path: str):
+    if isinstance(data_frame, GeoDataFrame):
+        data_frame = data_frame.lazy_data_frame
+    data_frame.to_parquet(path)
+
+
+#: Maps a resource persistence format name to a triple (file extension, read function, write function)
+_RESOURCE_PERSISTENCE_FORMATS = OrderedDict([('netcdf4', ('nc', xr.open_dataset, _write_netcdf)),
+                                             ('zarr', ('zarr', xr.open_zarr, _write_zarr)),
+                                             ('geoparquet', ('geoparquet', _read_geo_parquet, _write_geo_parquet)),
+                                             ('parquet', ('parquet', _read_parquet, _write_parquet))])
+
+
+def _get_resource_persistence_format(res_value) -> Optional[str]:
+    if isinstance(res_value, xr.Dataset):
+        return conf.get_dataset_persistence_format()
+    if isinstance(res_value, (GeoDataFrame, gpd.GeoDataFrame)):
+        return 'geoparquet'
+    if isinstance(res_value, pd.DataFrame):
+        return 'parquet'
+    return None
+
 
 #: An JSON-serializable operation argument is a one-element dictionary taking two possible forms:
 #: 1. dict(value=Any):  a value which may be any constant Python object which must JSON-serializable
@@ -105,6 +162,11 @@ class Workspace:
         self._is_modified = is_modified
         self._is_closed = False
         self._resource_cache = ValueCache()
+        # res_name --> (id, update_count) of the resource value last written to or read from file
+        self._resource_file_stamps = dict()
+        # res_name --> resource descriptor of a resource not yet loaded or computed, see open(lazy=True)
+        self._resource_descriptors = dict()
+        self._save_executor = None
         self._user_data = dict()
         self._lock = RLock()
 
@@ -159,6 +221,10 @@ class Workspace:
     def get_workflow_file(cls, base_dir) -> str:
         return os.path.join(cls.get_workspace_dir(base_dir), WORKSPACE_WORKFLOW_FILE_NAME)
 
+    @classmethod
+    def get_resources_file(cls, base_dir) -> str:
+        return os.path.join(cls.get_workspace_dir(base_dir), WORKSPACE_RESOURCES_FILE_NAME)
+
     @classmethod
     def new_workflow(cls, header: dict = None) -> Workflow:
         return Workflow(OpMetaInfo('workspace_workflow',
@@ -170,13 +236,38 @@ class Workspace:
         return Workspace(base_dir, Workspace.new_workflow(dict(description=description or '')))
 
     @classmethod
-    def open(cls, base_dir: str, monitor: Monitor = Monitor.NONE) -> 'Workspace':
+    def open(cls, base_dir: str, monitor: Monitor = Monitor.NONE, lazy: bool = False) -> 'Workspace':
+        """
+        Open an existing workspace.
+
+        If *lazy* is True, resources are not read from file. Instead, every resource described in the
+        resources file written by :py:meth:`save` is registered without a value, so that it has an ID and
+        can be listed by :py:meth:`to_json_dict`. Such a resource is read from file or computed
+        when it is first requested by :py:meth:`get_resource` or :py:meth:`execute_workflow`.
+
+        :param base_dir: The workspace's base directory.
+        :param monitor: An optional progress monitor.
+        :param lazy: Whether to defer reading resources until first access.
+        :return: The workspace.
+        """
         if not os.path.isdir(cls.get_workspace_dir(base_dir)):
             raise ValidationError('Not a valid workspace: %s' % base_dir)
         workflow_file = cls.get_workflow_file(base_dir)
         workflow = Workflow.load(workflow_file)
         workspace = Workspace(base_dir, workflow)
 
+        if lazy:
+            resource_descriptors = cls._load_resource_descriptors(base_dir)
+            for step in workflow.steps:
+                resource_descriptor = resource_descriptors.get(step.id)
+                if resource_descriptor is not None:
+                    workspace._resource_descriptors[step.id] = resource_descriptor
+                    # Reserve the resource ID without a value
+                    workspace._resource_cache[step.id] = UNDEFINED
+                    if step.persistent:
+                        workspace._resource_file_stamps[step.id] = workspace._get_resource_stamp(step.id)
+            return workspace
+
         # Read resources for persistent steps
         persistent_steps = [step for step in workflow.steps if step.persistent]
         if persistent_steps:
@@ -190,22 +281,31 @@ class Workspace:
     def close(self):
         if self._is_closed:
             return
+        # Let pending resource writes complete before files are cleaned up
+        self._shutdown_save_executor()
         with self._lock:
             self._resource_cache.close()
             # Remove all resource files that are no longer required
             if os.path.isdir(self.workspace_dir):
                 persistent_ids = {step.id for step in self.workflow.steps if step.persistent}
                 for filename in os.listdir(self.workspace_dir):
-                    res_file = os.path.join(self.workspace_dir, filename)
-                    if os.path.isfile(res_file) and filename.endswith('.nc'):
-                        res_name = filename[0: -3]
-                        if res_name not in persistent_ids:
-                            try:
-                                os.remove(res_file)
-                            except OSError:
-                                _LOG.exception('closing workspace failed')
-
-    def save(self, monitor: Monitor = Monitor.NONE):
+                    res_name, ext = _split_resource_file_name(filename)
+                    if res_name is not None and (res_name not in persistent_ids or ext.endswith('.tmp')):
+                        _remove_resource_file(os.path.join(self.workspace_dir, filename))
+
+    def save(self, monitor: Monitor = Monitor.NONE, asynchronous: bool = False) -> Optional[concurrent.futures.Future]:
+        """
+        Save this workspace.
+
+        The workflow is written immediately. Resources of persistent steps are only written, if they have
+        changed since they have last been written or read. Resource files are written into temporary files
+        by a background thread which are then renamed to their final names. The workspace lock is not held
+        while resources are written.
+
+        :param monitor: An optional progress monitor.
+        :param asynchronous: If True, return immediately after the workflow has been written.
+        :return: If *asynchronous* is True, a future that completes when all changed resources are written.
+        """
         self._assert_open()
         with self._lock:
             base_dir = self.base_dir
@@ -215,43 +315,120 @@ class Workspace:
             if not os.path.isdir(workspace_dir):
                 os.mkdir(workspace_dir)
             self.workflow.store(self.workflow_file)
+            self._store_resource_descriptors()
 
-            # Write resources for all persistent steps
-            persistent_steps = [step for step in self.workflow.steps if step.persistent]
-            if persistent_steps:
-                with monitor.starting('Writing resources', len(persistent_steps)):
-                    for step in persistent_steps:
-                        self._write_resource_to_file(step.id)
-                        monitor.progress(1)
+            # Collect resources of all persistent steps that must be written
+            dirty_resources = []
+            for step in self.workflow.steps:
+                if step.persistent and self._is_resource_file_outdated(step.id):
+                    dirty_resources.append((step.id,
+                                            self._resource_cache.get(step.id),
+                                            self._get_resource_stamp(step.id)))
 
             self._is_modified = False
 
-    def _write_resource_to_file(self, res_name):
-        res_value = self._resource_cache.get(res_name)
-        if isinstance(res_value, xr.Dataset):
-            format_props = _RESOURCE_PERSISTENCE_FORMATS.get(conf.get_dataset_persistence_format())
-            if format_props:
-                ext, _, write_attr = format_props
-                if hasattr(res_value, write_attr):
-                    write_method = getattr(res_value, write_attr)
-                    # noinspection PyBroadException
-                    try:
-                        resource_file = os.path.join(self.workspace_dir, res_name + '.' + ext)
-                        write_method(resource_file)
-                    except Exception:
-                        _LOG.exception('writing resource "%s" to file failed' % res_name)
+            if self._save_executor is None:
+                self._save_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                            thread_name_prefix='Workspace')
+            future = self._save_executor.submit(self._write_resources_to_files, dirty_resources, monitor)
+
+        if asynchronous:
+            return future
+        future.result()
+        return None
+
+    def _write_resources_to_files(self, resources: List[Tuple[str, Any, Tuple[int, int]]], monitor: Monitor):
+        if resources:
+            with monitor.starting('Writing resources', len(resources)):
+                for res_name, res_value, res_stamp in resources:
+                    if self._write_resource_to_file(res_name, res_value):
+                        with self._lock:
+                            self._resource_file_stamps[res_name] = res_stamp
+                    monitor.progress(1)
+
+    def _write_resource_to_file(self, res_name, res_value) -> bool:
+        format_name = _get_resource_persistence_format(res_value)
+        format_props = _RESOURCE_PERSISTENCE_FORMATS.get(format_name)
+        if format_props:
+            ext, _, write_resource = format_props
+            # noinspection PyBroadException
+            try:
+                resource_file = os.path.join(self.workspace_dir, res_name + '.' + ext)
+                temp_file = resource_file + '.tmp'
+                _remove_resource_file(temp_file)
+                write_resource(res_value, temp_file)
+                _replace_resource_file(temp_file, resource_file)
+                # Remove files of same resource written in other formats
+                for other_format_name, (other_ext, _, _) in _RESOURCE_PERSISTENCE_FORMATS.items():
+                    if other_format_name != format_name:
+                        _remove_resource_file(os.path.join(self.workspace_dir, res_name + '.' + other_ext))
+                return True
+            except Exception:
+                _LOG.exception('writing resource "%s" to file failed' % res_name)
+        return False
 
     def _read_resource_from_file(self, res_name):
-        for ext, open_dataset, _ in _RESOURCE_PERSISTENCE_FORMATS.values():
+        for ext, read_resource, _ in _RESOURCE_PERSISTENCE_FORMATS.values():
             res_file = os.path.join(self.workspace_dir, res_name + '.' + ext)
             if os.path.exists(res_file):
                 # noinspection PyBroadException
                 try:
-                    res_value = open_dataset(res_file)
+                    res_value = read_resource(res_file)
                     self._resource_cache[res_name] = res_value
+                    self._resource_file_stamps[res_name] = self._get_resource_stamp(res_name)
                 except Exception:
                     _LOG.exception('reading resource "%s" from file failed' % res_name)
 
+    @classmethod
+    def _load_resource_descriptors(cls, base_dir: str) -> Dict[str, Dict[str, Any]]:
+        resources_file = cls.get_resources_file(base_dir)
+        if os.path.isfile(resources_file):
+            # noinspection PyBroadException
+            try:
+                with open(resources_file) as fp:
+                    return json.load(fp)
+            except Exception:
+                _LOG.exception('reading resources file "%s" failed' % resources_file)
+        return dict()
+
+    def _store_resource_descriptors(self):
+        resource_descriptors = OrderedDict()
+        for step in self.workflow.steps:
+            res_name = step.id
+            res_value = self._resource_cache.get(res_name, UNDEFINED)
+            if res_value is UNDEFINED:
+                resource_descriptor = self._resource_descriptors.get(res_name)
+            else:
+                resource_descriptor = self._new_resource_descriptor(None, None, res_name, res_value)
+            if resource_descriptor is not None:
+                resource_descriptor = dict(resource_descriptor)
+                resource_descriptor.pop('id', None)
+                resource_descriptor.pop('updateCount', None)
+                resource_descriptors[res_name] = resource_descriptor
+        # noinspection PyBroadException
+        try:
+            with open(self.get_resources_file(self.base_dir), 'w') as fp:
+                json.dump(resource_descriptors, fp, indent='  ', default=_to_json_default)
+        except Exception:
+            _LOG.exception('writing resources file of workspace "%s" failed' % self.base_dir)
+
+    def _get_resource_stamp(self, res_name: str) -> Tuple[int, int]:
+        return self._resource_cache.get_id(res_name), self._resource_cache.get_update_count(res_name)
+
+    def _is_resource_file_outdated(self, res_name: str) -> bool:
+        if self._resource_file_stamps.get(res_name) != self._get_resource_stamp(res_name):
+            return True
+        for ext, _, _ in _RESOURCE_PERSISTENCE_FORMATS.values():
+            if os.path.exists(os.path.join(self.workspace_dir, res_name + '.' + ext)):
+                return False
+        return True
+
+    def _shutdown_save_executor(self):
+        save_executor = self._save_executor
+        if save_executor is not None:
+            self._save_executor = None
+            save_executor.shutdown(wait=True)
+
     def set_resource_persistence(self, res_name: str, persistent: bool):
         with self._lock:
             self._assert_open()
@@ -301,8 +478,16 @@ class Workspace:
                 resource_descriptors.append(resource_descriptor)
         return resource_descriptors
 
+    def _get_resource_descriptor(self, res_id: int, res_update_count: int, res_name: str, resource):
+        if resource is UNDEFINED and res_name in self._resource_descriptors:
+            # Resource not yet loaded or computed, use cached descriptor
+            resource_json = dict(self._resource_descriptors[res_name])
+            resource_json.update(id=res_id, updateCount=res_update_count, name=res_name)
+            return resource_json
+        return self._new_resource_descriptor(res_id, res_update_count, res_name, resource)
+
     @classmethod
-    def _get_resource_descriptor(cls, res_id: int, res_update_count: int, res_name: str, resource):
+    def _new_resource_descriptor(cls, res_id: int, res_update_count: int, res_name: str, resource):
         data_type_name = object_to_qualified_name(type(resource))
         resource_json = dict(id=res_id, updateCount=res_update_count, name=res_name, dataType=data_type_name)
         if isinstance(resource, xr.Dataset):
@@ -489,6 +674,8 @@ class Workspace:
             self.workflow.remove_step(res_step)
             if res_name in self._resource_cache:
                 del self._resource_cache[res_name]
+            self._resource_file_stamps.pop(res_name, None)
+            self._resource_descriptors.pop(res_name, None)
 
     def rename_resource(self, res_name: str, new_res_name: str) -> None:
         Workspace._validate_res_name(new_res_name)
@@ -507,6 +694,10 @@ class Workspace:
 
             if res_name in self._resource_cache:
                 self._resource_cache.rename_key(res_name, new_res_name)
+            # Resource files are still named after the old resource, so they must be rewritten
+            self._resource_file_stamps.pop(res_name, None)
+            if res_name in self._resource_descriptors:
+                self._resource_descriptors[new_res_name] = self._resource_descriptors.pop(res_name)
 
     def set_resource(self,
                      op_name: str,
@@ -613,14 +804,28 @@ class Workspace:
             for key in ids_of_invalidated_steps:
                 if key in self._resource_cache:
                     self._resource_cache[key] = UNDEFINED
+                self._resource_descriptors.pop(key, None)
 
         return res_name
 
-    def run_op(self, op_name: str, op_kwargs: OpKwArgs, monitor=Monitor.NONE):
+    def run_op(self, op_name: str, op_kwargs: OpKwArgs, monitor=Monitor.NONE, profiler=None):
+        """
+        Run the operation *op_name* with the given operation arguments *op_kwargs* after invoking
+        this workspace's workflow.
+
+        :param op_name: The name of a registered operation.
+        :param op_kwargs: The operation's keyword arguments. Each argument must be a dict having either a "source" or
+               "value" key.
+        :param monitor: An optional progress monitor.
+        :param profiler: An optional :py:class:`cate.core.profiler.WorkflowProfiler` that records
+               execution statistics of the workflow steps and the operation.
+        :return: The operation's return value, if the "should_return" argument is True.
+        """
         assert op_name
         assert op_kwargs is not None
 
         unpacked_op_kwargs = {}
+        source_op_kwargs = {}
         returns = False
 
         with self._lock:
@@ -632,14 +837,30 @@ class Workspace:
                 if 'should_return' == input_name and 'value' in input_value:
                     returns = input_value['value']
                 elif 'source' in input_value:
-                    unpacked_op_kwargs[input_name] = safe_eval(input_value['source'], self.resource_cache)
+                    source_op_kwargs[input_name] = input_value['source']
                 elif 'value' in input_value:
                     unpacked_op_kwargs[input_name] = input_value['value']
 
+            self._read_unloaded_resources(self.workflow.steps)
+
         # Allow executing self.workflow.invoke() out of the locked context so we can run tasks in parallel
+        context = self._new_context()
+        if profiler is not None:
+            context.update(profiler=profiler)
         with monitor.starting("Running operation '%s'" % op_name, 2):
-            self.workflow.invoke(context=self._new_context(), monitor=monitor.child(work=1))
-            return_value = op(monitor=monitor.child(work=1), **unpacked_op_kwargs)
+            self.workflow.invoke(context=context, monitor=monitor.child(work=1))
+            # Evaluate sources after invoking the workflow, as resources may not have been computed before
+            for input_name, source in source_op_kwargs.items():
+                unpacked_op_kwargs[input_name] = safe_eval(source, self.resource_cache)
+            if profiler is not None:
+                # Run the operation as a step so that it is profiled as well
+                op_step = OpStep(op)
+                for input_name, input_value in unpacked_op_kwargs.items():
+                    op_step.inputs[input_name].value = input_value
+                op_step.invoke(context=dict(profiler=profiler), monitor=monitor.child(work=1))
+                return_value = op_step.get_output_value()
+            else:
+                return_value = op(monitor=monitor.child(work=1), **unpacked_op_kwargs)
             if returns:
                 return return_value
 
@@ -656,6 +877,7 @@ class Workspace:
                 if res_step is None:
                     raise ValidationError('Resource "%s" not found' % res_name)
                 steps = self.workflow.find_steps_to_compute(res_step.id)
+            self._read_unloaded_resources(steps)
 
         # Allow executing self.workflow.invoke_steps() out of the locked context so we can run tasks in parallel
         if steps and len(steps):
@@ -664,6 +886,30 @@ class Workspace:
         else:
             return None
 
+    def get_resource(self, res_name: str, monitor: Monitor = Monitor.NONE):
+        """
+        Get the value of the resource named *res_name*. If the resource has not been loaded or computed yet,
+        e.g. because the workspace has been opened lazily, it is read from file or computed now.
+
+        :param res_name: The resource name.
+        :param monitor: An optional progress monitor.
+        :return: The resource value.
+        """
+        res_value = self._resource_cache.get(res_name, UNDEFINED)
+        if res_value is UNDEFINED:
+            if not res_name:
+                return None
+            res_value = self.execute_workflow(res_name=res_name, monitor=monitor)
+        return res_value
+
+    def _read_unloaded_resources(self, steps):
+        for step in steps:
+            res_name = step.id
+            if step.persistent \
+                    and self._resource_cache.get(res_name, UNDEFINED) is UNDEFINED \
+                    and not self._is_resource_file_outdated(res_name):
+                self._read_resource_from_file(res_name)
+
     def _new_context(self):
         return dict(value_cache=self._resource_cache, workspace=self)
 
@@ -683,5 +929,41 @@ class Workspace:
                 "except for the first character, the digits 0 through 9." % res_name)
 
 
+def _split_resource_file_name(filename: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split *filename* into resource name and extension, if it is a resource file name."""
+    for ext, _, _ in _RESOURCE_PERSISTENCE_FORMATS.values():
+        for suffix in ('.' + ext, '.' + ext + '.tmp'):
+            if filename.endswith(suffix) and len(filename) > len(suffix):
+                return filename[0: -len(suffix)], suffix[1:]
+    return None, None
+
+
+def _remove_resource_file(path: str):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        _LOG.exception('removing resource file "%s" failed' % path)
+
+
+def _replace_resource_file(temp_path: str, path: str):
+    if os.path.isdir(path):
+        # Directories (e.g. Zarr) cannot be replaced atomically, so move the old one out of the way first
+        old_path = path + '.old'
+        _remove_resource_file(old_path)
+        os.replace(path, old_path)
+        os.replace(temp_path, path)
+        _remove_resource_file(old_path)
+    else:
+        os.replace(temp_path, path)
+
+
+def _to_json_default(value):
+    # Resource descriptors may contain tuples of numpy integers, e.g. shapes and chunk sizes
+    return to_json(value)
+
+
 def _to_json_scalar_value(value, nchars=1000):
     return to_scalar(value, ndigits=3, nchars=nchars, stringify=True)
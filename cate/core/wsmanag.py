@@ -28,9 +28,11 @@ from abc import ABCMeta, abstractmethod
 from collections import OrderedDict
 from typing import List, Union, Optional, Tuple, Any
 
+from ..conf import conf
 from ..conf.defaults import SCRATCH_WORKSPACES_PATH
 from ..core.types import ValidationError
 from .objectio import write_object
+from .profiler import WorkflowProfiler
 from ..util.monitor import Monitor
 from ..util.safe import safe_eval
 from ..util.undefined import UNDEFINED
@@ -101,6 +103,18 @@ class WorkspaceManager(metaclass=ABCMeta):
                             monitor: Monitor = Monitor.NONE) -> Union[Any, None]:
         pass
 
+    @abstractmethod
+    def profile_op_in_workspace(self, base_dir: str,
+                                op_name: str, op_args: OpKwArgs,
+                                monitor: Monitor = Monitor.NONE) -> dict:
+        """
+        Like :py:meth:`run_op_in_workspace`, but record execution statistics of all workflow steps
+        and the operation.
+
+        :return: The JSON representation of a :py:class:`cate.core.profiler.WorkflowProfiler`.
+        """
+        pass
+
     @abstractmethod
     def set_workspace_resource(self,
                                base_dir: str,
@@ -195,9 +209,19 @@ class FSWorkspaceManager(WorkspaceManager):
             # noinspection PyTypeChecker
             return workspace
         with monitor.starting("Opening workspace", 100):
-            workspace = Workspace.open(base_dir, monitor=monitor.child(50))
-            assert base_dir not in self._open_workspaces
-            workspace.execute_workflow(monitor=monitor.child(50))
+            if conf.get_lazy_workspace_open():
+                workspace = Workspace.open(base_dir, monitor=monitor.child(50), lazy=True)
+                assert base_dir not in self._open_workspaces
+                # Only compute resources that could not be described from the resources file
+                res_names = [step.id for step in workspace.workflow.steps if step.id not in workspace.resource_cache]
+                compute_monitor = monitor.child(50)
+                with compute_monitor.starting("Computing resources", len(res_names)):
+                    for res_name in res_names:
+                        workspace.execute_workflow(res_name=res_name, monitor=compute_monitor.child(1))
+            else:
+                workspace = Workspace.open(base_dir, monitor=monitor.child(50))
+                assert base_dir not in self._open_workspaces
+                workspace.execute_workflow(monitor=monitor.child(50))
         self._open_workspaces[base_dir] = workspace
         return workspace
 
@@ -308,6 +332,14 @@ class FSWorkspaceManager(WorkspaceManager):
         workspace = self.get_workspace(base_dir)
         return workspace.run_op(op_name, op_args, monitor=monitor)
 
+    def profile_op_in_workspace(self, base_dir: str,
+                                op_name: str, op_args: OpKwArgs,
+                                monitor: Monitor = Monitor.NONE) -> dict:
+        workspace = self.get_workspace(base_dir)
+        profiler = WorkflowProfiler()
+        workspace.run_op(op_name, op_args, monitor=monitor, profiler=profiler)
+        return profiler.to_json_dict()
+
     def set_workspace_resource(self,
                                base_dir: str,
                                op_name: str,
@@ -67,14 +67,17 @@ from .plot import (plot_map, plot, plot_contour, plot_scatter, plot_hist,
                    plot_data_frame, plot_hovmoeller)
 from .resampling import resample_2d, downsample_2d, upsample_2d
 from .select import select_var
-from .subset import subset_spatial, subset_temporal, subset_temporal_index
+from .subset import subset_spatial, subset_temporal, subset_temporal_index, extract_points
 from .timeseries import tseries_point, tseries_mean
 from .utility import sel, from_dataframe, identity, literal, pandas_fillna
+from .zonal import zonal_statistics
 
 __all__ = [
     # .timeseries
     'tseries_point',
     'tseries_mean',
+    # .zonal
+    'zonal_statistics',
     # .resampling
     'resample_2d',
     'downsample_2d',
@@ -91,6 +94,7 @@ __all__ = [
     'subset_spatial',
     'subset_temporal',
     'subset_temporal_index',
+    'extract_points',
     # .correlation
     'pearson_correlation_scalar',
     'pearson_correlation',
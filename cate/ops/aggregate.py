@@ -30,6 +30,7 @@ Components
 """
 from datetime import timezone
 
+import dask.array as da
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -42,12 +43,16 @@ from cate.ops.select import select_var
 from cate.util.monitor import Monitor
 
 
-@op(tags=['aggregate', 'temporal'], version='1.5')
+@op(tags=['aggregate', 'temporal'], version='1.6')
 @op_input('ds', data_type=DatasetLike)
 @op_input('var', value_set_source='ds', data_type=VarNamesLike)
+@op_input('method', value_set=['mean', 'sum', 'count', 'std', 'min', 'max', 'median', 'percentile'])
+@op_input('percentile', value_range=[0, 100])
 @op_return(add_history=True)
 def long_term_average(ds: DatasetLike.TYPE,
                       var: VarNamesLike.TYPE = None,
+                      method: str = 'mean',
+                      percentile: float = 90.,
                       monitor: Monitor = Monitor.NONE) -> xr.Dataset:
     """
     Create a 'mean over years' dataset by averaging the values of the given input
@@ -61,19 +66,25 @@ def long_term_average(ds: DatasetLike.TYPE,
     then be a seasonal climatology where each season is denoted with the same date
     as in the input dataset.
 
+    Instead of the mean, other statistics over years can be computed using *method*.
+    Methods 'median' and 'percentile' require the complete time series of a
+    data chunk in memory, all other methods are computed chunk by chunk.
+
     For further information on climatological datasets, see
     http://cfconventions.org/cf-conventions/v1.6.0/cf-conventions.html#climatological-statistics
 
     :param ds: A dataset to average
     :param var: If given, only these variables will be preserved in the resulting dataset
+    :param method: The statistic to compute over years
+    :param percentile: The percentile to compute if *method* is 'percentile'
     :param monitor: A progress monitor
     :return: A climatological long term average dataset
     """
     ds = DatasetLike.convert(ds)
     # Check if time dtype is what we want
-    if 'datetime64[ns]' != ds.time.dtype:
+    if not np.issubdtype(ds.time.dtype, np.datetime64):
         raise ValidationError('Long term average operation expects a dataset with the'
-                              ' time coordinate of type datetime64[ns], but received'
+                              ' time coordinate of type datetime64, but received'
                               ' {}. Running the normalize operation on this'
                               ' dataset may help'.format(ds.time.dtype))
 
@@ -91,243 +102,337 @@ def long_term_average(ds: DatasetLike.TYPE,
         retset = select_var(retset, var)
 
     if t_resolution == 'P1D':
-        return _lta_daily(retset, monitor)
+        return _lta_daily(retset, method, percentile, monitor)
     elif t_resolution == 'P1M':
-        return _lta_monthly(retset, monitor)
+        return _lta_monthly(retset, method, percentile, monitor)
     else:
-        return _lta_general(retset, monitor)
+        return _lta_general(retset, method, percentile, monitor)
+
 
+# Day of year offsets of the first day of each month in a non-leap year
+_MONTH_DAY_OFFSETS = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
 
-def _lta_monthly(ds: xr.Dataset, monitor: Monitor):
+
+def _lta_monthly(ds: xr.Dataset, method: str, percentile: float, monitor: Monitor):
     """
     Carry out a long term average on a monthly dataset
 
     :param ds: Dataset to aggregate
+    :param method: Statistic to compute
+    :param percentile: Percentile to compute if method is 'percentile'
     :param monitor: Progress monitor
     :return: Aggregated dataset
     """
-    time_min = pd.Timestamp(ds.time.values[0], tzinfo=timezone.utc)
-    time_max = pd.Timestamp(ds.time.values[-1], tzinfo=timezone.utc)
-    total_work = 100
-    retset = ds
+    time_min = pd.Timestamp(ds.time.values[0])
+    time_coord = pd.date_range('{}-01-01'.format(time_min.year),
+                               freq='MS',
+                               periods=12)
 
-    with monitor.starting('LTA', total_work=total_work):
-        monitor.progress(work=0)
-        step = total_work / 12
-        kwargs = {'monitor': monitor, 'step': step}
-        retset = retset.groupby('time.month', squeeze=False).apply(_mean, **kwargs)
+    keys = pd.DatetimeIndex(ds.time.values).month.values - 1
+    return _lta(ds, keys, time_coord, method, percentile, monitor)
 
-    # Make the return dataset CF compliant
-    retset = retset.rename({'month': 'time'})
-    retset['time'] = pd.date_range('{}-01-01'.format(time_min.year),
-                                   freq='MS',
-                                   periods=12)
 
-    climatology_bounds = xr.DataArray(data=np.tile([time_min, time_max],
-                                                   (12, 1)),
-                                      dims=['time', 'nv'],
-                                      name='climatology_bounds')
-    retset['climatology_bounds'] = climatology_bounds
-    retset.time.attrs = ds.time.attrs
-    retset.time.attrs['climatology'] = 'climatology_bounds'
-
-    for var in retset.data_vars:
-        try:
-            retset[var].attrs['cell_methods'] = \
-                retset[var].attrs['cell_methods'] + ' time: mean over years'
-        except KeyError:
-            retset[var].attrs['cell_methods'] = 'time: mean over years'
-
-    return retset
-
-
-def _groupby_day(ds: xr.Dataset, monitor: Monitor, step: float):
+def _lta_daily(ds: xr.Dataset, method: str, percentile: float, monitor: Monitor):
     """
-    Groupby the given dataset by day of month and apply mean to it
+    Carry out a long term average of a daily dataset.
+    Values of February 29th are not taken into account.
 
     :param ds: Dataset to aggregate
+    :param method: Statistic to compute
+    :param percentile: Percentile to compute if method is 'percentile'
     :param monitor: Progress monitor
-    :param step: Progress step
+    :return: Aggregated dataset
     """
-    kwargs = {'monitor': monitor, 'step': step}
-    return ds.groupby('time.day', squeeze=False).apply(_mean, **kwargs)
+    time_min = pd.Timestamp(ds.time.values[0])
+    time_coord = pd.date_range(start='{}-01-01'.format(time_min.year),
+                               end='{}-12-31'.format(time_min.year),
+                               freq='D')
+    if len(time_coord) == 366:
+        time_coord = time_coord.drop(np.datetime64('{}-02-29'.format(time_min.year)))
 
+    time_index = pd.DatetimeIndex(ds.time.values)
+    months = time_index.month.values
+    days = time_index.day.values
+    keys = _MONTH_DAY_OFFSETS[months - 1] + days - 1
+    keys[(months == 2) & (days == 29)] = -1
+    return _lta(ds, keys, time_coord, method, percentile, monitor)
 
-def _lta_daily(ds: xr.Dataset, monitor: Monitor):
+
+def _lta_general(ds: xr.Dataset, method: str, percentile: float, monitor: Monitor):
     """
-    Carry out a long term average of a daily dataset
+    Try to carry out a long term average in a general case, notably
+    in the case of having seasonal datasets
 
     :param ds: Dataset to aggregate
+    :param method: Statistic to compute
+    :param percentile: Percentile to compute if method is 'percentile'
     :param monitor: Progress monitor
     :return: Aggregated dataset
     """
-    time_min = pd.Timestamp(ds.time.values[0], tzinfo=timezone.utc)
-    time_max = pd.Timestamp(ds.time.values[-1], tzinfo=timezone.utc)
-    total_work = 100
-    retset = ds
-
-    with monitor.starting('LTA', total_work=total_work):
-        monitor.progress(work=0)
-        step = total_work / 366
-        kwargs = {'monitor': monitor, 'step': step}
-        retset = retset.groupby('time.month', squeeze=False).apply(_groupby_day, **kwargs)
-
-    # Make the return dataset CF compliant
-    retset = retset.stack(time=('month', 'day'))
+    # The dataset should feature time periods consistent over years
+    # and denoted with the same dates each year
+    rep_year = _get_representative_year(ds.time)
+    if rep_year is None:
+        raise ValidationError("A long term average dataset can not be created for"
+                              " a dataset with inconsistent seasons.")
 
-    # Get rid of redundant dates
-    drop = [(2, 29), (2, 30), (2, 31), (4, 31), (6, 31),
-            (9, 31), (11, 31)]
-    retset = retset.drop(drop, dim='time')
+    keys = np.searchsorted(_month_days(rep_year), _month_days(ds.time.values))
+    return _lta(ds, keys, rep_year, method, percentile, monitor)
 
-    # Turn month, day coordinates to time
-    retset = retset.reset_index('time')
-    retset = retset.drop(['month', 'day'])
-    time_coord = pd.date_range(start='{}-01-01'.format(time_min.year),
-                               end='{}-12-31'.format(time_min.year),
-                               freq='D')
-    if len(time_coord) == 366:
-        time_coord = time_coord.drop(np.datetime64('{}-02-29'.format(time_min.year)))
-    retset['time'] = time_coord
 
-    climatology_bounds = xr.DataArray(data=np.tile([time_min, time_max],
-                                                   (365, 1)),
-                                      dims=['time', 'nv'],
-                                      name='climatology_bounds')
-    retset['climatology_bounds'] = climatology_bounds
-    retset.time.attrs = ds.time.attrs
-    retset.time.attrs['climatology'] = 'climatology_bounds'
+def _is_seasonal(time: xr.DataArray):
+    """
+    Check if the given timestamp dataarray features consistent
+    seasons. E.g. Each year has the same date-month values in it.
+    """
+    return _get_representative_year(time) is not None
 
-    for var in retset.data_vars:
-        try:
-            retset[var].attrs['cell_methods'] = \
-                retset[var].attrs['cell_methods'] + ' time: mean over years'
-        except KeyError:
-            retset[var].attrs['cell_methods'] = 'time: mean over years'
 
-    return retset
+def _get_representative_year(time: xr.DataArray):
+    """
+    Get the time stamps of the first year, or of the second year in case the first year
+    is not full. Return None, if other years feature (month, day) dates not contained in
+    the representative year.
+    """
+    time_values = time.values
+    years = pd.DatetimeIndex(time_values).year.values
+    unique_years = np.unique(years)
+    rep_year = time_values[years == unique_years[0]]
+    if len(unique_years) > 1:
+        second_year = time_values[years == unique_years[1]]
+        if len(second_year) > len(rep_year):
+            rep_year = second_year
+    if not np.all(np.isin(_month_days(time_values), _month_days(rep_year))):
+        return None
+    return rep_year
+
+
+def _month_days(time_values: np.ndarray) -> np.ndarray:
+    """
+    Encode the (month, day) dates of the given time stamps as sortable integers.
+    """
+    time_index = pd.DatetimeIndex(time_values)
+    return time_index.month.values * 100 + time_index.day.values
 
 
-def _lta_general(ds: xr.Dataset, monitor: Monitor):
+def _lta(ds: xr.Dataset,
+         keys: np.ndarray,
+         time_coord,
+         method: str,
+         percentile: float,
+         monitor: Monitor) -> xr.Dataset:
     """
-    Try to carry out a long term average in a general case, notably
-    in the case of having seasonal datasets
+    Compute the statistic *method* over all time steps of *ds* that share the same key.
+    Keys are indexes into *time_coord*, negative keys denote time steps to be ignored.
 
     :param ds: Dataset to aggregate
+    :param keys: Integer key for each time step of *ds*
+    :param time_coord: Time coordinate of the climatology
+    :param method: Statistic to compute
+    :param percentile: Percentile to compute if method is 'percentile'
     :param monitor: Progress monitor
     :return: Aggregated dataset
     """
     time_min = pd.Timestamp(ds.time.values[0], tzinfo=timezone.utc)
     time_max = pd.Timestamp(ds.time.values[-1], tzinfo=timezone.utc)
-    total_work = 100
-    retset = ds
+    n_keys = len(time_coord)
 
-    # The dataset should feature time periods consistent over years
-    # and denoted with the same dates each year
-    if not _is_seasonal(ds.time):
-        raise ValidationError("A long term average dataset can not be created for"
-                              " a dataset with inconsistent seasons.")
-
-    # Get 'representative year'
-    c = 0
-    for group in ds.time.groupby('time.year'):
-        c = c + 1
-        if c == 1:
-            rep_year = group[1].time
-            continue
-        if c == 2 and len(group[1].time) > len(rep_year):
-            rep_year = group[1].time
-            break
+    coords = {name: coord for name, coord in ds.coords.items() if 'time' not in coord.dims}
+    retset = xr.Dataset(coords=coords, attrs=ds.attrs)
+    retset['time'] = time_coord
 
-    with monitor.starting('LTA', total_work=total_work):
-        monitor.progress(work=0)
-        step = total_work / len(rep_year.time)
-        kwargs = {'monitor': monitor, 'step': step}
-        retset = retset.groupby('time.month', squeeze=False).apply(_groupby_day, **kwargs)
+    var_names = [name for name in ds.data_vars
+                 if 'time' not in ds[name].dims or np.issubdtype(ds[name].dtype, np.number)]
+    with monitor.starting('LTA', total_work=max(1, len(var_names))):
+        for var_name in var_names:
+            var = ds[var_name]
+            if 'time' not in var.dims:
+                retset[var_name] = var
+            else:
+                other_dims = [dim for dim in var.dims if dim != 'time']
+                var = var.transpose(*other_dims, 'time')
+                data = _reduce_by_key(var.data, keys, n_keys, method, percentile)
+                retset[var_name] = xr.DataArray(data,
+                                                dims=other_dims + ['time'],
+                                                attrs=var.attrs).transpose('time', *other_dims)
+            monitor.progress(work=1)
 
     # Make the return dataset CF compliant
-    retset = retset.stack(time=('month', 'day'))
-
-    # Turn month, day coordinates to time
-    retset = retset.reset_index('time')
-    retset = retset.drop(['month', 'day'])
-    retset['time'] = rep_year.time
-
     climatology_bounds = xr.DataArray(data=np.tile([time_min, time_max],
-                                                   (len(rep_year), 1)),
+                                                   (n_keys, 1)),
                                       dims=['time', 'nv'],
                                       name='climatology_bounds')
     retset['climatology_bounds'] = climatology_bounds
-    retset.time.attrs = ds.time.attrs
+    retset.time.attrs = dict(ds.time.attrs)
     retset.time.attrs['climatology'] = 'climatology_bounds'
 
-    for var in retset.data_vars:
+    cell_method = 'time: {} over years'.format('percentile {}'.format(percentile)
+                                               if method == 'percentile' else method)
+    for var in var_names:
+        if 'time' not in retset[var].dims:
+            continue
         try:
             retset[var].attrs['cell_methods'] = \
-                retset[var].attrs['cell_methods'] + ' time: mean over years'
+                retset[var].attrs['cell_methods'] + ' ' + cell_method
         except KeyError:
-            retset[var].attrs['cell_methods'] = 'time: mean over years'
+            retset[var].attrs['cell_methods'] = cell_method
 
     return retset
 
 
-def _is_seasonal(time: xr.DataArray):
+def _reduce_by_key(data, keys: np.ndarray, n_keys: int, method: str, percentile: float):
     """
-    Check if the given timestamp dataarray features consistent
-    seasons. E.g. Each year has the same date-month values in it.
+    Reduce the last axis of the numpy or dask array *data* by *keys*. The result's last axis has size *n_keys*.
+
+    Counts, sums and sums of squares as well as minima and maxima are computed for each time chunk separately
+    and then combined. Percentiles require all time steps of a chunk in memory, hence *data* is rechunked
+    to a single chunk along the time axis.
     """
-    c = 0
-    test = None
-    for group in time.groupby('time.year'):
-        # Test (month, day) dates of all years against
-        # (month, day) dates of the first year, or second
-        # year in case the first year is not full
-        c = c + 1
-        np_time = group[1].time.values
-        months = pd.DatetimeIndex(np_time).month
-        days = pd.DatetimeIndex(np_time).day
-        if c == 1:
-            first_months = months
-            first_days = days
-            continue
-        elif c == 2:
-            second_months = months
-            second_days = days
-            if len(second_months) > len(first_months):
-                test = list(zip(second_months, second_days))
-                for date in zip(first_months, first_days):
-                    if date not in test:
-                        return False
-            else:
-                test = list(zip(first_months, first_days))
-                for date in zip(second_months, second_days):
-                    if date not in test:
-                        return False
-            continue
+    is_dask = isinstance(data, da.Array)
+    xp = da if is_dask else np
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+
+    if method in ('median', 'percentile'):
+        q = 50. if method == 'median' else percentile
+        if is_dask:
+            data = data.rechunk({data.ndim - 1: -1})
+            return data.map_blocks(_segment_percentile, keys, n_keys, q,
+                                   chunks=data.chunks[:-1] + ((n_keys,),), dtype=np.float64)
+        return _segment_percentile(data, keys, n_keys, q)
+
+    if method in ('min', 'max'):
+        ufunc = np.fmin if method == 'min' else np.fmax
+        return _tree_reduce(ufunc, _map_time_chunks(_segment_extreme, data, keys, n_keys, n_keys, ufunc))
+
+    # Shift values by the first time step to reduce round-off errors in the sum of squares
+    offset = data[..., :1]
+    offset = xp.where(xp.isnan(offset), 0., offset)
+    moments = _tree_reduce(np.add, _map_time_chunks(_segment_moments, data - offset, keys, 3 * n_keys, n_keys))
+    count = moments[..., :n_keys]
+    if method == 'count':
+        return count
+    total = moments[..., n_keys:2 * n_keys]
+    if method == 'sum':
+        return total + count * offset
+    valid = count > 0
+    safe_count = xp.where(valid, count, 1.)
+    mean = total / safe_count
+    if method == 'mean':
+        return xp.where(valid, mean + offset, np.nan)
+    variance = xp.maximum(moments[..., 2 * n_keys:] / safe_count - mean * mean, 0.)
+    return xp.where(valid, xp.sqrt(variance), np.nan)
+
+
+def _map_time_chunks(func, data, keys: np.ndarray, n_out: int, *args) -> list:
+    """
+    Apply ``func(values, keys, *args)`` to each chunk of *data* along the last axis.
+    *func* must return an array whose last axis has size *n_out*.
+
+    As each partial result spans all keys, *data* is rechunked to hold at least *n_out* time steps
+    per chunk, so that partial results are not larger than the chunks they are computed from.
+    The other axes are rechunked such that the chunks' memory size stays within dask's limit.
+
+    :return: A list of partial results, one for each time chunk.
+    """
+    if not isinstance(data, da.Array):
+        return [func(data, keys, *args)]
+    time_chunk = min(max(max(data.chunks[-1]), n_out), data.shape[-1])
+    chunks = {axis: 'auto' for axis in range(data.ndim - 1)}
+    chunks[data.ndim - 1] = time_chunk
+    data = data.rechunk(chunks)
+    partials = []
+    start = 0
+    for size in data.chunks[-1]:
+        block = data[..., start:start + size]
+        partials.append(block.map_blocks(func, keys[start:start + size], *args,
+                                         chunks=block.chunks[:-1] + ((n_out,),), dtype=np.float64))
+        start += size
+    return partials
+
+
+def _tree_reduce(func, partials: list):
+    """Combine the given partial results pairwise using the binary function *func*."""
+    while len(partials) > 1:
+        partials = [func(partials[i], partials[i + 1]) if i + 1 < len(partials) else partials[i]
+                    for i in range(0, len(partials), 2)]
+    return partials[0]
+
+
+def _sort_by_key(values: np.ndarray, keys: np.ndarray):
+    """
+    Sort the last axis of *values* by *keys* ignoring negative keys.
 
-        for date in zip(months, days):
-            if date not in test:
-                return False
+    :return: A tuple (sorted values, unique keys, start index of each unique key)
+    """
+    indexes = np.nonzero(keys >= 0)[0]
+    indexes = indexes[np.argsort(keys[indexes], kind='stable')]
+    unique_keys, starts = np.unique(keys[indexes], return_index=True)
+    return values[..., indexes], unique_keys, starts
 
-    return True
 
+def _segment_moments(values: np.ndarray, keys: np.ndarray, n_keys: int) -> np.ndarray:
+    """
+    Compute count, sum and sum of squares of the valid values of each key along the last axis.
 
-def _mean(ds: xr.Dataset, monitor: Monitor, step: float):
+    :return: An array whose last axis holds the counts, sums and sums of squares for all keys.
+    """
+    result = np.zeros(values.shape[:-1] + (3 * n_keys,))
+    values, unique_keys, starts = _sort_by_key(values, keys)
+    if len(unique_keys) == 0:
+        return result
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0.)
+    result[..., unique_keys] = np.add.reduceat(valid, starts, axis=-1, dtype=np.float64)
+    result[..., n_keys + unique_keys] = np.add.reduceat(values, starts, axis=-1, dtype=np.float64)
+    result[..., 2 * n_keys + unique_keys] = np.add.reduceat(values * values, starts, axis=-1, dtype=np.float64)
+    return result
+
+
+def _segment_extreme(values: np.ndarray, keys: np.ndarray, n_keys: int, ufunc) -> np.ndarray:
+    """
+    Compute the minimum or maximum of the valid values of each key along the last axis,
+    *ufunc* is either ``np.fmin`` or ``np.fmax``.
     """
-    Calculate mean of the given dataset and update the given monitor.
+    result = np.full(values.shape[:-1] + (n_keys,), np.nan)
+    values, unique_keys, starts = _sort_by_key(values, keys)
+    if len(unique_keys) > 0:
+        result[..., unique_keys] = ufunc.reduceat(values, starts, axis=-1)
+    return result
 
-    :param ds: Dataset to take the mean of
-    :param monitor: Monitor to update
-    :param step: Work step
+
+def _segment_percentile(values: np.ndarray, keys: np.ndarray, n_keys: int, q: float) -> np.ndarray:
     """
-    retset = ds.mean(dim='time', keep_attrs=True)
-    monitor.progress(work=step)
-    return retset
+    Compute the percentile *q* of the valid values of each key along the last axis.
+    """
+    result = np.full(values.shape[:-1] + (n_keys,), np.nan)
+    values, unique_keys, starts = _sort_by_key(values, keys)
+    ends = list(starts[1:]) + [values.shape[-1]]
+    for key, start, end in zip(unique_keys, starts, ends):
+        result[..., key] = _nan_percentile(values[..., start:end], q)
+    return result
+
+
+def _nan_percentile(values: np.ndarray, q: float) -> np.ndarray:
+    """
+    Compute the percentile *q* of the valid values along the last axis using linear interpolation.
+    Same as ``np.nanpercentile(values, q, axis=-1)``, but much faster for multi-dimensional arrays.
+    """
+    # NaNs are sorted to the end
+    values = np.sort(values, axis=-1)
+    count = np.sum(~np.isnan(values), axis=-1)
+    position = (count - 1) * (q / 100.)
+    lower = np.maximum(np.floor(position).astype(np.int64), 0)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    lower_values = np.take_along_axis(values, lower[..., np.newaxis], axis=-1)[..., 0]
+    upper_values = np.take_along_axis(values, upper[..., np.newaxis], axis=-1)[..., 0]
+    result = lower_values + (upper_values - lower_values) * (position - lower)
+    return np.where(count > 0, result, np.nan)
 
 
 @op(tags=['aggregate', 'temporal'], version='1.5')
 @op_input('ds', data_type=DatasetLike)
-@op_input('method', value_set=['mean', 'max', 'median', 'prod', 'sum', 'std',
+@op_input('method', value_set=['mean', 'max', 'min', 'median', 'prod', 'sum', 'std',
                                'var', 'argmax', 'argmin', 'first', 'last'])
 @op_input('output_resolution', value_set=['month', 'season'])
 @op_return(add_history=True)
@@ -335,14 +440,18 @@ def temporal_aggregation(ds: DatasetLike.TYPE,
                          method: str = 'mean',
                          output_resolution: str = 'month',
                          custom_resolution: str = None,
+                         weighted: bool = False,
                          monitor: Monitor = Monitor.NONE) -> xr.Dataset:
     """
     Perform aggregation of dataset according to the given
     method and output resolution.
 
-    Note that the operation does not perform weighting. Depending on the
+    By default, the operation does not perform weighting. Depending on the
     combination of input and output resolutions, as well as aggregation
-    method, the resulting dataset might yield unexpected results.
+    method, the resulting dataset might yield unexpected results. If
+    ``weighted`` is True, methods 'mean', 'std' and 'var' weight each time
+    step by its duration, e.g. by the number of days of a month when
+    aggregating a monthly dataset to seasons.
 
     Resolution 'month' will result in a monthly dataset with each month
     denoted by its first date. Resolution 'season' will result in a dataset
@@ -365,13 +474,14 @@ def temporal_aggregation(ds: DatasetLike.TYPE,
     :param method: Aggregation method
     :param output_resolution: Desired temporal resolution of the output dataset
     :param custom_resolution: Custom temporal resolution, overrides output_resolution
+    :param weighted: Whether to weight time steps by their duration
     :return: Aggregated dataset
     """
     ds = DatasetLike.convert(ds)
     # Check if time dtype is what we want
-    if 'datetime64[ns]' != ds.time.dtype:
+    if not np.issubdtype(ds.time.dtype, np.datetime64):
         raise ValidationError('Temporal aggregation operation expects a dataset with the'
-                              ' time coordinate of type datetime64[ns], but received'
+                              ' time coordinate of type datetime64, but received'
                               ' {}. Running the normalize operation on this'
                               ' dataset may help'.format(ds.time.dtype))
 
@@ -391,11 +501,17 @@ def temporal_aggregation(ds: DatasetLike.TYPE,
 
     _validate_freq(in_freq, freq)
 
+    if weighted and method not in _WEIGHTED_METHODS:
+        raise ValidationError(f'Aggregation method {method} does not support weighting.')
+
     with monitor.observing("resample dataset"):
-        try:
-            retset = getattr(resampler, method)(ds.resample(time=freq, keep_attrs=True))
-        except AttributeError:
-            raise ValidationError(f'Provided aggregation method {method} is not valid.')
+        if method in _BIN_METHODS:
+            retset = _aggregate_bins(ds, freq, method, weighted)
+        else:
+            try:
+                retset = getattr(resampler, method)(ds.resample(time=freq, keep_attrs=True))
+            except AttributeError:
+                raise ValidationError(f'Provided aggregation method {method} is not valid.')
 
     for var in retset.data_vars:
         try:
@@ -408,6 +524,154 @@ def temporal_aggregation(ds: DatasetLike.TYPE,
     return adjust_temporal_attrs(retset)
 
 
+_BIN_METHODS = ['mean', 'sum', 'prod', 'min', 'max', 'std', 'var', 'median']
+_WEIGHTED_METHODS = ['mean', 'std', 'var']
+
+
+def _aggregate_bins(ds: xr.Dataset, freq: str, method: str, weighted: bool) -> xr.Dataset:
+    """
+    Aggregate all time-dependent numeric variables of *ds* into the time bins given by
+    the pandas offset alias *freq*. Dask-backed variables are rechunked along time so that
+    no bin is split between chunks and are then reduced chunk by chunk.
+
+    :param ds: Dataset to aggregate
+    :param freq: Pandas offset alias of the output resolution
+    :param method: Aggregation method, one of _BIN_METHODS
+    :param weighted: Whether to weight time steps by their duration
+    :return: Aggregated dataset
+    """
+    bin_sizes = pd.Series(1, index=pd.DatetimeIndex(ds.time.values)).resample(freq).count()
+    keys = np.repeat(np.arange(len(bin_sizes)), bin_sizes.values)
+    weights = _get_time_weights(ds) if weighted else None
+
+    coords = {name: coord for name, coord in ds.coords.items() if 'time' not in coord.dims}
+    retset = xr.Dataset(coords=coords, attrs=ds.attrs)
+    retset['time'] = bin_sizes.index.values
+
+    for var_name, var in ds.data_vars.items():
+        if 'time' not in var.dims:
+            retset[var_name] = var
+        elif np.issubdtype(var.dtype, np.number):
+            other_dims = [dim for dim in var.dims if dim != 'time']
+            data = _reduce_bins(var.transpose(*other_dims, 'time').data, keys, len(bin_sizes), method, weights)
+            retset[var_name] = xr.DataArray(data,
+                                            dims=other_dims + ['time'],
+                                            attrs=var.attrs).transpose(*var.dims)
+    return retset
+
+
+def _get_time_weights(ds: xr.Dataset) -> np.ndarray:
+    """
+    Get the duration of each time step of *ds* in days. Durations are taken from the time bounds
+    if available. Otherwise, the duration of a time step is the difference to the next one.
+    """
+    bounds_name = ds.time.attrs.get('bounds', 'time_bnds')
+    if bounds_name in ds and ds[bounds_name].shape == (len(ds.time), 2):
+        bounds = ds[bounds_name].values
+        return (bounds[:, 1] - bounds[:, 0]) / np.timedelta64(1, 'D')
+    if len(ds.time) < 2:
+        return np.ones(len(ds.time))
+    durations = np.diff(ds.time.values) / np.timedelta64(1, 'D')
+    return np.append(durations, durations[-1])
+
+
+def _reduce_bins(data, keys: np.ndarray, n_bins: int, method: str, weights: np.ndarray = None):
+    """
+    Reduce the last axis of the numpy or dask array *data* by the sorted bin indexes *keys*.
+    The result's last axis has size *n_bins*.
+    """
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+    if not isinstance(data, da.Array):
+        return _bin_statistic(data, keys, n_bins, method, weights)
+
+    # Rechunk along time such that each chunk holds complete bins, so that chunks can be reduced independently
+    time_chunks = _get_bin_aligned_chunks(keys, max(data.chunks[-1]))
+    data = data.rechunk({data.ndim - 1: time_chunks})
+    bin_chunks = []
+    prev_key = -1
+    stop = 0
+    for size in time_chunks:
+        stop += size
+        # Empty bins between chunks are assigned to the following chunk, empty bins at the end don't exist
+        last_key = keys[stop - 1] if stop < len(keys) else n_bins - 1
+        bin_chunks.append(last_key - prev_key)
+        prev_key = last_key
+    return data.map_blocks(_bin_statistic_block, keys, method, weights,
+                           chunks=data.chunks[:-1] + (tuple(bin_chunks),), dtype=np.float64)
+
+
+def _get_bin_aligned_chunks(keys: np.ndarray, chunk_size: int) -> tuple:
+    """
+    Get chunk sizes along time of at least *chunk_size* time steps that don't split any bin.
+    """
+    bin_sizes = np.bincount(keys)
+    chunks = []
+    size = 0
+    for bin_size in bin_sizes[bin_sizes > 0]:
+        size += bin_size
+        if size >= chunk_size:
+            chunks.append(size)
+            size = 0
+    if size > 0:
+        chunks.append(size)
+    return tuple(chunks)
+
+
+def _bin_statistic_block(values: np.ndarray, keys: np.ndarray, method: str, weights: np.ndarray,
+                         block_info=None) -> np.ndarray:
+    """
+    Apply :py:func:`_bin_statistic` to a chunk of complete bins.
+    """
+    start, stop = block_info[0]['array-location'][-1]
+    n_bins = block_info[None]['chunk-shape'][-1]
+    first_key = keys[start - 1] + 1 if start > 0 else 0
+    return _bin_statistic(values, keys[start:stop] - first_key, n_bins, method,
+                          weights[start:stop] if weights is not None else None)
+
+
+def _bin_statistic(values: np.ndarray, keys: np.ndarray, n_bins: int, method: str,
+                   weights: np.ndarray = None) -> np.ndarray:
+    """
+    Compute the statistic *method* of the valid values of each bin along the last axis.
+    *keys* must be sorted. Empty bins result in NaN.
+    """
+    if method == 'median':
+        return _segment_percentile(values, keys, n_bins, 50.)
+    if method in ('min', 'max'):
+        return _segment_extreme(values, keys, n_bins, np.fmin if method == 'min' else np.fmax)
+
+    result = np.full(values.shape[:-1] + (n_bins,), np.nan)
+    bins, starts = np.unique(keys, return_index=True)
+    if len(bins) == 0:
+        return result
+    valid = ~np.isnan(values)
+    if method == 'prod':
+        result[..., bins] = np.multiply.reduceat(np.where(valid, values, 1.), starts, axis=-1)
+        return result
+    values = np.where(valid, values, 0.)
+    if method == 'sum':
+        result[..., bins] = np.add.reduceat(values, starts, axis=-1, dtype=np.float64)
+        return result
+
+    weights = valid * weights if weights is not None else valid.astype(np.float64)
+    weight_sums = np.add.reduceat(weights, starts, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(weights * values, starts, axis=-1) / weight_sums
+        if method == 'mean':
+            result[..., bins] = means
+            return result
+        # Two-pass variance within the chunk
+        deviations = values - np.repeat(means, np.diff(np.append(starts, len(keys))), axis=-1)
+        variances = np.add.reduceat(weights * deviations * deviations, starts, axis=-1) / weight_sums
+    result[..., bins] = np.sqrt(variances) if method == 'std' else variances
+    return result
+
+
+# Mean lengths in days of the ISO 8601 duration units month and year
+_MEAN_UNIT_DAYS = dict(M=30.436875, Y=365.2425)
+
+
 def _validate_freq(in_res: str, out_res: str) -> None:
     """
     Validate the aggregation step
@@ -432,7 +696,12 @@ def _validate_freq(in_res: str, out_res: str) -> None:
         raise ValidationError('Input dataset is already at the requested output resolution.'
                               ' Execution stopped.')
 
-    in_delta = pd.Timedelta(count, unit=in_res[-1])
+    unit = in_res[-1]
+    if unit in _MEAN_UNIT_DAYS:
+        # pandas no longer supports the ambiguous units month and year, use their mean lengths
+        in_delta = pd.Timedelta(days=count * _MEAN_UNIT_DAYS[unit])
+    else:
+        in_delta = pd.Timedelta(count, unit=unit)
     out_delta = dates[1] - dates[0]
 
     if out_delta < in_delta:
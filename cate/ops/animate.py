@@ -45,7 +45,11 @@ Supported formats: html
 
 """
 
+import collections
+import multiprocessing
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 # noinspection PyBroadException
 # try:
@@ -56,7 +60,8 @@ import os
 #     has_qt5agg = False
 
 import matplotlib.animation as animation
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 import cartopy.crs as ccrs
 import xarray as xr
@@ -72,6 +77,10 @@ from cate.ops.plot_helpers import (get_var_data,
 
 ANIMATION_FILE_FILTER = dict(name='Animation Outputs', extensions=['html', ])
 
+# Size in inches and resolution of animation frames
+_FIGURE_SIZE = (8, 4)
+_FIGURE_DPI = 100
+
 
 @op(tags=['plot'], res_pattern='animation_{index}')
 @op_input('ds')
@@ -172,6 +181,63 @@ def animate_map(ds: xr.Dataset,
         raise ValidationError('The minimum dataset spatial dimensions to create a map'
                               ' plot are (2,2)')
 
+    # Fail early on an illegal projection, before any frame is rendered
+    _get_projection(projection, central_lon)
+
+    if not animate_dim:
+        animate_dim = 'time'
+
+    indexers[animate_dim] = var[animate_dim][0]
+
+    var_data = get_var_data(var, indexers, remaining_dims=('lon', 'lat'))
+
+    num_frames = len(var[animate_dim])
+    with monitor.starting("animate", num_frames + 3):
+        if true_range:
+            data_min, data_max = _get_min_max(var, monitor=monitor)
+        else:
+            data_min, data_max = _get_min_max(var_data, monitor=monitor)
+
+        cmap_params = determine_cmap_params(data_min, data_max, **cmap_params)
+        plot_kwargs = {**properties, **cmap_params}
+        render_kwargs = dict(projection=projection,
+                             central_lon=central_lon,
+                             extents=extents,
+                             title=title,
+                             contour_plot=contour_plot,
+                             plot_kwargs=plot_kwargs)
+
+        def get_frames():
+            # Only the loaded 2-D slice of a frame is sent to a worker
+            for value in var[animate_dim]:
+                indexers[animate_dim] = value
+                yield get_var_data(var, indexers, remaining_dims=('lon', 'lat')).load()
+
+        figure = Figure(figsize=_FIGURE_SIZE, dpi=_FIGURE_DPI)
+        FigureCanvasAgg(figure)
+        image = figure.figimage(np.zeros((1, 1, 4), dtype=np.uint8))
+        writer = animation.HTMLWriter(fps=1000 / interval, embed_frames=True, default_mode='once')
+
+        def write_frame(rgba: np.ndarray):
+            image.set_data(rgba)
+            writer.grab_frame()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            html_file = os.path.join(tmp_dir, 'animation.html')
+            with writer.saving(figure, html_file, dpi=_FIGURE_DPI):
+                _render_frames(get_frames(), num_frames, render_kwargs, write_frame, monitor)
+            with open(html_file) as fp:
+                anim_html = fp.read()
+
+        if file:
+            with open(file, 'w') as outfile:
+                outfile.write(anim_html)
+        monitor.progress(1)
+
+    return HTML(anim_html)
+
+
+def _get_projection(projection: str, central_lon: float):
     # See http://scitools.org.uk/cartopy/docs/v0.15/crs/projections.html#
     if projection == 'PlateCarree':
         proj = ccrs.PlateCarree(central_longitude=central_lon)
@@ -195,80 +261,75 @@ def animate_map(ds: xr.Dataset,
         proj = ccrs.SouthPolarStereo(central_longitude=central_lon)
     else:
         raise ValidationError('illegal projection: "%s"' % projection)
+    return proj
 
-    figure = plt.figure(figsize=(8, 4))
-    ax = plt.axes(projection=proj)
-    if extents:
-        ax.set_extent(extents, ccrs.PlateCarree())
-    else:
-        ax.set_global()
-
-    ax.coastlines()
-
-    if not animate_dim:
-        animate_dim = 'time'
-
-    indexers[animate_dim] = var[animate_dim][0]
-
-    var_data = get_var_data(var, indexers, remaining_dims=('lon', 'lat'))
 
-    with monitor.starting("animate", len(var[animate_dim]) + 3):
-        if true_range:
-            data_min, data_max = _get_min_max(var, monitor=monitor)
-        else:
-            data_min, data_max = _get_min_max(var_data, monitor=monitor)
-
-        cmap_params = determine_cmap_params(data_min, data_max, **cmap_params)
-        plot_kwargs = {**properties, **cmap_params}
-
-        # Plot the first frame to set-up the axes with the colorbar properly
-        # transform keyword is for the coordinate our data is in, which in case of a
-        # 'normal' lat/lon dataset is PlateCarree.
-        if contour_plot:
-            var_data.plot.contourf(ax=ax, transform=ccrs.PlateCarree(), subplot_kws={'projection': proj},
-                                   add_colorbar=True, **plot_kwargs)
-        else:
-            var_data.plot.pcolormesh(ax=ax, transform=ccrs.PlateCarree(), subplot_kws={'projection': proj},
-                                     add_colorbar=True, **plot_kwargs)
-        if title:
-            ax.set_title(title)
-        figure.tight_layout()
-        monitor.progress(1)
+def _render_frames(frames, num_frames: int, render_kwargs: dict, on_frame, monitor: Monitor, max_workers: int = None):
+    """
+    Render the 2-D data arrays in *frames* and pass the resulting RGBA images to *on_frame*, in order.
 
-        def run(value):
-            ax.clear()
-            if extents:
-                ax.set_extent(extents, ccrs.PlateCarree())
-            else:
-                ax.set_global()
-            ax.coastlines()
-            indexers[animate_dim] = value
-            var_data = get_var_data(var, indexers, remaining_dims=('lon', 'lat'))
-            var_data.plot.contourf(ax=ax, transform=ccrs.PlateCarree(), subplot_kws={'projection': proj},
-                                   add_colorbar=False, **plot_kwargs)
-            if title:
-                ax.set_title(title)
+    Frames are rendered in a pool of worker processes. At most two frames per worker are
+    submitted ahead of the frame being encoded, so only a few slices are held in memory.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, num_frames)
+
+    if max_workers <= 1:
+        for frame in frames:
+            monitor.check_for_cancellation()
+            on_frame(_render_frame(frame, **render_kwargs))
             monitor.progress(1)
-            return ax
-        anim = animation.FuncAnimation(figure, run, [i for i in var[animate_dim]],
-                                       interval=interval, blit=False, repeat=False)
-        anim_html = anim.to_jshtml()
+        return
 
-        # Prevent the animation for running after it's finished
-        del anim
+    # Use fresh interpreters, forking a process running dask threads is not safe
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = collections.deque()
+        for frame in frames:
+            monitor.check_for_cancellation()
+            pending.append(executor.submit(_render_frame, frame, **render_kwargs))
+            if len(pending) >= 2 * max_workers:
+                on_frame(pending.popleft().result())
+                monitor.progress(1)
+        while pending:
+            monitor.check_for_cancellation()
+            on_frame(pending.popleft().result())
+            monitor.progress(1)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
-        # Delete the rogue temp-file
-        try:
-            os.remove('None0000000.png')
-        except FileNotFoundError:
-            pass
 
-        if file:
-            with open(file, 'w') as outfile:
-                outfile.write(anim_html)
-                monitor.progress(1)
+def _render_frame(var_data: xr.DataArray,
+                  projection: str,
+                  central_lon: float,
+                  extents,
+                  title: str,
+                  contour_plot: bool,
+                  plot_kwargs: dict) -> np.ndarray:
+    """
+    Render a single animation frame with the Agg backend and return it as RGBA image.
+    """
+    figure = Figure(figsize=_FIGURE_SIZE, dpi=_FIGURE_DPI)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(projection=_get_projection(projection, central_lon))
+    if extents:
+        ax.set_extent(extents, ccrs.PlateCarree())
+    else:
+        ax.set_global()
+    ax.coastlines()
 
-    return HTML(anim_html)
+    # transform keyword is for the coordinate our data is in, which in case of a
+    # 'normal' lat/lon dataset is PlateCarree.
+    if contour_plot:
+        var_data.plot.contourf(ax=ax, transform=ccrs.PlateCarree(), add_colorbar=True, **plot_kwargs)
+    else:
+        var_data.plot.pcolormesh(ax=ax, transform=ccrs.PlateCarree(), add_colorbar=True, **plot_kwargs)
+    if title:
+        ax.set_title(title)
+    figure.tight_layout()
+    figure.canvas.draw()
+    return np.array(figure.canvas.buffer_rgba())
 
 
 def _get_min_max(data, monitor=None):
@@ -28,12 +28,16 @@ Anomaly calculation operations
 Functions
 =========
 """
+import functools
+import os
+
+import numpy as np
 import xarray as xr
 
 from cate.core.op import op, op_return, op_input
 from cate.util.monitor import Monitor
 from cate.ops.subset import subset_spatial, subset_temporal
-from cate.ops.arithmetics import diff, ds_arithmetics
+from cate.ops.arithmetics import ds_arithmetics
 from cate.core.types import TimeRangeLike, PolygonLike, ValidationError
 from cate.ops.normalize import adjust_spatial_attrs, adjust_temporal_attrs
 
@@ -71,10 +75,10 @@ def anomaly_external(ds: xr.Dataset,
     """
     # Check if the time coordinate is of dtype datetime
     try:
-        if ds.time.dtype != 'datetime64[ns]':
+        if not np.issubdtype(ds.time.dtype, np.datetime64):
             raise ValidationError('The dataset provided for anomaly calculation'
                                   ' is required to have a time coordinate of'
-                                  ' dtype datetime64[ns]. Running the normalize'
+                                  ' dtype datetime64. Running the normalize'
                                   ' operation on this dataset might help.')
     except AttributeError:
         raise ValidationError('The dataset provided for anomaly calculation'
@@ -83,68 +87,70 @@ def anomaly_external(ds: xr.Dataset,
     try:
         if ds.attrs['time_coverage_resolution'] != 'P1M':
             raise ValidationError('anomaly_external expects a monthly dataset'
-                                  ' got: {} instead.'.format(ds.attrs['time_coverate_resolution']))
+                                  ' got: {} instead.'.format(ds.attrs['time_coverage_resolution']))
     except KeyError:
         try:
             ds = adjust_temporal_attrs(ds)
             if ds.attrs['time_coverage_resolution'] != 'P1M':
                 raise ValidationError('anomaly_external expects a monthly dataset'
-                                      ' got: {} instead.'.format(ds.attrs['time_coverate_resolution']))
+                                      ' got: {} instead.'.format(ds.attrs['time_coverage_resolution']))
         except KeyError:
             raise ValidationError('Could not determine temporal resolution of'
                                   ' of the given input dataset.')
 
-    clim = xr.open_dataset(file)
-    try:
-        if len(clim.time) != 12:
-            raise ValidationError('The reference dataset is expected to be a '
-                                  'monthly climatology. The provided dataset has'
-                                  ' a time dimension with length: {}'.format(len(clim.time)))
-    except AttributeError:
-        raise ValidationError('The reference dataset is required to '
-                              'have a time coordinate.')
+    clim = _get_climatology(file)
 
     ret = ds.copy()
     if transform:
         ret = ds_arithmetics(ds, transform)
-    # Group by months, subtract the appropriate slice from the reference
-    # Note that this requires that 'time' coordinate labels are of type
-    # datetime64[ns]
-    total_work = 100
-    step = 100 / 12
 
+    total_work = 100
     with monitor.starting('Anomaly', total_work=total_work):
         monitor.progress(work=0)
-        kwargs = {'ref': clim, 'monitor': monitor, 'step': step}
-        ret = ret.groupby(ds['time.month']).apply(_group_anomaly,
-                                                  **kwargs)
+        # Stretch the reference along the time axis of the dataset by indexing it with the month of
+        # each time step, so that the anomaly is a simple elementwise difference
+        month_index = ds.time.dt.month.values - 1
+        if ret.chunks:
+            # Each chunk of the reference is a view of a single month
+            ref = clim.chunk({'time': 1}).isel(time=month_index)
+            ref = ref.chunk({'time': ret.chunksizes.get('time', -1)})
+        else:
+            ref = clim.isel(time=month_index)
+        ref = ref.assign_coords(time=ds.time)
+        monitor.progress(work=total_work / 2)
+        # In case spatial extents differ, the difference is computed on the intersection
+        ret = ret - ref
+        monitor.progress(work=total_work / 2)
 
-    # Running groupby results in a redundant 'month' variable being added to
-    # the dataset
-    ret = ret.drop('month')
     ret.attrs = ds.attrs
     # The dataset may be cropped
     return adjust_spatial_attrs(ret)
 
 
-def _group_anomaly(group: xr.Dataset,
-                   ref: xr.Dataset,
-                   monitor: Monitor = Monitor.NONE,
-                   step: float = None):
+def _get_climatology(file: str) -> xr.Dataset:
     """
-    Calculate anomaly for the given group.
+    Get the monthly climatology stored in *file*. Climatologies are opened once and
+    kept in memory until the file changes.
 
-    :param group: Result of a groupby('time.month') operation
-    :param ref: Reference dataset
-    :param monitor: Monitor of the parent method
-    :param step: Step to add to monitor progress
-    :return: Group dataset with anomaly calculation applied
+    :param file: Path to reference data file
+    :return: The climatology, must not be modified
     """
-    # Retrieve the month of the current group
-    month = group['time.month'][0].values
-    ret = diff(group, ref.isel(time=month - 1))
-    monitor.progress(work=step)
-    return ret
+    stat = os.stat(file)
+    return _open_climatology(os.path.abspath(file), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _open_climatology(file: str, mtime: int, size: int) -> xr.Dataset:
+    with xr.open_dataset(file) as clim:
+        try:
+            if len(clim.time) != 12:
+                raise ValidationError('The reference dataset is expected to be a '
+                                      'monthly climatology. The provided dataset has'
+                                      ' a time dimension with length: {}'.format(len(clim.time)))
+        except AttributeError:
+            raise ValidationError('The reference dataset is required to '
+                                  'have a time coordinate.')
+        return clim.load()
 
 
 @op(tags=['anomaly'], version='1.0')
@@ -28,9 +28,11 @@ Arithmetic operations
 Functions
 =========
 """
+import ast
 import math
-from typing import Dict, Any, Mapping, Tuple
+from typing import Dict, Any, Mapping, Tuple, List, Callable, Optional
 
+import dask.array as da
 import geopandas
 import geopandas as gpd
 import numpy
@@ -47,6 +49,12 @@ from cate.core.types import DatasetLike, ValidationError, DataFrameLike
 from cate.util.monitor import Monitor
 from cate.util.safe import safe_exec
 
+try:
+    # noinspection PyUnresolvedReferences,PyPackageRequirements
+    import numexpr
+except ImportError:
+    numexpr = None
+
 
 @op(tags=['arithmetic'], version='1.0')
 @op_input('ds', data_type=DatasetLike)
@@ -71,7 +79,8 @@ def ds_arithmetics(ds: DatasetLike.TYPE,
         log1p - log(1+x)
         exp - the exponential
 
-    The operations will be applied element-wise to all arrays of the dataset.
+    The operations will be applied element-wise to all arrays of the dataset,
+    in a single pass per array or per chunk of a dask array.
 
     :param ds: The dataset to which to apply arithmetic operations
     :param op: A comma separated list of arithmetic operations to apply
@@ -79,36 +88,50 @@ def ds_arithmetics(ds: DatasetLike.TYPE,
     :return: The dataset with given arithmetic operations applied
     """
     ds = DatasetLike.convert(ds)
-    retset = ds
-    with monitor.starting('Calculate result', total_work=len(op.split(','))):
-        for item in op.split(','):
+    operations = _parse_arithmetics(op)
+    retset = ds.copy()
+    with monitor.starting('Calculate result', total_work=len(ds.data_vars)):
+        for var_name, var in ds.data_vars.items():
             with monitor.child(1).observing("Calculate"):
-                item = item.strip()
-                if item[0] == '+':
-                    retset = retset + float(item[1:])
-                elif item[0] == '-':
-                    retset = retset - float(item[1:])
-                elif item[0] == '*':
-                    retset = retset * float(item[1:])
-                elif item[0] == '/':
-                    retset = retset / float(item[1:])
-                elif item[:] == 'log':
-                    retset = np.log(retset)
-                elif item[:] == 'log10':
-                    retset = np.log10(retset)
-                elif item[:] == 'log2':
-                    retset = np.log2(retset)
-                elif item[:] == 'log1p':
-                    retset = np.log1p(retset)
-                elif item[:] == 'exp':
-                    retset = np.exp(retset)
+                if isinstance(var.data, da.Array):
+                    # All operations are fused into a single task per chunk
+                    with np.errstate(all='ignore'):
+                        dtype = _apply_arithmetics(np.empty(0, dtype=var.dtype), operations).dtype
+                    data = var.data.map_blocks(_apply_arithmetics, operations=operations, dtype=dtype)
                 else:
-                    raise ValidationError('Arithmetic operation {} not'
-                                          ' implemented.'.format(item[0]))
+                    data = _apply_arithmetics(var.values, operations)
+                retset[var_name] = xr.DataArray(data, dims=var.dims, coords=var.coords, attrs=var.attrs)
 
     return retset
 
 
+_ARITHMETIC_OPERATORS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.true_divide}
+_ARITHMETIC_FUNCTIONS = dict(log=np.log, log10=np.log10, log2=np.log2, log1p=np.log1p, exp=np.exp)
+
+
+def _parse_arithmetics(op: str) -> List[Tuple[Callable, Optional[float]]]:
+    """
+    Parse the arithmetic operations of ds_arithmetics() into a list of (ufunc, operand) pairs.
+    """
+    operations = []
+    for item in op.split(','):
+        item = item.strip()
+        if item[:1] in _ARITHMETIC_OPERATORS:
+            operations.append((_ARITHMETIC_OPERATORS[item[0]], float(item[1:])))
+        elif item in _ARITHMETIC_FUNCTIONS:
+            operations.append((_ARITHMETIC_FUNCTIONS[item], None))
+        else:
+            raise ValidationError('Arithmetic operation {} not'
+                                  ' implemented.'.format(item))
+    return operations
+
+
+def _apply_arithmetics(array: np.ndarray, operations: List[Tuple[Callable, Optional[float]]]) -> np.ndarray:
+    for ufunc, operand in operations:
+        array = ufunc(array) if operand is None else ufunc(array, operand)
+    return array
+
+
 @op(tags=['arithmetic'], version='1.0')
 @op_return(add_history=True)
 def diff(ds: xr.Dataset,
@@ -254,6 +277,10 @@ def compute_dataset(ds: DatasetLike.TYPE,
     Any new variable in *script* whose name does not begin with and underscore ('_') and
     that has an appropriate data type will be added to the new dataset.
 
+    If *script* only comprises assignments of element-wise arithmetic expressions of variables of *ds*
+    with equal dimensions, e.g. ``x = np.sqrt(a) * 2 + np.where(b > 0, b, 0)``, the expressions are
+    evaluated lazily per chunk using ``numexpr``, if installed, otherwise ``numpy``.
+
     The following packages are available in the *script*:
 
     * ``geopandas``, ``gpd``: The ``geopandas`` top-level package (http://geopandas.org/)
@@ -272,7 +299,9 @@ def compute_dataset(ds: DatasetLike.TYPE,
     :param monitor: An optional progress monitor.
     :return: A new dataset object.
     """
-    data_vars = _exec_script(script, (xr.DataArray, np.ndarray, float, int), _ctx, ds, monitor)
+    data_vars = _compile_script(script, ds)
+    if data_vars is None:
+        data_vars = _exec_script(script, (xr.DataArray, np.ndarray, float, int), _ctx, ds, monitor)
 
     if ds is not None and copy:
         new_ds = ds.copy()
@@ -332,3 +361,267 @@ def _exec_script(script: str,
                     elements[name] = element
 
     return elements
+
+
+# Element-wise operators of the expression subset compiled by _compile_script():
+# AST node type -> (numexpr symbol, numpy function)
+_EXPR_OPERATORS = {
+    ast.Add: ('+', np.add),
+    ast.Sub: ('-', np.subtract),
+    ast.Mult: ('*', np.multiply),
+    ast.Div: ('/', np.true_divide),
+    ast.Pow: ('**', np.power),
+    ast.BitAnd: ('&', np.bitwise_and),
+    ast.BitOr: ('|', np.bitwise_or),
+    ast.USub: ('-', np.negative),
+    ast.UAdd: ('+', np.positive),
+    ast.Invert: ('~', np.invert),
+    ast.Lt: ('<', np.less),
+    ast.LtE: ('<=', np.less_equal),
+    ast.Gt: ('>', np.greater),
+    ast.GtE: ('>=', np.greater_equal),
+    ast.Eq: ('==', np.equal),
+    ast.NotEq: ('!=', np.not_equal),
+}
+
+# Element-wise functions of the expression subset: numexpr name -> (number of arguments, numpy function)
+_EXPR_FUNCTIONS = dict(
+    abs=(1, np.abs),
+    sqrt=(1, np.sqrt),
+    exp=(1, np.exp),
+    expm1=(1, np.expm1),
+    log=(1, np.log),
+    log10=(1, np.log10),
+    log1p=(1, np.log1p),
+    sin=(1, np.sin),
+    cos=(1, np.cos),
+    tan=(1, np.tan),
+    arcsin=(1, np.arcsin),
+    arccos=(1, np.arccos),
+    arctan=(1, np.arctan),
+    arctan2=(2, np.arctan2),
+    sinh=(1, np.sinh),
+    cosh=(1, np.cosh),
+    tanh=(1, np.tanh),
+    arcsinh=(1, np.arcsinh),
+    arccosh=(1, np.arccosh),
+    arctanh=(1, np.arctanh),
+    where=(3, np.where),
+)
+
+# Other numpy names of the functions above
+_EXPR_FUNCTION_ALIASES = dict(absolute='abs', asin='arcsin', acos='arccos', atan='arctan', atan2='arctan2',
+                              asinh='arcsinh', acosh='arccosh', atanh='arctanh')
+
+_EXPR_MODULES = dict(np=np, numpy=numpy, math=math)
+
+_EXPR_CONSTANTS = ('pi', 'e', 'inf', 'nan')
+
+
+def _compile_script(script: str, ds: Optional[xr.Dataset]) -> Optional[Dict[str, xr.DataArray]]:
+    """
+    Helper for compute_dataset().
+
+    Compile *script* into lazily evaluated data arrays, if it only comprises assignments of element-wise
+    arithmetic expressions of variables of *ds* that have the same dimensions. The expressions of an
+    assignment are fused and evaluated per chunk with numexpr, if available, otherwise with numpy,
+    so that temporary arrays are never larger than a chunk.
+
+    Return ``None`` for any other script, which is then executed as Python code by _exec_script().
+    """
+    if not isinstance(ds, xr.Dataset) or not script:
+        return None
+    try:
+        statements = ast.parse(script).body
+    except SyntaxError:
+        return None
+
+    assigned = dict()
+    for statement in statements:
+        if not isinstance(statement, ast.Assign) \
+                or len(statement.targets) != 1 \
+                or not isinstance(statement.targets[0], ast.Name):
+            return None
+        expr = _compile_expr(statement.value, assigned, ds)
+        if expr is None or expr[0] == 'const':
+            return None
+        assigned[statement.targets[0].id] = expr
+    if not assigned:
+        return None
+
+    dims = None
+    for expr in assigned.values():
+        for input_name in _get_expr_inputs(expr):
+            var = ds[input_name]
+            if var.dtype.kind not in 'biufc' or (dims is not None and var.dims != dims):
+                return None
+            dims = var.dims
+
+    data_vars = dict()
+    for name, expr in assigned.items():
+        if name.startswith('_'):
+            continue
+        inputs = _get_expr_inputs(expr)
+        constants = dict()
+        expression = _format_numexpr(expr, inputs, constants)
+        try:
+            with np.errstate(all='ignore'):
+                empty_arrays = {input_name: np.empty(0, dtype=ds[input_name].dtype) for input_name in inputs}
+                dtype = np.asarray(_evaluate_expr(expr, empty_arrays)).dtype
+        except Exception:
+            # E.g. an integer constant that overflows the input data type, let the script report it
+            return None
+        kwargs = dict(expr=expr, inputs=inputs, expression=expression, constants=constants, result_dtype=dtype)
+        arrays = [ds[input_name].data for input_name in inputs]
+        if any(isinstance(array, da.Array) for array in arrays):
+            data = da.map_blocks(_evaluate_block, *[da.asarray(array) for array in arrays], dtype=dtype, **kwargs)
+        else:
+            data = _evaluate_block(*arrays, **kwargs)
+        first_var = ds[inputs[0]]
+        attrs = _combine_expr_attrs([ds[input_name].attrs for input_name in inputs])
+        data_vars[name] = xr.DataArray(data, dims=first_var.dims, coords=first_var.coords, attrs=attrs)
+
+    return data_vars
+
+
+def _compile_expr(node: ast.AST, assigned: Mapping[str, tuple], ds: xr.Dataset) -> Optional[tuple]:
+    """
+    Compile the AST *node* into a nested tuple of the form ``('input', var_name)``, ``('const', value)``,
+    ``('op', ast_op_type, *args)`` or ``('call', func_name, *args)``.
+    Return ``None`` if *node* is not part of the supported expression subset.
+    """
+    if isinstance(node, ast.Constant):
+        return ('const', node.value) if isinstance(node.value, (bool, int, float)) else None
+
+    if isinstance(node, ast.Name):
+        if node.id in assigned:
+            return assigned[node.id]
+        return ('input', node.id) if node.id in ds.data_vars else None
+
+    if isinstance(node, ast.Attribute):
+        module = _get_expr_module(node.value, assigned, ds)
+        if module is not None and node.attr in _EXPR_CONSTANTS and hasattr(module, node.attr):
+            return 'const', float(getattr(module, node.attr))
+        return None
+
+    if isinstance(node, ast.Call):
+        if node.keywords or not isinstance(node.func, ast.Attribute):
+            return None
+        # Only numpy functions, math functions don't accept arrays
+        module = _get_expr_module(node.func.value, assigned, ds)
+        func_name = _EXPR_FUNCTION_ALIASES.get(node.func.attr, node.func.attr)
+        if module is None or module is math or not hasattr(module, node.func.attr) \
+                or func_name not in _EXPR_FUNCTIONS or len(node.args) != _EXPR_FUNCTIONS[func_name][0]:
+            return None
+        args = [_compile_expr(arg, assigned, ds) for arg in node.args]
+        return None if None in args else ('call', func_name, *args)
+
+    if isinstance(node, ast.BinOp):
+        op_type, operands = type(node.op), [node.left, node.right]
+    elif isinstance(node, ast.UnaryOp):
+        op_type, operands = type(node.op), [node.operand]
+    elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+        op_type, operands = type(node.ops[0]), [node.left, node.comparators[0]]
+    else:
+        return None
+    if op_type not in _EXPR_OPERATORS:
+        return None
+    args = [_compile_expr(operand, assigned, ds) for operand in operands]
+    if None in args:
+        return None
+    expr = ('op', op_type, *args)
+    if all(arg[0] == 'const' for arg in args):
+        # Fold constant sub-expressions such as "-1" or "2 * np.pi"
+        try:
+            with np.errstate(all='raise'):
+                return 'const', _evaluate_expr(expr, {}).item()
+        except Exception:
+            return None
+    return expr
+
+
+def _combine_expr_attrs(attrs_list: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the attributes of the inputs of an expression like xarray arithmetic does:
+    attributes with the same name but different values are dropped.
+    """
+    attrs = dict()
+    conflicts = set()
+    for input_attrs in attrs_list:
+        for attr_name, value in input_attrs.items():
+            if attr_name in conflicts:
+                continue
+            if attr_name not in attrs:
+                attrs[attr_name] = value
+            elif not np.array_equal(attrs[attr_name], value):
+                del attrs[attr_name]
+                conflicts.add(attr_name)
+    return attrs
+
+
+def _get_expr_module(node: ast.AST, assigned: Mapping[str, tuple], ds: xr.Dataset):
+    if isinstance(node, ast.Name) and node.id not in assigned and node.id not in ds.data_vars:
+        return _EXPR_MODULES.get(node.id)
+    return None
+
+
+def _get_expr_inputs(expr: tuple, inputs: List[str] = None) -> List[str]:
+    """Get the names of the input variables of *expr* in order of their first occurrence."""
+    if inputs is None:
+        inputs = []
+    if expr[0] == 'input':
+        if expr[1] not in inputs:
+            inputs.append(expr[1])
+    elif expr[0] != 'const':
+        for arg in expr[2:]:
+            _get_expr_inputs(arg, inputs)
+    return inputs
+
+
+def _format_numexpr(expr: tuple, inputs: List[str], constants: Dict[str, Any]) -> str:
+    """Format *expr* as numexpr expression. Inputs are named "v<i>", constants are added to *constants*."""
+    if expr[0] == 'input':
+        return 'v%d' % inputs.index(expr[1])
+    if expr[0] == 'const':
+        name = 'c%d' % len(constants)
+        constants[name] = expr[1]
+        return name
+    args = [_format_numexpr(arg, inputs, constants) for arg in expr[2:]]
+    if expr[0] == 'call':
+        return '%s(%s)' % (expr[1], ', '.join(args))
+    symbol = _EXPR_OPERATORS[expr[1]][0]
+    if len(args) == 1:
+        return '(%s%s)' % (symbol, args[0])
+    return '(%s %s %s)' % (args[0], symbol, args[1])
+
+
+def _evaluate_expr(expr: tuple, arrays: Mapping[str, np.ndarray]):
+    """Evaluate *expr* with numpy."""
+    if expr[0] == 'input':
+        return arrays[expr[1]]
+    if expr[0] == 'const':
+        return expr[1]
+    args = [_evaluate_expr(arg, arrays) for arg in expr[2:]]
+    if expr[0] == 'call':
+        return _EXPR_FUNCTIONS[expr[1]][1](*args)
+    return _EXPR_OPERATORS[expr[1]][1](*args)
+
+
+def _evaluate_block(*blocks: np.ndarray,
+                    expr: tuple,
+                    inputs: List[str],
+                    expression: str,
+                    constants: Dict[str, Any],
+                    result_dtype: np.dtype) -> np.ndarray:
+    result = None
+    if numexpr is not None:
+        local_dict = dict(constants)
+        local_dict.update(('v%d' % i, block) for i, block in enumerate(blocks))
+        try:
+            result = numexpr.evaluate(expression, local_dict=local_dict)
+        except (KeyError, NotImplementedError, TypeError, ValueError):
+            # numexpr doesn't support all data types, e.g. unsigned integers
+            result = None
+    if result is None:
+        result = _evaluate_expr(expr, dict(zip(inputs, blocks)))
+    return np.asarray(result).astype(result_dtype, copy=False)
@@ -32,12 +32,19 @@ coregister - coregister two datasets that are defined on pixel-registered grids
 equidistant in lat/lon coordinates.
 
 """
+import functools
+import hashlib
+import logging
+import os
+import tempfile
 from typing import Tuple
 
 import numpy as np
+import scipy.sparse
 import xarray as xr
 import math
 
+from cate.conf import get_regrid_weights_path
 from cate.core.op import op_input, op, op_return
 from cate.core.types import ValidationError
 from cate.util.monitor import Monitor
@@ -45,11 +52,16 @@ from cate.util.monitor import Monitor
 from cate.ops import resampling
 from cate.ops.normalize import adjust_spatial_attrs
 
+_LOG = logging.getLogger('cate')
+
+#: Method code for conservative, area-weighted regridding, used for both up- and downsampling
+_CONSERVATIVE = -1
+
 
 @op(tags=['geometric', 'coregistration'],
-    version='1.1')
-@op_input('method_us', value_set=['nearest', 'linear'])
-@op_input('method_ds', value_set=['first', 'last', 'mean', 'mode', 'var', 'std'])
+    version='1.2')
+@op_input('method_us', value_set=['nearest', 'linear', 'conservative'])
+@op_input('method_ds', value_set=['first', 'last', 'mean', 'mode', 'var', 'std', 'conservative'])
 @op_return(add_history=True)
 def coregister(ds_master: xr.Dataset,
                ds_replica: xr.Dataset,
@@ -79,6 +91,13 @@ def coregister(ds_master: xr.Dataset,
     Whether upsampling or downsampling has to be performed is determined automatically
     based on the relationship of the grids of the provided datasets.
 
+    If *method_us* or *method_ds* is 'conservative', the replica dataset is regridded
+    conservatively in both directions. Each target grid cell then is the mean of the
+    valid replica grid cells it overlaps, weighted by the area of the overlap on the sphere.
+    Use this method for fluxes or precipitation. The overlap weights are computed once per
+    pair of grids and cached in the directory given by the configuration parameter
+    ``regrid_weights_path``.
+
     :param ds_master: The dataset whose grid is used for resampling
     :param ds_replica: The dataset that will be resampled
     :param method_us: Interpolation method to use for upsampling.
@@ -138,8 +157,9 @@ def coregister(ds_master: xr.Dataset,
                                   ' coregistration'.format(array[0]))
 
     # Co-register
-    methods_us = {'nearest': 10, 'linear': 11}
-    methods_ds = {'first': 50, 'last': 51, 'mean': 54, 'mode': 56, 'var': 57, 'std': 58}
+    methods_us = {'nearest': 10, 'linear': 11, 'conservative': _CONSERVATIVE}
+    methods_ds = {'first': 50, 'last': 51, 'mean': 54, 'mode': 56, 'var': 57, 'std': 58,
+                  'conservative': _CONSERVATIVE}
 
     return _resample_dataset(ds_master, ds_replica, methods_us[method_us], methods_ds[method_ds], monitor)
 
@@ -197,28 +217,149 @@ def _within_bounds(array: np.ndarray, low_bound) -> bool:
     return (array[0] >= low_bound and array[-1] <= abs(low_bound))
 
 
-def _resample_slice(arr_slice: xr.DataArray, w: int, h: int, ds_method: int, us_method: int,
-                    parent_monitor: Monitor) -> xr.DataArray:
+def _resample_block(block: np.ndarray, w: int, h: int, ds_method: int, us_method: int) -> np.ndarray:
     """
-    Resample a single time slice of a larger xr.DataArray
+    Resample all spatial slices of a block whose last two dimensions are lat and lon.
 
-    :param arr_slice: xr.DataArray single slice
+    :param block: numpy array with lat and lon as last dimensions
     :param w: The desired new width (amount of longitudes)
     :param h: The desired new height (amount of latitudes)
     :param ds_method: Downsampling method, see resampling.py
     :param us_method: Upsampling method, see resampling.py
-    :param parent_monitor: the parent progress monitor.
-    :return: resampled slice
+    :return: resampled block
     """
-    monitor = parent_monitor.child(1)
-    with monitor.observing("resample slice"):
-        # In some cases the grouped dimension is not automatically squeezed out
-        result = resampling.resample_2d(np.ma.masked_invalid(arr_slice.squeeze().values),
-                                        w,
-                                        h,
-                                        ds_method,
-                                        us_method)
-        return xr.DataArray(result)
+    resampler = resampling.get_resampler(block.shape[-2:], (h, w), ds_method, us_method)
+    return resampler.resample(block, fill_value=np.nan)
+
+
+def _regrid_block(block: np.ndarray,
+                  lat_weights: scipy.sparse.csr_matrix,
+                  lon_weights: scipy.sparse.csr_matrix) -> np.ndarray:
+    """
+    Conservatively regrid all spatial slices of a block whose last two dimensions are lat and lon.
+
+    :param block: numpy array with lat and lon as last dimensions
+    :param lat_weights: sparse matrix of overlap weights of shape (new lat size, lat size)
+    :param lon_weights: sparse matrix of overlap weights of shape (new lon size, lon size)
+    :return: regridded block
+    """
+    height, width = lat_weights.shape[0], lon_weights.shape[0]
+    data = block.reshape((-1,) + block.shape[-2:])
+    valid = np.isfinite(data)
+    if valid.all():
+        values_sum = _apply_weights(data, lat_weights, lon_weights)
+        weights_sum = np.outer(np.asarray(lat_weights.sum(axis=1)).ravel(),
+                               np.asarray(lon_weights.sum(axis=1)).ravel())
+    else:
+        values_sum = _apply_weights(np.where(valid, data, 0.), lat_weights, lon_weights)
+        weights_sum = _apply_weights(valid.astype(np.float64), lat_weights, lon_weights)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(weights_sum > 0., values_sum / weights_sum, np.nan)
+    return result.astype(block.dtype, copy=False).reshape(block.shape[:-2] + (height, width))
+
+
+def _apply_weights(data: np.ndarray,
+                   lat_weights: scipy.sparse.csr_matrix,
+                   lon_weights: scipy.sparse.csr_matrix) -> np.ndarray:
+    """
+    Compute lat_weights x slice x lon_weights^T for all slices of a 3D array.
+    """
+    n, h, w = data.shape
+    result = (lon_weights @ data.reshape(n * h, w).T).T
+    result = result.reshape(n, h, -1).transpose(1, 0, 2).reshape(h, -1)
+    result = lat_weights @ result
+    return result.reshape(result.shape[0], n, -1).transpose(1, 0, 2)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_conservative_weights(src_lat: Tuple[float, ...],
+                              src_lon: Tuple[float, ...],
+                              dst_lat: Tuple[float, ...],
+                              dst_lon: Tuple[float, ...]) -> Tuple[scipy.sparse.csr_matrix, scipy.sparse.csr_matrix]:
+    """
+    Get the overlap weights for conservative regridding between two pixel-registered, equidistant lat/lon grids.
+
+    The area of the overlap of two grid cells on the sphere is proportional to the product of their
+    overlap in sine of latitude and their overlap in longitude, so the 2D weight matrix is the
+    Kronecker product of a lat and a lon weight matrix. Only these two sparse factors are computed
+    and stored. They are cached in memory and in the directory given by ``regrid_weights_path``
+    under a hash of the grid coordinates.
+
+    :param src_lat: latitudes of the source grid
+    :param src_lon: longitudes of the source grid
+    :param dst_lat: latitudes of the target grid
+    :param dst_lon: longitudes of the target grid
+    :return: tuple (lat_weights, lon_weights) of sparse matrices of shapes (dst size, src size)
+    """
+    grids = [np.array(coords, dtype=np.float64) for coords in (src_lat, src_lon, dst_lat, dst_lon)]
+    grid_hash = hashlib.sha1()
+    for coords in grids:
+        grid_hash.update(str(coords.size).encode('utf-8'))
+        grid_hash.update(coords.tobytes())
+    file_path = os.path.join(get_regrid_weights_path(), 'conservative-{}.npz'.format(grid_hash.hexdigest()))
+
+    if os.path.isfile(file_path):
+        try:
+            with np.load(file_path) as npz:
+                return tuple(scipy.sparse.csr_matrix((npz[name + '_data'], npz[name + '_indices'], npz[name + '_indptr']),
+                                                     shape=tuple(npz[name + '_shape']))
+                             for name in ('lat', 'lon'))
+        except (OSError, ValueError, KeyError) as e:
+            _LOG.warning('ignoring invalid regridding weights file {}: {}'.format(file_path, e))
+
+    src_lat, src_lon, dst_lat, dst_lon = grids
+    weights = (_get_overlap_weights(src_lat, dst_lat, lambda lat: np.sin(np.deg2rad(np.clip(lat, -90., 90.)))),
+               _get_overlap_weights(src_lon, dst_lon, lambda lon: lon))
+
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        arrays = {}
+        for name, matrix in zip(('lat', 'lon'), weights):
+            arrays[name + '_data'] = matrix.data
+            arrays[name + '_indices'] = matrix.indices
+            arrays[name + '_indptr'] = matrix.indptr
+            arrays[name + '_shape'] = np.array(matrix.shape)
+        # Write into temporary file first, so that concurrent readers never see incomplete files
+        fd, temp_path = tempfile.mkstemp(suffix='.npz', dir=dir_path)
+        with os.fdopen(fd, 'wb') as fp:
+            np.savez(fp, **arrays)
+        os.replace(temp_path, file_path)
+    except OSError as e:
+        _LOG.warning('failed to write regridding weights file {}: {}'.format(file_path, e))
+
+    return weights
+
+
+def _get_overlap_weights(src_coords: np.ndarray, dst_coords: np.ndarray, transform) -> scipy.sparse.csr_matrix:
+    """
+    Compute the overlaps of the pixels of two pixel-registered, equidistant 1D grids.
+
+    :param src_coords: pixel centers of the source grid
+    :param dst_coords: pixel centers of the target grid
+    :param transform: function that transforms coordinates, overlaps are computed in transformed coordinates
+    :return: sparse matrix of shape (dst size, src size)
+    """
+    src_step = abs(src_coords[1] - src_coords[0])
+    dst_step = abs(dst_coords[1] - dst_coords[0])
+    src_order = np.argsort(src_coords)
+    src_lo = src_coords[src_order] - src_step / 2
+    src_hi = src_coords[src_order] + src_step / 2
+    dst_lo = dst_coords - dst_step / 2
+    dst_hi = dst_coords + dst_step / 2
+
+    # Range of overlapping (sorted) source pixels for every target pixel
+    start = np.searchsorted(src_hi, dst_lo, side='right')
+    stop = np.searchsorted(src_lo, dst_hi, side='left')
+    counts = np.maximum(stop - start, 0)
+    rows = np.repeat(np.arange(dst_coords.size), counts)
+    cols = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    overlap = (transform(np.minimum(src_hi[cols], dst_hi[rows]))
+               - transform(np.maximum(src_lo[cols], dst_lo[rows])))
+    # Ignore overlaps caused by rounding errors
+    keep = overlap > 1e-6 * (transform(src_hi[cols]) - transform(src_lo[cols]))
+    return scipy.sparse.csr_matrix((overlap[keep], (rows[keep], src_order[cols[keep]])),
+                                   shape=(dst_coords.size, src_coords.size))
 
 
 def _resample_array(array: xr.DataArray, lon: xr.DataArray, lat: xr.DataArray, method_us: int,
@@ -226,11 +367,14 @@ def _resample_array(array: xr.DataArray, lon: xr.DataArray, lat: xr.DataArray, m
     """
     Resample the given xr.DataArray to a new grid defined by lat and lon
 
+    The resampling is lazy, the spatial slices of each chunk of the given array are
+    resampled when the result is computed. Chunks are processed in parallel.
+
     :param array: xr.DataArray with lat,lon and time coordinates
     :param lat: 'lat' xr.DataArray attribute for the new grid
     :param lon: 'lon' xr.DataArray attribute for the new grid
-    :param method_us: Interpolation method to use for upsampling, see resampling.py
-    :param method_ds: Interpolation method to use for downsampling, see resampling.py
+    :param method_us: Interpolation method to use for upsampling, see resampling.py, or _CONSERVATIVE
+    :param method_ds: Interpolation method to use for downsampling, see resampling.py, or _CONSERVATIVE
     :param parent_monitor: the parent progress monitor.
     :return: The resampled array
     """
@@ -240,41 +384,44 @@ def _resample_array(array: xr.DataArray, lon: xr.DataArray, lat: xr.DataArray, m
 
     monitor = parent_monitor.child(1)
 
-    kwargs = {'w': width, 'h': height, 'ds_method': method_ds, 'us_method': method_us, 'parent_monitor': monitor}
-
-    groupby_list = list(array.dims)
-    for dim in ['lon', 'lat']:
-        groupby_list.remove(dim)
-
-    if 0 == len(groupby_list):
-        # a 2d dataset, can't do groupby => do a simple slice resample
-        with monitor.starting("coregister dataarray", total_work=1):
-            temp_array = _resample_slice(array, **kwargs)
-            coords = {'lat': lat, 'lon': lon}
-            return xr.DataArray(temp_array.values,
-                                name=array.name,
-                                dims=array.dims,
-                                coords=coords,
-                                attrs=array.attrs).chunk()
-
-    num_steps = 1
-    for dim in groupby_list:
-        num_steps = num_steps * len(array[dim])
-
-    with monitor.starting("coregister dataarray", total_work=num_steps):
-        temp_array = _nested_groupby_apply(array, groupby_list, _resample_slice, kwargs)
-        chunks = {'lat': height, 'lon': width}
-        coords = {'lat': lat, 'lon': lon}
-        for dim in groupby_list:
-            coords[dim] = array[dim]
-            # One spatial slice is one dask chunk, e.g. chunking is
-            # (1,1,1..1,len(lat),len(lon))
-            chunks[dim] = 1
-        return xr.DataArray(temp_array.values,
-                            name=array.name,
-                            dims=array.dims,
-                            coords=coords,
-                            attrs=array.attrs).chunk(chunks=chunks)
+    other_dims = [dim for dim in array.dims if dim not in ('lat', 'lon')]
+    dims = other_dims + ['lat', 'lon']
+    array_t = array.transpose(*dims)
+    if array_t.chunks is None:
+        # One spatial slice is one dask chunk, e.g. chunking is
+        # (1,1,1..1,len(lat),len(lon))
+        array_t = array_t.chunk(chunks={dim: 1 for dim in other_dims})
+
+    data = array_t.data
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+    # Spatial slices must not be split between chunks
+    data = data.rechunk({data.ndim - 2: -1, data.ndim - 1: -1})
+
+    if _CONSERVATIVE in (method_us, method_ds):
+        weights = _get_conservative_weights(tuple(array['lat'].values.tolist()),
+                                            tuple(array['lon'].values.tolist()),
+                                            tuple(lat.values.tolist()),
+                                            tuple(lon.values.tolist()))
+        block_fn, args = _regrid_block, weights
+    else:
+        block_fn, args = _resample_block, (width, height, method_ds, method_us)
+
+    with monitor.starting("coregister dataarray", total_work=1):
+        data = data.map_blocks(block_fn, *args,
+                               chunks=data.chunks[:-2] + ((height,), (width,)),
+                               dtype=data.dtype)
+        monitor.progress(work=1)
+
+    coords = {name: coord for name, coord in array.coords.items()
+              if 'lat' not in coord.dims and 'lon' not in coord.dims}
+    coords['lat'] = lat
+    coords['lon'] = lon
+    return xr.DataArray(data,
+                        name=array.name,
+                        dims=dims,
+                        coords=coords,
+                        attrs=array.attrs).transpose(*array.dims)
 
 
 def _resample_dataset(ds_master: xr.Dataset, ds_replica: xr.Dataset, method_us: int, method_ds: int, monitor: Monitor) -> xr.Dataset:
@@ -400,25 +547,3 @@ def _find_intersection(first: np.ndarray,
                               ' coregistration on')
 
     return (minimum, maximum)
-
-
-def _nested_groupby_apply(array: xr.DataArray,
-                          groupby: list,
-                          apply_fn: object,
-                          kwargs: dict):
-    """
-    Perform a nested groupby over given dimensions and apply a function on the
-    last 'slice'
-
-    :param array: xr.DataArray to perform groupby on
-    :param groupby: a list of coordinate labels over which to perform groupby
-    :param apply_fn: The function to apply
-    :return: groupby-split-appy result
-    """
-    if len(groupby) == 1:
-        return array.groupby(groupby[0], squeeze=True).apply(apply_fn, **kwargs)
-    else:
-        return array.groupby(groupby[0], squeeze=True).apply(_nested_groupby_apply,
-                                                             groupby=groupby[1:],
-                                                             apply_fn=apply_fn,
-                                                             kwargs=kwargs)
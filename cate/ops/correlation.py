@@ -123,11 +123,13 @@ def pearson_correlation_scalar(ds_x: DatasetLike.TYPE,
 @op_input('ds_y', data_type=DatasetLike)
 @op_input('var_x', value_set_source='ds_x', data_type=VarName)
 @op_input('var_y', value_set_source='ds_y', data_type=VarName)
+@op_input('max_lag', value_range=[0, 1000])
 @op_return(add_history=True)
 def pearson_correlation(ds_x: DatasetLike.TYPE,
                         ds_y: DatasetLike.TYPE,
                         var_x: VarName.TYPE,
                         var_y: VarName.TYPE,
+                        max_lag: int = 0,
                         monitor: Monitor = Monitor.NONE) -> xr.Dataset:
     """
     Do product moment `Pearson's correlation <http://www.statsoft.com/Textbook/Statistics-Glossary/P/button/p#Pearson%20Correlation>`_ analysis.
@@ -146,6 +148,14 @@ def pearson_correlation(ds_x: DatasetLike.TYPE,
     definition. E.g., it is possible to correlate different times of the same
     area.
 
+    Missing values are excluded pairwise, that is, a time step only contributes
+    to the correlation of a pixel if both 'x' and 'y' are valid at that pixel.
+
+    If *max_lag* is greater than zero, lagged correlations are computed for the
+    lags ``-max_lag, ..., max_lag`` time steps and the returned variables get
+    an additional 'lag' dimension. For a given lag, 'x' at time step ``t`` is
+    correlated with 'y' at time step ``t + lag``.
+
     There are 'x' and 'y' datasets. Positive correlations imply that as x
     grows, so does y. Negative correlations imply that as x increases, y
     decreases.
@@ -158,6 +168,7 @@ def pearson_correlation(ds_x: DatasetLike.TYPE,
     :param ds_y: The 'y' dataset
     :param var_x: Dataset variable to use for correlation analysis in the 'variable' dataset
     :param var_y: Dataset variable to use for correlation analysis in the 'dependent' dataset
+    :param max_lag: Maximum lag in time steps for which to compute lagged correlations.
     :param monitor: a progress monitor.
     :return: a dataset containing a map of correlation coefficients and p_values
     """
@@ -178,7 +189,7 @@ def pearson_correlation(ds_x: DatasetLike.TYPE,
                                   ' of a 3D lon/lat/time dataset and a 1D timeseries'
                                   ' is provided.')
 
-        if array_x.values.shape != array_y.values.shape:
+        if array_x.shape != array_y.shape:
             raise ValidationError(f'The provided variables {var_x} and {var_y} do not have the'
                                   ' same shape, Pearson correlation can not be'
                                   ' performed. Please review operation'
@@ -209,14 +220,18 @@ def pearson_correlation(ds_x: DatasetLike.TYPE,
         raise ValidationError('The length of the time dimension should not be less'
                               ' than three to run the calculation.')
 
+    if max_lag < 0 or len(array_x['time']) - max_lag < 3:
+        raise ValidationError('The maximum lag must not be negative and leave at least'
+                              ' three time steps to run the calculation.')
+
     # Do pixel by pixel correlation
-    retset = _pearsonr(array_x, array_y, monitor)
+    retset = _pearsonr(array_x, array_y, monitor, max_lag=max_lag)
     retset.attrs['Cate_Description'] = f'Correlation between {var_y} {var_x}'
 
     return adjust_spatial_attrs(retset)
 
 
-def _pearsonr(x: xr.DataArray, y: xr.DataArray, monitor: Monitor) -> xr.Dataset:
+def _pearsonr(x: xr.DataArray, y: xr.DataArray, monitor: Monitor, max_lag: int = 0) -> xr.Dataset:
     """
     Calculate Pearson correlation coefficients and p-values for testing
     non-correlation of lon/lat/time xarray datasets for each lon/lat point.
@@ -236,9 +251,15 @@ def _pearsonr(x: xr.DataArray, y: xr.DataArray, monitor: Monitor) -> xr.Dataset:
     as the one computed from these datasets. The p-values are not entirely
     reliable but are probably reasonable for datasets larger than 500 or so.
 
+    The per-pixel sums required for the correlations of all lags are computed
+    in a single pass over the time chunks of x and y, so that no lon/lat/time
+    sized intermediate arrays are ever held in memory if x and y are backed by dask.
+
     :param x: lon/lat/time xr.DataArray
     :param y: xr.DataArray of the same spatiotemporal extents and resolution as x.
     :param monitor: Monitor to use for monitoring the calculation
+    :param max_lag: If greater than zero, compute correlations for the lags -max_lag to max_lag
+    and add a 'lag' dimension to the results.
     :return: A dataset containing the correlation coefficients and p_values on
     the lon/lat grid of x and y.
 
@@ -246,53 +267,73 @@ def _pearsonr(x: xr.DataArray, y: xr.DataArray, monitor: Monitor) -> xr.Dataset:
     ----------
     http://www.statsoft.com/textbook/glosp.html#Pearson%20Correlation
     """
-    with monitor.starting("Calculate Pearson correlation", total_work=6):
-        n = len(x['time'])
-
-        xm, ym = x - x.mean(dim='time'), y - y.mean(dim='time')
-        xm.time.values = [i for i in range(0, len(xm.time))]
-        ym.time.values = [i for i in range(0, len(ym.time))]
-        xm_ym = xm * ym
-        r_num = xm_ym.sum(dim='time')
-        xm_squared = np.square(xm)
-        ym_squared = np.square(ym)
-        r_den = np.sqrt(xm_squared.sum(dim='time') * ym_squared.sum(dim='time'))
-        r_den = r_den.where(r_den != 0)
-        r = r_num / r_den
-
-        # Presumably, if abs(r) > 1, then it is only some small artifact of floating
-        # point arithmetic.
-        # At this point r should be a lon/lat dataArray, so it should be safe to
-        # load it in memory explicitly. This may take time as it will kick-start
-        # deferred processing.
-        # Comparing with NaN produces warnings that can be safely ignored
-        default_warning_settings = np.seterr(invalid='ignore')
-        with monitor.child(1).observing("task 1"):
-            negativ_r = r.values < -1.0
-        with monitor.child(1).observing("task 2"):
-            r.values[negativ_r] = -1.0
-        with monitor.child(1).observing("task 3"):
-            positiv_r = r.values > 1.0
-        with monitor.child(1).observing("task 4"):
-            r.values[positiv_r] = 1.0
-        np.seterr(**default_warning_settings)
-        r.attrs = {'description': 'Correlation coefficients between'
-                   ' {} and {}.'.format(x.name, y.name)}
-
-        df = n - 2
-        t_squared = np.square(r) * (df / ((1.0 - r.where(r != 1)) * (1.0 + r.where(r != -1))))
-
-        prob = df / (df + t_squared)
-        with monitor.child(1).observing("task 5"):
-            prob_values_in = prob.values
-        with monitor.child(1).observing("task 6"):
-            prob.values = betainc(0.5 * df, 0.5, prob_values_in)
+    with monitor.starting("Calculate Pearson correlation", total_work=2):
+        if max_lag > 0:
+            lags = list(range(-max_lag, max_lag + 1))
+            sums = xr.concat([_pearsonr_sums(x, y, lag) for lag in lags], dim=pd.Index(lags, name='lag'))
+        else:
+            sums = _pearsonr_sums(x, y, 0)
+
+        with monitor.child(1).observing("Accumulate sums"):
+            # Computes the sums of all lags in a single pass
+            sums = sums.compute()
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n = sums['n']
+            cov = sums['sum_xy'] - sums['sum_x'] * sums['sum_y'] / n
+            var_x = sums['sum_xx'] - np.square(sums['sum_x']) / n
+            var_y = sums['sum_yy'] - np.square(sums['sum_y']) / n
+            r_den = np.sqrt(var_x * var_y)
+            r = cov / r_den.where(r_den != 0)
+
+            # Presumably, if abs(r) > 1, then it is only some small artifact of floating
+            # point arithmetic.
+            r = r.clip(-1.0, 1.0)
+            r.attrs = {'description': 'Correlation coefficients between'
+                       ' {} and {}.'.format(x.name, y.name)}
+
+            # Equivalent to the t-test used by scipy.stats.pearsonr, t^2 = df * r^2 / (1 - r^2)
+            df = (n - 2).where(n > 2)
+            prob = xr.apply_ufunc(betainc, 0.5 * df, 0.5, 1.0 - np.square(r))
         prob.attrs = {'description': 'Rough indicator of probability of an'
                       ' uncorrelated system producing datasets that have a Pearson'
                       ' correlation at least as extreme as the one computed from'
                       ' these datsets. Not entirely reliable, but reasonable for'
                       ' datasets larger than 500 or so.'}
+        monitor.progress(work=1)
 
         retset = xr.Dataset({'corr_coef': r,
                              'p_value': prob})
     return retset
+
+
+def _pearsonr_sums(x: xr.DataArray, y: xr.DataArray, lag: int) -> xr.Dataset:
+    """
+    Build the per-pixel sums n, sum(x), sum(y), sum(x^2), sum(y^2) and sum(x*y)
+    over all time steps at which both x[t] and y[t + lag] are valid.
+    If x and y are backed by dask, the result is lazy.
+    """
+    n = len(x['time'])
+    x = x.isel(time=slice(max(0, -lag), n - max(0, lag)))
+    y = y.isel(time=slice(max(0, lag), n - max(0, -lag)))
+
+    # Pair values by position, not by time coordinate
+    time_index = np.arange(n - abs(lag))
+    x = x.assign_coords(time=time_index)
+    y = y.assign_coords(time=time_index)
+
+    valid = x.notnull() & y.notnull()
+    x = x.where(valid)
+    y = y.where(valid)
+
+    # Shifting by the value of each pixel at the first time step, if valid, reduces round-off
+    # errors of the sums. The statistics derived from the sums do not depend on the shift.
+    x = x - x.isel(time=0).fillna(0)
+    y = y - y.isel(time=0).fillna(0)
+
+    return xr.Dataset({'n': valid.sum(dim='time'),
+                       'sum_x': x.sum(dim='time'),
+                       'sum_y': y.sum(dim='time'),
+                       'sum_xx': np.square(x).sum(dim='time'),
+                       'sum_yy': np.square(y).sum(dim='time'),
+                       'sum_xy': (x * y).sum(dim='time')})
@@ -30,15 +30,15 @@ Functions
 =========
 """
 
-import functools
 import math
 import warnings
-from typing import Any, Dict, Callable, Optional, Tuple
+from typing import Any, Callable, Optional, Tuple
 
 import pyproj
 import geopandas as gpd
 import numpy as np
 import pandas as pd
+import shapely
 import shapely.geometry
 import shapely.ops
 
@@ -130,25 +130,25 @@ def data_frame_query(df: DataFrameLike.TYPE, query_expr: str) -> pd.DataFrame:
         reprojection_func = _get_reprojection_func(source_crs, target_crs)
 
         def _almost_equals(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.geom_almost_equals, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'almost_equals', geometry, reprojection_func)
 
         def _contains(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.contains, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'contains', geometry, reprojection_func)
 
         def _crosses(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.crosses, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'crosses', geometry, reprojection_func)
 
         def _disjoint(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.disjoint, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'disjoint', geometry, reprojection_func)
 
         def _intersects(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.intersects, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'intersects', geometry, reprojection_func)
 
         def _touches(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.touches, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'touches', geometry, reprojection_func)
 
         def _within(geometry: GeometryLike):
-            return _data_frame_geometry_op(data_frame.geometry.within, geometry, reprojection_func)
+            return _data_frame_geometry_op(data_frame.geometry, 'within', geometry, reprojection_func)
 
         local_dict['almost_equals'] = _almost_equals
         local_dict['contains'] = _contains
@@ -160,7 +160,6 @@ def data_frame_query(df: DataFrameLike.TYPE, query_expr: str) -> pd.DataFrame:
 
     # noinspection PyTypeChecker
     subset_data_frame = data_frame.query(query_expr,
-                                         truediv=True,
                                          local_dict=local_dict,
                                          global_dict={})
 
@@ -204,15 +203,22 @@ def data_frame_subset(gdf: gpd.GeoDataFrame,
     if not var_names and not region:
         return gdf
 
+    if region and region_op:
+        # The region is tested directly against the spatial index of the data frame
+        source_crs = dict(init='epsg:4326')
+        try:
+            target_crs = gdf.crs or source_crs
+        except AttributeError:
+            target_crs = source_crs
+        reprojection_func = _get_reprojection_func(source_crs, target_crs)
+        mask = _data_frame_geometry_op(gdf.geometry, region_op, region, reprojection_func)
+        gdf = _maybe_convert_to_geo_data_frame(gdf, gdf[mask])
+
     if var_names:
         if 'geometry' not in var_names:
             var_names = ['geometry'] + var_names
         gdf = gdf[var_names]
 
-    if region and region_op:
-        geom_str = PolygonLike.format(region)
-        gdf = data_frame_query(gdf, f'@{region_op}("{geom_str}")')
-
     return gdf
 
 
@@ -260,45 +266,31 @@ def data_frame_find_closest(gdf: gpd.GeoDataFrame,
     except AttributeError as e:
         raise ValidationError('Missing default geometry column in data frame.') from e
 
-    num_rows = len(geometries)
-    indexes = list()
-
-    # PERF: Note, this operation may be optimized by computing the great-circle distances using numpy array math!
-
-    total_work = 100
-    num_work_rows = 1 + num_rows // total_work
-    with monitor.starting('Finding closest records', total_work):
-        for i in range(num_rows):
-            geometry = geometries.iloc[i]
-            if geometry is not None:
-                # noinspection PyBroadException
-                try:
-                    representative_point = geometry.representative_point()
-                except BaseException:
-                    # For some geometries shapely.representative_point() raises AttributeError or ValueError.
-                    # E.g. features that span the poles will raise ValueError.
-                    # The quick and dirty solution here is to catch such exceptions and ignore them.
-                    representative_point = None
-                if representative_point is not None:
-                    representative_point = _transform_coordinates(representative_point, reprojection_func)
-                    if representative_point is not None:
-                        # noinspection PyTypeChecker
-                        dist = great_circle_distance(location_point, representative_point)
-                        if dist <= max_dist:
-                            indexes.append((i, dist))
-            if i % num_work_rows == 0:
-                monitor.progress(work=1)
-
-    indexes = sorted(indexes, key=lambda item: item[1])
-    num_results = min(max_results, len(indexes))
-    indexes, distances = zip(*indexes[0:num_results])
-
-    new_gdf = gdf.iloc[list(indexes)]
+    with monitor.starting('Finding closest records', total_work=100):
+        x, y = _get_representative_coordinates(geometries, reprojection_func)
+        monitor.progress(work=80)
+
+        # Records outside the latitude band of width 2 * max_dist cannot be close enough,
+        # NaN coordinates of missing geometries are excluded here, too
+        indexes = np.flatnonzero(np.abs(y - location_point.y) <= max_dist)
+        distances = great_circle_distances(location_point.x, location_point.y, x[indexes], y[indexes])
+        close = distances <= max_dist
+        indexes, distances = indexes[close], distances[close]
+        num_results = min(max_results, len(indexes))
+        if num_results < len(indexes):
+            # Partial sort, only the closest records need to be sorted
+            closest = np.argpartition(distances, num_results - 1)[:num_results]
+            indexes, distances = indexes[closest], distances[closest]
+        order = np.argsort(distances, kind='stable')
+        indexes, distances = indexes[order], distances[order]
+        monitor.progress(work=20)
+
+    new_gdf = gdf.iloc[indexes]
     if not isinstance(new_gdf, gpd.GeoDataFrame):
         new_gdf = gpd.GeoDataFrame(new_gdf, crs=source_crs)
 
     if dist_col_name:
-        new_gdf[dist_col_name] = np.array(distances)
+        new_gdf[dist_col_name] = distances
 
     return new_gdf
 
@@ -349,21 +341,21 @@ def data_frame_aggregate(df: DataFrameLike.TYPE,
     if len(diff) > 0:
         raise ValidationError('Variable(s) ' + ','.join(diff) + ' not aggregatable!')
 
-    try:
-        df['geometry']
-    except KeyError as e:
-        raise ValidationError('Variable geometry not in GEO data frame!') from e
+    if df_is_geo:
+        try:
+            df['geometry']
+        except KeyError as e:
+            raise ValidationError('Variable geometry not in GEO data frame!') from e
 
     # Aggregate columns
     if vns is None:
-        df_buff = df.select_dtypes(include=types_accepted_for_agg).agg(aggregations)
+        df_buff = df.select_dtypes(include=types_accepted_for_agg)
     else:
-        df_buff = df[vns].select_dtypes(include=types_accepted_for_agg).agg(aggregations)
+        df_buff = df[vns].select_dtypes(include=types_accepted_for_agg)
 
     res = {}
     for n in df_buff.columns:
-        for a in aggregations:
-            val = df_buff[n][a]
+        for a, val in zip(aggregations, _aggregate_column(df_buff[n].to_numpy())):
             h = n + '_' + a
             res[h] = [val]
 
@@ -372,28 +364,56 @@ def data_frame_aggregate(df: DataFrameLike.TYPE,
     # Aggregate (union) geometry if GeoDataFrame
     if df_is_geo and aggregate_geometry:
         total_work = 100
-        num_work_rows = 1 + len(df) // total_work
+        geometries = df.geometry[~(df.geometry.isna() | df.geometry.is_empty)]
+        # Sorting along a Hilbert curve makes the geometries of a chunk spatially close
+        order = np.argsort(geometries.hilbert_distance().values) if len(geometries) else []
+        geometries = np.asarray(geometries.values, dtype=object)[order]
+        num_work_rows = 1 + len(geometries) // total_work
         with monitor.starting('Aggregating geometry: ', total_work):
-            multi_polygon = shapely.geometry.MultiPolygon()
-            i = 0
-            for rec in df.geometry:
+            # Union chunks of geometries, then union the partial results. This is much faster
+            # than growing a single geometry row by row.
+            partial_unions = []
+            for i in range(0, len(geometries), num_work_rows):
                 if monitor.is_cancelled():
                     break
-                # noinspection PyBroadException
-                try:
-                    multi_polygon = multi_polygon.union(other=rec)
-                except Exception:
-                    pass
-
-                if i % num_work_rows == 0:
-                    monitor.progress(work=1)
-                i += 1
+                partial_unions.append(_union_geometries(geometries[i:i + num_work_rows]))
+                monitor.progress(work=1)
+            multi_polygon = _union_geometries(np.array(partial_unions, dtype=object))
+            if multi_polygon.is_empty:
+                multi_polygon = shapely.geometry.MultiPolygon()
 
         df_agg = gpd.GeoDataFrame(df_agg, geometry=[multi_polygon], crs=df.crs)
 
     return df_agg
 
 
+def _aggregate_column(values: np.ndarray) -> Tuple:
+    """
+    Compute count, mean, median, sum, std, min, and max of the values of a column, ignoring NaNs
+    like ``pandas.DataFrame.agg``. Integer and boolean minimums, maximums and sums keep their type.
+    """
+    if values.dtype.kind == 'f':
+        values = values[~np.isnan(values)]
+    count = values.size
+    if count == 0:
+        return 0, np.nan, np.nan, values.dtype.type(0), np.nan, np.nan, np.nan
+    float_values = values.astype(np.float64, copy=False)
+    mean = float_values.mean()
+    std = np.sqrt(np.square(float_values - mean).sum() / (count - 1)) if count > 1 else np.nan
+    return count, mean, np.median(float_values), values.sum(), std, values.min(), values.max()
+
+
+def _union_geometries(geometries: np.ndarray) -> shapely.geometry.base.BaseGeometry:
+    """
+    Compute the union of the given geometries, ignoring invalid geometries if the union fails.
+    """
+    # noinspection PyBroadException
+    try:
+        return shapely.union_all(geometries)
+    except Exception:
+        return shapely.union_all(geometries[shapely.is_valid(geometries)])
+
+
 def great_circle_distance(p1: shapely.geometry.Point, p2: shapely.geometry.Point) -> float:
     """
     Compute great-circle distance on a Sphere in degrees.
@@ -432,16 +452,115 @@ def great_circle_distance(p1: shapely.geometry.Point, p2: shapely.geometry.Point
     return math.atan2(y, x) / _DEG2RAD
 
 
-def _data_frame_geometry_op(instance_method,
+def great_circle_distances(lon1: float, lat1: float, lon2: np.ndarray, lat2: np.ndarray) -> np.ndarray:
+    """
+    Compute great-circle distances on a Sphere in degrees from one point to many points.
+    Vectorised version of :py:func:`great_circle_distance`.
+
+    :param lon1: Longitude of the first point in degrees
+    :param lat1: Latitude of the first point in degrees
+    :param lon2: Longitudes of the other points in degrees
+    :param lat2: Latitudes of the other points in degrees
+    :return: Great-circle distances in degrees
+    """
+    phi1 = lat1 * _DEG2RAD
+    phi2 = np.asarray(lat2, dtype=np.float64) * _DEG2RAD
+    dlam = (np.asarray(lon2, dtype=np.float64) - lon1) * _DEG2RAD
+
+    sin_phi1 = math.sin(phi1)
+    cos_phi1 = math.cos(phi1)
+    sin_phi2 = np.sin(phi2)
+    cos_phi2 = np.cos(phi2)
+    cos_dlam = np.cos(dlam)
+
+    dx = cos_phi2 * np.sin(dlam)
+    dy = cos_phi1 * sin_phi2 - sin_phi1 * cos_phi2 * cos_dlam
+
+    y = np.hypot(dx, dy)
+    x = sin_phi1 * sin_phi2 + cos_phi1 * cos_phi2 * cos_dlam
+
+    return np.arctan2(y, x) / _DEG2RAD
+
+
+def _get_representative_coordinates(geometries: gpd.GeoSeries,
+                                    reprojection_func: Optional[ReprojectionFunc]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the coordinates of representative points of all geometries as arrays.
+    Coordinates of missing geometries or geometries without representative point are NaN.
+    """
+    geometries = np.asarray(geometries.values, dtype=object)
+    if not np.all(shapely.get_type_id(geometries) == shapely.GeometryType.POINT):
+        try:
+            geometries = shapely.point_on_surface(geometries)
+        except BaseException:
+            # For some geometries shapely.representative_point() raises AttributeError or ValueError.
+            # E.g. features that span the poles will raise ValueError. Such geometries are ignored.
+            geometries = np.array([_get_representative_point(geometry) for geometry in geometries], dtype=object)
+    # Coordinates of missing and empty geometries are NaN
+    x = shapely.get_x(geometries)
+    y = shapely.get_y(geometries)
+    if reprojection_func is not None:
+        valid = np.isfinite(x) & np.isfinite(y)
+        # noinspection PyBroadException
+        try:
+            x[valid], y[valid] = reprojection_func(x[valid], y[valid])
+        except BaseException as e:
+            warnings.warn(f'coordinate transformation failed: {e}')
+            x[:] = np.nan
+            y[:] = np.nan
+    return x, y
+
+
+def _get_representative_point(geometry: shapely.geometry.base.BaseGeometry) -> Optional[shapely.geometry.Point]:
+    # noinspection PyBroadException
+    try:
+        return geometry.representative_point() if geometry is not None else None
+    except BaseException:
+        return None
+
+
+def _data_frame_geometry_op(geometries: gpd.GeoSeries,
+                            region_op: str,
                             geometry: GeometryLike,
-                            reprojection_func: ReprojectionFunc) -> bool:
+                            reprojection_func: ReprojectionFunc) -> np.ndarray:
+    """
+    Test which of the *geometries* are in the relation *region_op* to the given *geometry*.
+
+    Candidates are looked up by bounding box in the spatial index of *geometries*, which
+    geopandas builds once and caches, and only these candidates are tested exactly.
+
+    :return: A boolean mask of *geometries*.
+    """
+    mask = np.zeros(len(geometries), dtype=bool)
     geometry = GeometryLike.convert(geometry)
     if geometry is None:
-        return False
+        return mask
     geometry = _transform_coordinates(geometry, reprojection_func)
     if geometry is None:
-        return False
-    return instance_method(geometry)
+        return mask
+    if region_op in _TREE_PREDICATES:
+        # The spatial index tests predicate(geometry, feature), hence converse predicates are used
+        mask[geometries.sindex.query(geometry, predicate=_TREE_PREDICATES[region_op])] = True
+    elif region_op == 'disjoint':
+        mask[:] = True
+        mask[geometries.sindex.query(geometry, predicate='intersects')] = False
+    elif region_op == 'almost_equals':
+        # Normalise vertex order and ring orientation, which the conversion of the region may change
+        candidates = geometries.sindex.query(geometry)
+        equal = shapely.equals_exact(shapely.normalize(geometries.values[candidates]), shapely.normalize(geometry),
+                                     tolerance=0.5e-6)
+        mask[candidates[equal]] = True
+    else:
+        raise ValidationError(f'Unknown region operation "{region_op}".')
+    return mask
+
+
+#: Maps a region operation to the converse predicate for spatial index queries
+_TREE_PREDICATES = dict(contains='within',
+                        crosses='crosses',
+                        intersects='intersects',
+                        touches='touches',
+                        within='contains')
 
 
 # Transforms a geometry that is used in an operator for e.g. feature selection purposes. It assures
@@ -461,16 +580,14 @@ def _transform_coordinates(geometry: shapely.geometry.base.BaseGeometry,
 
 # Transforms a geometry that is used in an operator for e.g. feature selection purposes. It assures
 # that both use an identical 'crs' (projection)
-def _get_reprojection_func(source_crs: Dict[str, Any], target_crs: Dict[str, Any]) -> Optional[ReprojectionFunc]:
-    if source_crs and target_crs and source_crs != target_crs:
-        # noinspection PyBroadException,PyTypeChecker
-        return functools.partial(
-            pyproj.transform,
-            pyproj.Proj(**source_crs),  # source coordinate system
-            pyproj.Proj(**target_crs)  # target coordinate system
-        )
-    else:
-        return None
+def _get_reprojection_func(source_crs: Any, target_crs: Any) -> Optional[ReprojectionFunc]:
+    if source_crs and target_crs:
+        source_crs = pyproj.CRS.from_user_input(source_crs)
+        target_crs = pyproj.CRS.from_user_input(target_crs)
+        if source_crs != target_crs:
+            # Coordinates are always given in (x, y) = (lon, lat) order
+            return pyproj.Transformer.from_crs(source_crs, target_crs, always_xy=True).transform
+    return None
 
 
 def _maybe_convert_to_geo_data_frame(data_frame: pd.DataFrame, data_frame_2: pd.DataFrame) -> pd.DataFrame:
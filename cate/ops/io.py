@@ -19,13 +19,16 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import itertools
+import gzip
 import json
 import os.path
 from abc import ABCMeta
 
+import dask
+import dask.array as da
 import fiona
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import xarray as xr
 from cate.core.ds import get_spatial_ext_chunk_sizes
@@ -39,6 +42,9 @@ from cate.util.monitor import Monitor
 
 _ALL_FILE_FILTER = dict(name='All Files', extensions=['*'])
 
+# Maximum number of rows converted into a DataFrame at once by write_csv()
+_CSV_CHUNK_SIZE = 1 << 17
+
 
 @op(tags=['input'], res_pattern='ds_{index}')
 @op_input('ds_id', nullable=False)
@@ -285,12 +291,15 @@ def read_csv(file: FileLike.TYPE,
 @op_input('file',
           data_type=FileLike,
           file_open_mode='w',
-          file_filters=[dict(name='CSV', extensions=['csv', 'txt']), _ALL_FILE_FILTER])
+          file_filters=[dict(name='CSV', extensions=['csv', 'txt']),
+                        dict(name='Compressed CSV', extensions=['gz']),
+                        _ALL_FILE_FILTER])
 @op_input('columns', value_set_source='obj', data_type=VarNamesLike)
 @op_input('na_rep')
 @op_input('delimiter', nullable=True)
 @op_input('quotechar', nullable=True)
 @op_input('more_args', nullable=True, data_type=DictLike)
+@op_input('compress')
 def write_csv(obj: DataFrameLike.TYPE,
               file: FileLike.TYPE,
               columns: VarNamesLike.TYPE = None,
@@ -298,10 +307,15 @@ def write_csv(obj: DataFrameLike.TYPE,
               delimiter: str = ',',
               quotechar: str = None,
               more_args: DictLike.TYPE = None,
+              compress: bool = False,
               monitor: Monitor = Monitor.NONE):
     """
     Write comma-separated values (CSV) to plain text file from a DataFrame or Dataset.
 
+    Datasets are written chunk-wise: the rows are generated in slabs along the first dimension,
+    so that memory consumption is bounded by the chunk size of the variables rather than
+    by the size of the dataset.
+
     :param obj: The object to write as CSV; must be a ``DataFrame`` or a ``Dataset``.
     :param file: The CSV file path.
     :param columns: The names of variables that should be converted to columns. If given,
@@ -312,11 +326,15 @@ def write_csv(obj: DataFrameLike.TYPE,
            Quoted items can include the delimiter and it will be ignored.
     :param more_args: Other optional keyword arguments.
            Please refer to Pandas documentation of ``pandas.to_csv()`` function.
+    :param compress: Whether to write gzip-compressed CSV. Requires *file* to be a file path.
     :param monitor: optional progress monitor
     """
     if obj is None:
         raise ValidationError('obj must not be None')
 
+    if compress and not isinstance(file, str):
+        raise ValidationError('Compressed CSV output requires a file path.')
+
     columns = VarNamesLike.convert(columns)
 
     if isinstance(obj, pd.DataFrame):
@@ -332,6 +350,8 @@ def write_csv(obj: DataFrameLike.TYPE,
             kwargs.update(na_rep=na_rep)
         if quotechar:
             kwargs.update(quotechar=quotechar)
+        if compress:
+            kwargs.update(compression='gzip')
         with monitor.starting('Writing to CSV', 1):
             obj.to_csv(file, index_label='index', **kwargs)
             monitor.progress(1)
@@ -363,41 +383,28 @@ def write_csv(obj: DataFrameLike.TYPE,
                 if coord_var is None:
                     raise ValueError(f'No coordinate variable found for dimension "{dim_name}"')
             coord_vars.append(coord_var)
-        coord_indexes = [range(len(coord_var)) for coord_var in coord_vars]
-        num_coords = len(coord_vars)
-
         num_rows = 1
         for coord_var in coord_vars:
             num_rows *= len(coord_var)
 
-        stream = open(file, 'w') if isinstance(file, str) else file
+        if compress:
+            stream = gzip.open(file, 'wt')
+        else:
+            stream = open(file, 'w') if isinstance(file, str) else file
         try:
-            # Write header row
-            stream.write('index')
-            for i in range(num_coords):
-                stream.write(delimiter)
-                stream.write(coord_vars[i].name)
-            for data_var in data_vars:
-                stream.write(delimiter)
-                stream.write(data_var.name)
-            stream.write('\n')
-
             with monitor.starting('Writing CSV', num_rows):
-                row = 0
-                for index in itertools.product(*coord_indexes):
-                    # Write data row
-                    stream.write(str(row))
-                    for i in range(num_coords):
-                        coord_value = coord_vars[i].values[index[i]]
-                        stream.write(delimiter)
-                        stream.write(str(coord_value))
-                    for data_var in data_vars:
-                        var_value = data_var.values[index]
-                        stream.write(delimiter)
-                        stream.write(str(var_value))
-                    stream.write('\n')
-                    monitor.progress(1)
-                    row += 1
+                header = True
+                for chunk in _iter_csv_chunks(coord_vars, data_vars, num_rows):
+                    chunk.to_csv(stream,
+                                 header=header,
+                                 index=False,
+                                 sep=delimiter,
+                                 # Missing values are written as "nan" unless na_rep is given
+                                 na_rep=na_rep or 'nan',
+                                 quotechar=quotechar or '"',
+                                 lineterminator='\n')
+                    monitor.progress(len(chunk))
+                    header = False
         finally:
             if isinstance(file, str):
                 stream.close()
@@ -408,6 +415,61 @@ def write_csv(obj: DataFrameLike.TYPE,
         raise ValidationError('obj must be a pandas.DataFrame or a xarray.Dataset')
 
 
+def _iter_csv_chunks(coord_vars, data_vars, num_rows, chunk_size=_CSV_CHUNK_SIZE):
+    """
+    Generate the rows of the CSV table for *data_vars* as a sequence of DataFrames
+    of at most *chunk_size* rows, in the order of ``itertools.product()`` over the coordinates.
+    """
+    coord_values = [coord_var.values for coord_var in coord_vars]
+    if num_rows == 0 or not coord_vars:
+        yield _new_csv_chunk(0, coord_vars, coord_values, data_vars, [data_var.values for data_var in data_vars])
+        return
+
+    outer_size = len(coord_values[0])
+    inner_size = num_rows // outer_size
+    step = max(1, chunk_size // inner_size)
+
+    block_sizes = None
+    for data_var in data_vars:
+        if isinstance(data_var.data, da.Array):
+            # Follow the dask chunking, so that every dask block is computed only once
+            block_sizes = data_var.data.chunks[0]
+            break
+    if block_sizes is None:
+        block_sizes = [step] * (outer_size // step) + ([outer_size % step] if outer_size % step else [])
+
+    start = 0
+    for block_size in block_sizes:
+        stop = start + block_size
+        # Compute the block of all variables at once, so that dask can share common inputs
+        block_values = dask.compute(*[data_var.variable[start:stop].data for data_var in data_vars])
+        for i in range(0, block_size, step):
+            j = min(i + step, block_size)
+            yield _new_csv_chunk((start + i) * inner_size,
+                                 coord_vars,
+                                 [coord_values[0][start + i:start + j]] + coord_values[1:],
+                                 data_vars,
+                                 [values[i:j] for values in block_values])
+        start = stop
+
+
+def _new_csv_chunk(row, coord_vars, coord_values, data_vars, data_values) -> pd.DataFrame:
+    shape = tuple(len(values) for values in coord_values)
+    size = int(np.prod(shape, dtype=np.int64))
+    columns = [np.arange(row, row + size)]
+    for i, values in enumerate(coord_values):
+        values_shape = [1] * len(shape)
+        values_shape[i] = shape[i]
+        columns.append(np.broadcast_to(np.reshape(values, values_shape), shape).reshape(-1))
+    for values in data_values:
+        columns.append(np.reshape(values, -1))
+    # Write date-times in full ISO format, pandas would shorten them
+    columns = [np.datetime_as_string(column) if column.dtype.kind == 'M' else column for column in columns]
+    chunk = pd.DataFrame(dict(enumerate(columns)), copy=False)
+    chunk.columns = ['index'] + [coord_var.name for coord_var in coord_vars] + [data_var.name for data_var in data_vars]
+    return chunk
+
+
 GEO_DATA_FRAME_FILE_FILTERS = [
     dict(name='ESRI Shapefile', extensions=['shp']),
     dict(name='GeoJSON', extensions=['json', 'geojson']),
@@ -29,6 +29,10 @@ Functions
 =========
 """
 import fnmatch
+from typing import List, Sequence, Tuple
+
+import dask
+import dask.array as da
 import xarray as xr
 import numpy as np
 
@@ -38,7 +42,11 @@ from cate.util.monitor import Monitor
 from cate import __version__
 
 
-@op(tags=['filter'], version='1.0')
+#: Number of histogram bins used to approximate quantiles
+_HISTOGRAM_BINS = 65536
+
+
+@op(tags=['filter'], version='1.1')
 @op_input('ds', data_type=DatasetLike)
 @op_input('var', value_set_source='ds', data_type=VarNamesLike)
 @op_return(add_history=True)
@@ -48,6 +56,7 @@ def detect_outliers(ds: xr.Dataset,
                     threshold_high: float = 0.95,
                     quantiles: bool = True,
                     mask: bool = False,
+                    approximate: bool = False,
                     monitor: Monitor = Monitor.NONE) -> xr.Dataset:
     """
     Detect outliers in the given Dataset.
@@ -56,6 +65,9 @@ def detect_outliers(ds: xr.Dataset,
     all existing nan values will be marked as 'outliers' in the mask data array
     added to the output dataset.
 
+    The quantiles of all selected variables are computed together in a single
+    pass over the data. Outliers are masked lazily.
+
     :param ds: The dataset or dataframe for which to do outlier detection
     :param var: Variable or variables in the dataset to which to do outlier
     detection. Note that when multiple variables are selected, absolute
@@ -68,6 +80,9 @@ def detect_outliers(ds: xr.Dataset,
     :param mask: If True, an ancillary variable containing flag values for
     outliers will be added to the dataset. Otherwise, outliers will be replaced
     with nan directly in the data variables.
+    :param approximate: If True, quantiles are approximated from a histogram of
+    the values, which needs only little memory and works chunk-wise for large
+    datasets. The error is less than the value range divided by 65536.
     :param monitor: A progress monitor.
     :return: The dataset with outliers masked or replaced with nan
     """
@@ -84,31 +99,97 @@ def detect_outliers(ds: xr.Dataset,
     # For each array in the dataset for which we should detect outliers, detect
     # outliers
     ret_ds = ds.copy()
-    with monitor.starting("detect_outliers", total_work=len(variables) * 3):
-        for var_name in variables:
-            if quantiles:
-                # Get threshold values
-                with monitor.child(1).observing("quantile low"):
-                    threshold_low = ret_ds[var_name].quantile(threshold_low)
-                with monitor.child(1).observing("quantile high"):
-                    threshold_high = ret_ds[var_name].quantile(threshold_high)
-            else:
-                monitor.progress(2)
+    with monitor.starting("detect_outliers", total_work=len(variables) + 2):
+        if quantiles:
+            # Get threshold values of all variables at once
+            arrays = [ret_ds[var_name] for var_name in variables]
+            with monitor.child(2).observing("quantiles"):
+                if approximate:
+                    thresholds = _approximate_quantiles(arrays, (threshold_low, threshold_high))
+                else:
+                    thresholds = _exact_quantiles(arrays, (threshold_low, threshold_high))
+        else:
+            thresholds = [(threshold_low, threshold_high)] * len(variables)
+            monitor.progress(2)
+        for var_name, (var_threshold_low, var_threshold_high) in zip(variables, thresholds):
             # If not mask, put nans in the data arrays for min/max outliers
             if not mask:
                 arr = ret_ds[var_name]
                 attrs = arr.attrs
-                ret_ds[var_name] = arr.where((arr > threshold_low) & (arr < threshold_high))
+                ret_ds[var_name] = arr.where((arr > var_threshold_low) & (arr < var_threshold_high))
                 ret_ds[var_name].attrs = attrs
             else:
                 # Create and add a data variable containing the mask for this data
                 # variable
-                _mask_outliers(ret_ds, var_name, threshold_low, threshold_high)
+                _mask_outliers(ret_ds, var_name, var_threshold_low, var_threshold_high)
             monitor.progress(1)
 
     return ret_ds
 
 
+def _exact_quantiles(arrays: Sequence[xr.DataArray], q: Sequence[float]) -> List[Tuple[float, ...]]:
+    """
+    Compute the quantiles *q* of all values of each of the given arrays in a single computation.
+    """
+    results = dask.compute(*[arr.quantile(list(q)).data for arr in arrays])
+    return [tuple(float(value) for value in result) for result in results]
+
+
+def _approximate_quantiles(arrays: Sequence[xr.DataArray], q: Sequence[float]) -> List[Tuple[float, ...]]:
+    """
+    Approximate the quantiles *q* of all values of each of the given arrays from histograms.
+    The value ranges of all arrays are computed in a first pass, their histograms in a second pass.
+    """
+    data = [da.asarray(arr.data) for arr in arrays]
+    ranges = dask.compute(*[(da.nanmin(d), da.nanmax(d)) for d in data])
+    histograms = dask.compute(*[da.histogram(d, bins=_HISTOGRAM_BINS, range=_get_histogram_range(value_range))[0]
+                                for d, value_range in zip(data, ranges)])
+    return [tuple(_get_histogram_quantile(histogram, _get_histogram_range(value_range), quantile)
+                  for quantile in q)
+            for histogram, value_range in zip(histograms, ranges)]
+
+
+def _get_histogram_range(value_range: Tuple[float, float]) -> Tuple[float, float]:
+    value_min, value_max = float(value_range[0]), float(value_range[1])
+    if value_max > value_min:
+        return value_min, value_max
+    # All values are equal or missing
+    return (value_min - 0.5, value_min + 0.5) if np.isfinite(value_min) else (0., 1.)
+
+
+def _get_histogram_quantile(histogram: np.ndarray, value_range: Tuple[float, float], quantile: float) -> float:
+    """
+    Estimate a quantile from a histogram, interpolating linearly between the two neighbouring sorted
+    values like ``numpy.quantile`` does. The sorted values are estimated from the bins containing them,
+    which need not be adjacent, so the error is less than the width of a bin.
+    """
+    count = histogram.sum()
+    if count == 0:
+        return np.nan
+    # Position of the quantile in the sorted values
+    position = quantile * (count - 1)
+    rank = int(np.floor(position))
+    cumulative = np.cumsum(histogram)
+    lower = _get_histogram_value(histogram, cumulative, value_range, rank)
+    if position == rank:
+        return lower
+    upper = _get_histogram_value(histogram, cumulative, value_range, rank + 1)
+    return lower + (position - rank) * (upper - lower)
+
+
+def _get_histogram_value(histogram: np.ndarray, cumulative: np.ndarray, value_range: Tuple[float, float],
+                         rank: int) -> float:
+    """
+    Estimate the value with the given rank in the sorted values of a histogram.
+    """
+    # The bin containing the value, values are assumed to be evenly spread within a bin
+    index = int(np.searchsorted(cumulative, rank, side='right'))
+    previous = cumulative[index - 1] if index > 0 else 0
+    fraction = (rank - previous + 0.5) / histogram[index]
+    bin_width = (value_range[1] - value_range[0]) / len(histogram)
+    return float(value_range[0] + (index + fraction) * bin_width)
+
+
 def _mask_outliers(ds: xr.Dataset, var_name: str, threshold_low: float,
                    threshold_high: float):
     """
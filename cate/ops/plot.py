@@ -80,6 +80,7 @@ from cate.core.op import op, op_input
 from cate.core.types import (VarName, VarNamesLike, DictLike, PolygonLike, DatasetLike, ValidationError, DimName)
 
 from cate.ops.plot_helpers import get_var_data, get_vars_data
+from cate.ops.plot_helpers import decimate_var_data, get_figure_pixel_size
 from cate.ops.plot_helpers import in_notebook
 from cate.ops.plot_helpers import handle_plot_polygon
 from cate.util.monitor import Monitor
@@ -205,12 +206,22 @@ def plot_map(ds: xr.Dataset,
     ax.coastlines()
     var_data = get_var_data(var, indexers, remaining_dims=('lon', 'lat'))
 
+    # Don't plot more data cells than the figure has pixels. If a region is given,
+    # only its part of the data is visible.
+    max_sizes = dict(zip(('lon', 'lat'), get_figure_pixel_size(figure)))
+    if extents:
+        for dim, extent in (('lon', lon_max - lon_min), ('lat', lat_max - lat_min)):
+            span = abs(float(var_data[dim][-1] - var_data[dim][0]))
+            if 0 < extent < span:
+                max_sizes[dim] *= span / extent
+    var_data = decimate_var_data(var_data, max_sizes)
+
     # transform keyword is for the coordinate our data is in, which in case of a
     # 'normal' lat/lon dataset is PlateCarree.
     if contour_plot:
-        var_data.plot.contourf(ax=ax, transform=ccrs.PlateCarree(), subplot_kws={'projection': proj}, **properties)
+        var_data.plot.contourf(ax=ax, transform=ccrs.PlateCarree(), **properties)
     else:
-        var_data.plot.pcolormesh(ax=ax, transform=ccrs.PlateCarree(), subplot_kws={'projection': proj}, **properties)
+        var_data.plot.pcolormesh(ax=ax, transform=ccrs.PlateCarree(), **properties)
 
     if title:
         ax.set_title(title)
@@ -813,6 +824,9 @@ def plot_hovmoeller(ds: xr.Dataset,
     if x_axis == 'time':
         figure.autofmt_xdate()
 
+    # Don't plot more data cells than the figure has pixels
+    var = decimate_var_data(var, dict(zip((x_axis, y_axis), get_figure_pixel_size(figure))))
+
     if contour:
         var.plot.contourf(ax=ax, x=x_axis, y=y_axis, **kwargs)
     else:
@@ -29,6 +29,12 @@ Components
 ==========
 
 """
+import math
+
+import matplotlib
+import numpy as np
+import xarray as xr
+
 from cate.core.types import PolygonLike, ValidationError
 from cate.core.opimpl import get_extents
 from cate.util.im import ensure_cmaps_loaded
@@ -117,6 +123,43 @@ def get_var_data(var, indexers: dict, remaining_dims=None):
     return var
 
 
+def get_figure_pixel_size(figure):
+    """
+    Return the size (width, height) in pixels of *figure* when drawn or saved.
+    """
+    dpi = figure.dpi
+    savefig_dpi = matplotlib.rcParams['savefig.dpi']
+    if savefig_dpi != 'figure':
+        dpi = max(dpi, savefig_dpi)
+    width, height = figure.get_size_inches()
+    return width * dpi, height * dpi
+
+
+def decimate_var_data(var: xr.DataArray, max_sizes: dict) -> xr.DataArray:
+    """
+    Reduce the resolution of *var*, so that the size of every dimension in *max_sizes*
+    does not exceed the given maximum size, e.g. the number of pixels of a plot.
+
+    Floating point data are aggregated by block means, ignoring NaN values, other data
+    are subsampled. The result is lazy for dask arrays, so that only the reduced
+    array is computed when plotting.
+
+    :param var: The data array
+    :param max_sizes: A mapping of dimension names to maximum sizes
+    :return: The decimated data array, or *var* if it does not exceed *max_sizes*
+    """
+    factors = {}
+    for dim, max_size in max_sizes.items():
+        size = var.sizes[dim]
+        if 1 <= max_size < size:
+            factors[dim] = int(math.ceil(size / max_size))
+    if not factors:
+        return var
+    if np.issubdtype(var.dtype, np.floating):
+        return var.coarsen(factors, boundary='pad').mean(keep_attrs=True)
+    return var.isel({dim: slice(None, None, factor) for dim, factor in factors.items()})
+
+
 def get_vars_data(ds, indexers: dict, remaining_dims=None):
     """Select an arbitrary piece of an xarray dataset by using indexers."""
     # to avoid the original dataset being affected (especially useful in unit tests)
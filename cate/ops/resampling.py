@@ -31,8 +31,12 @@ Components
 # http://stackoverflow.com/questions/7075082/what-is-future-in-python-used-for-and-how-when-to-use-it-and-how-it-works
 from __future__ import division
 
+import functools
+import threading
+from typing import Tuple
+
 import numpy as np
-from numba import jit
+from numba import jit, prange
 
 #: Interpolation method for upsampling: Take nearest source grid cell, even if it is invalid.
 US_NEAREST = 10
@@ -63,6 +67,8 @@ DS_STD = 58
 
 #: Constant indicating an empty 2-D mask
 _NOMASK2D = np.ma.getmaskarray(np.ma.array([[0]], mask=[[0]]))
+#: Constant indicating an empty 3-D mask
+_NOMASK3D = np.ma.getmaskarray(np.ma.array([[[0]]], mask=[[[0]]]))
 
 _EPS = 1e-10
 
@@ -97,8 +103,8 @@ def resample_2d(src, w, h, ds_method=DS_MEAN, us_method=US_LINEAR, fill_value=No
         return src
     mask, use_mask = _get_mask(src)
     fill_value = _get_fill_value(fill_value, src, out)
-    return _mask_or_not(_resample_2d(src, mask, use_mask, ds_method, us_method, fill_value, mode_rank, out),
-                        src, fill_value)
+    out = _resample_2d(np.ma.getdata(src), mask, use_mask, ds_method, us_method, fill_value, mode_rank, out)
+    return _mask_or_not(out, src, fill_value)
 
 
 def upsample_2d(src, w, h, method=US_LINEAR, fill_value=None, out=None):
@@ -126,7 +132,7 @@ def upsample_2d(src, w, h, method=US_LINEAR, fill_value=None, out=None):
         return src
     mask, use_mask = _get_mask(src)
     fill_value = _get_fill_value(fill_value, src, out)
-    return _mask_or_not(_upsample_2d(src, mask, use_mask, method, fill_value, out), src, fill_value)
+    return _mask_or_not(_upsample_2d(np.ma.getdata(src), mask, use_mask, method, fill_value, out), src, fill_value)
 
 
 def downsample_2d(src, w, h, method=DS_MEAN, fill_value=None, mode_rank=1, out=None):
@@ -159,7 +165,215 @@ def downsample_2d(src, w, h, method=DS_MEAN, fill_value=None, mode_rank=1, out=N
         return src
     mask, use_mask = _get_mask(src)
     fill_value = _get_fill_value(fill_value, src, out)
-    return _mask_or_not(_downsample_2d(src, mask, use_mask, method, fill_value, mode_rank, out), src, fill_value)
+    return _mask_or_not(_downsample_2d(np.ma.getdata(src), mask, use_mask, method, fill_value, mode_rank, out),
+                        src, fill_value)
+
+
+class Resampler:
+    """
+    Resamples the last two dimensions of N-D grids from a source to a target grid size.
+
+    The source indices and weights of every target grid row and column depend only on the grid sizes
+    and methods. They are computed once when the resampler is created and then applied to any number
+    of arrays of any number of leading dimensions, e.g. all time steps of all variables of a dataset.
+    Use :py:func:`get_resampler` to reuse resamplers across calls.
+
+    Up- and downsampling is performed as by :py:func:`resample_2d`, but slices are processed in parallel
+    if called from the main thread.
+
+    :param src_shape: Source grid shape (height, width)
+    :param dst_shape: Target grid shape (height, width)
+    :param ds_method: one of the *DS_* constants, optional
+        Grid cell aggregation method for a possible downsampling
+    :param us_method: one of the *US_* constants, optional
+        Grid cell interpolation method for a possible upsampling
+    """
+
+    def __init__(self,
+                 src_shape: Tuple[int, int],
+                 dst_shape: Tuple[int, int],
+                 ds_method: int = DS_MEAN,
+                 us_method: int = US_LINEAR):
+        src_h, src_w = src_shape
+        dst_h, dst_w = dst_shape
+        if ds_method not in (DS_FIRST, DS_LAST, DS_MEAN, DS_MODE, DS_VAR, DS_STD):
+            raise ValueError('invalid downsampling method')
+        if us_method not in (US_NEAREST, US_LINEAR):
+            raise ValueError('invalid upsampling method')
+
+        self._src_shape = (int(src_h), int(src_w))
+        self._dst_shape = (int(dst_h), int(dst_w))
+        self._ds_method = ds_method
+        self._us_method = us_method
+
+        # Downsampling in one direction and upsampling in the other is done in two steps
+        # via an intermediate grid, see _resample_2d()
+        self._ds_tables = None
+        self._us_tables = None
+        if dst_w < src_w and dst_h < src_h:
+            ds_shape = (dst_h, dst_w)
+        elif dst_w < src_w:
+            ds_shape = (src_h, dst_w)
+        elif dst_h < src_h:
+            ds_shape = (dst_h, src_w)
+        else:
+            ds_shape = None
+        if ds_shape is not None:
+            self._ds_tables = (_get_ds_table(src_h, ds_shape[0], ds_method),
+                               _get_ds_table(src_w, ds_shape[1], ds_method))
+        us_src_h, us_src_w = ds_shape if ds_shape is not None else (src_h, src_w)
+        if dst_w > us_src_w or dst_h > us_src_h:
+            self._us_tables = (_get_us_table(us_src_h, dst_h, us_method),
+                               _get_us_table(us_src_w, dst_w, us_method))
+        self._ds_shape = ds_shape
+
+    @property
+    def src_shape(self) -> Tuple[int, int]:
+        """Source grid shape (height, width)."""
+        return self._src_shape
+
+    @property
+    def dst_shape(self) -> Tuple[int, int]:
+        """Target grid shape (height, width)."""
+        return self._dst_shape
+
+    def resample(self, src, fill_value=None, mode_rank=1):
+        """
+        Resample the given grids.
+
+        :param src: N-D *ndarray* whose last two dimensions have the source grid shape
+        :param fill_value: *scalar*, optional
+            If ``None``, it is taken from **src** if it is a masked array,
+            otherwise numpy's default value is used.
+        :param mode_rank: *scalar*, optional
+            The rank of the frequency determined by the *ds_method* ``DS_MODE``. See :py:func:`resample_2d`.
+        :return: An resampled version of the *src* array with the last two dimensions having the target grid shape.
+        """
+        if src.ndim < 2 or src.shape[-2:] != self._src_shape:
+            raise ValueError("'src' has an incompatible shape")
+        if self._ds_method == DS_MODE and mode_rank < 1:
+            raise ValueError('mode_rank must be >= 1')
+        if self._ds_tables is None and self._us_tables is None:
+            return src
+
+        lead_shape = src.shape[:-2]
+        src_3d = np.ma.getdata(src).reshape((-1,) + self._src_shape)
+        if isinstance(src, np.ma.MaskedArray) and np.ma.getmask(src) is not np.ma.nomask:
+            mask, use_mask = np.ma.getmaskarray(src).reshape(src_3d.shape), True
+        else:
+            mask, use_mask = _NOMASK3D, False
+        if fill_value is None:
+            fill_value = _get_fill_value(fill_value, src, None)
+
+        # Numba's thread pool must not be entered from several threads at once, which e.g. dask's worker
+        # threads would do. These process chunks in parallel already, so they use the serial kernels.
+        if threading.current_thread() is threading.main_thread():
+            downsample_3d, upsample_3d = _downsample_3d, _upsample_3d
+        else:
+            downsample_3d, upsample_3d = _downsample_3d_serial, _upsample_3d_serial
+
+        n = src_3d.shape[0]
+        out = np.empty((n,) + self._dst_shape, dtype=src.dtype)
+        if self._ds_tables is not None:
+            y_table, x_table = self._ds_tables
+            if self._us_tables is None:
+                ds_out, ds_fill_value = out, fill_value
+            else:
+                # Invalid cells of the intermediate grid are marked by NaN
+                ds_out, ds_fill_value = np.empty((n,) + self._ds_shape, dtype=np.float64), np.nan
+            downsample_3d(src_3d, mask, use_mask,
+                          y_table[0], y_table[1], y_table[2],
+                          x_table[0], x_table[1], x_table[2],
+                          self._ds_method, ds_fill_value, mode_rank, ds_out)
+            if self._us_tables is not None:
+                src_3d, mask, use_mask = ds_out, _NOMASK3D, False
+        if self._us_tables is not None:
+            y_table, x_table = self._us_tables
+            upsample_3d(src_3d, mask, use_mask,
+                        y_table[0], y_table[1], y_table[2],
+                        x_table[0], x_table[1], x_table[2],
+                        self._us_method, fill_value, out)
+
+        return _mask_or_not(out.reshape(lead_shape + self._dst_shape), src, fill_value)
+
+
+@functools.lru_cache(maxsize=64)
+def get_resampler(src_shape: Tuple[int, int],
+                  dst_shape: Tuple[int, int],
+                  ds_method: int = DS_MEAN,
+                  us_method: int = US_LINEAR) -> Resampler:
+    """
+    Get a, possibly cached, :py:class:`Resampler` for the given grid shapes and methods.
+
+    :param src_shape: Source grid shape (height, width)
+    :param dst_shape: Target grid shape (height, width)
+    :param ds_method: one of the *DS_* constants, optional
+    :param us_method: one of the *US_* constants, optional
+    :return: A resampler instance
+    """
+    return Resampler(tuple(src_shape), tuple(dst_shape), ds_method, us_method)
+
+
+def _get_ds_table(src_size: int, out_size: int, method: int):
+    """
+    Compute the source indices and weights for downsampling one grid axis.
+    Same index math as in _downsample_2d().
+
+    :return: tuple (indices, weights, counts) where indices and weights have shape (out_size, max_count).
+    """
+    scale = src_size / out_size
+    ranges = []
+    for out_i in range(out_size):
+        src_f0 = scale * out_i
+        src_f1 = src_f0 + scale
+        src_i0 = int(src_f0)
+        src_i1 = int(src_f1)
+        if method == DS_FIRST or method == DS_LAST:
+            w0 = w1 = 1.0
+            if src_i1 == src_f1 and src_i1 > src_i0:
+                src_i1 -= 1
+        else:
+            w0 = 1.0 - (src_f0 - src_i0)
+            w1 = src_f1 - src_i1
+            if w1 < _EPS:
+                w1 = 1.0
+                if src_i1 > src_i0:
+                    src_i1 -= 1
+        # Never access beyond the source grid due to rounding errors
+        src_i1 = min(src_i1, src_size - 1)
+        weights = [w0 if (src_i == src_i0) else w1 if (src_i == src_i1) else 1.0
+                   for src_i in range(src_i0, src_i1 + 1)]
+        ranges.append((src_i0, weights))
+
+    max_count = max(len(weights) for _, weights in ranges)
+    indices = np.zeros((out_size, max_count), dtype=np.int64)
+    weight_table = np.zeros((out_size, max_count), dtype=np.float64)
+    counts = np.zeros(out_size, dtype=np.int64)
+    for out_i, (src_i0, weights) in enumerate(ranges):
+        count = len(weights)
+        indices[out_i, :count] = np.arange(src_i0, src_i0 + count)
+        weight_table[out_i, :count] = weights
+        counts[out_i] = count
+    return indices, weight_table, counts
+
+
+def _get_us_table(src_size: int, out_size: int, method: int):
+    """
+    Compute the source indices and weights for upsampling one grid axis.
+    Same index math as in _upsample_2d().
+
+    :return: tuple (indices0, indices1, weights) of arrays of shape (out_size,).
+    """
+    out_i = np.arange(out_size)
+    if method == US_NEAREST:
+        indices0 = (src_size / out_size * out_i).astype(np.int64)
+        return indices0, indices0, np.zeros(out_size, dtype=np.float64)
+    scale = (src_size - 1.0) / ((out_size - 1.0) if out_size > 1 else 1.0)
+    src_f = scale * out_i
+    indices0 = src_f.astype(np.int64)
+    weights = src_f - indices0
+    indices1 = np.minimum(indices0 + 1, src_size - 1)
+    return indices0, indices1, weights
 
 
 def _get_out(out, src, shape):
@@ -209,7 +423,7 @@ def _get_fill_value(fill_value, src, out):
 # therefore all arg types must be either primitive scalars or numpy arrays.
 # Key-value args are not allowed.
 #
-@jit(nopython=True)
+@jit(nopython=True, nogil=True)
 def _resample_2d(src, mask, use_mask, ds_method, us_method, fill_value, mode_rank, out):
     src_w = src.shape[-1]
     src_h = src.shape[-2]
@@ -243,7 +457,7 @@ def _resample_2d(src, mask, use_mask, ds_method, us_method, fill_value, mode_ran
 # therefore all arg types must be either primitive scalars or numpy arrays.
 # Key-value args are not allowed.
 #
-@jit(nopython=True)
+@jit(nopython=True, nogil=True)
 def _upsample_2d(src, mask, use_mask, method, fill_value, out):
     src_w = src.shape[-1]
     src_h = src.shape[-2]
@@ -336,7 +550,7 @@ def _upsample_2d(src, mask, use_mask, method, fill_value, out):
 # therefore all arg types must be either primitive scalars or numpy arrays.
 # Key-value args are not allowed.
 #
-@jit(nopython=True)
+@jit(nopython=True, nogil=True)
 def _downsample_2d(src, mask, use_mask, method, fill_value, mode_rank, out):
     src_w = src.shape[-1]
     src_h = src.shape[-2]
@@ -534,3 +748,180 @@ def _downsample_2d(src, mask, use_mask, method, fill_value, mode_rank, out):
         raise ValueError('invalid downsampling method')
 
     return out
+
+
+# This function will be JIT-compiled by Numba with nopython=True,
+# therefore all arg types must be either primitive scalars or numpy arrays.
+# Key-value args are not allowed.
+#
+# Rows of all slices are processed in parallel. A serial variant is compiled as well, see Resampler.resample().
+#
+@jit(nopython=True, nogil=True, parallel=True)
+def _downsample_3d(src, mask, use_mask, y_indices, y_weights, y_counts, x_indices, x_weights, x_counts,
+                   method, fill_value, mode_rank, out):
+    out_h = out.shape[-2]
+    out_w = out.shape[-1]
+    max_value_count = y_indices.shape[-1] * x_indices.shape[-1]
+
+    for k in prange(out.shape[0] * out_h):
+        i = k // out_h
+        out_y = k - i * out_h
+        values = np.zeros((max_value_count,), dtype=src.dtype)
+        frequencies = np.zeros((max_value_count,), dtype=np.float64)
+        for out_x in range(out_w):
+            if method == DS_FIRST or method == DS_LAST:
+                done = False
+                value = fill_value
+                for j in range(y_counts[out_y]):
+                    src_y = y_indices[out_y, j]
+                    for n in range(x_counts[out_x]):
+                        src_x = x_indices[out_x, n]
+                        v = src[i, src_y, src_x]
+                        if np.isfinite(v) and not (use_mask and mask[i, src_y, src_x]):
+                            value = v
+                            if method == DS_FIRST:
+                                done = True
+                                break
+                    if done:
+                        break
+                out[i, out_y, out_x] = value
+
+            elif method == DS_MODE:
+                value_count = 0
+                for j in range(y_counts[out_y]):
+                    src_y = y_indices[out_y, j]
+                    wy = y_weights[out_y, j]
+                    for n in range(x_counts[out_x]):
+                        src_x = x_indices[out_x, n]
+                        v = src[i, src_y, src_x]
+                        if np.isfinite(v) and not (use_mask and mask[i, src_y, src_x]):
+                            w = x_weights[out_x, n] * wy
+                            found = False
+                            for m in range(value_count):
+                                if v == values[m]:
+                                    frequencies[m] += w
+                                    found = True
+                                    break
+                            if not found:
+                                values[value_count] = v
+                                frequencies[value_count] = w
+                                value_count += 1
+                w_max = -1.
+                value = fill_value
+                if mode_rank == 1:
+                    for m in range(value_count):
+                        w = frequencies[m]
+                        if w > w_max:
+                            w_max = w
+                            value = values[m]
+                elif mode_rank <= max_value_count:
+                    max_frequencies = np.full(mode_rank, -1.0, dtype=np.float64)
+                    indices = np.zeros(mode_rank, dtype=np.int64)
+                    for m in range(value_count):
+                        w = frequencies[m]
+                        for r in range(mode_rank):
+                            if w > max_frequencies[r]:
+                                max_frequencies[r] = w
+                                indices[r] = m
+                                break
+                    value = values[indices[mode_rank - 1]]
+                out[i, out_y, out_x] = value
+
+            else:
+                w_sum = 0.0
+                wv_sum = 0.0
+                wvv_sum = 0.0
+                for j in range(y_counts[out_y]):
+                    src_y = y_indices[out_y, j]
+                    wy = y_weights[out_y, j]
+                    for n in range(x_counts[out_x]):
+                        src_x = x_indices[out_x, n]
+                        v = src[i, src_y, src_x]
+                        if np.isfinite(v) and not (use_mask and mask[i, src_y, src_x]):
+                            w = x_weights[out_x, n] * wy
+                            w_sum += w
+                            wv_sum += w * v
+                            wvv_sum += w * v * v
+                if w_sum < _EPS:
+                    out[i, out_y, out_x] = fill_value
+                elif method == DS_MEAN:
+                    out[i, out_y, out_x] = wv_sum / w_sum
+                elif method == DS_VAR:
+                    out[i, out_y, out_x] = (wvv_sum * w_sum - wv_sum * wv_sum) / w_sum / w_sum
+                else:
+                    out[i, out_y, out_x] = np.sqrt((wvv_sum * w_sum - wv_sum * wv_sum) / w_sum / w_sum)
+
+    return out
+
+
+_downsample_3d_serial = jit(nopython=True, nogil=True)(_downsample_3d.py_func)
+
+
+# This function will be JIT-compiled by Numba with nopython=True,
+# therefore all arg types must be either primitive scalars or numpy arrays.
+# Key-value args are not allowed.
+#
+# Rows of all slices are processed in parallel. A serial variant is compiled as well, see Resampler.resample().
+#
+@jit(nopython=True, nogil=True, parallel=True)
+def _upsample_3d(src, mask, use_mask, y_indices0, y_indices1, y_weights, x_indices0, x_indices1, x_weights,
+                 method, fill_value, out):
+    out_h = out.shape[-2]
+    out_w = out.shape[-1]
+
+    for k in prange(out.shape[0] * out_h):
+        i = k // out_h
+        out_y = k - i * out_h
+        src_y0 = y_indices0[out_y]
+        src_y1 = y_indices1[out_y]
+        wy = y_weights[out_y]
+        for out_x in range(out_w):
+            src_x0 = x_indices0[out_x]
+            if method == US_NEAREST:
+                value = src[i, src_y0, src_x0]
+                if np.isfinite(value) and not (use_mask and mask[i, src_y0, src_x0]):
+                    out[i, out_y, out_x] = value
+                else:
+                    out[i, out_y, out_x] = fill_value
+                continue
+
+            src_x1 = x_indices1[out_x]
+            wx = x_weights[out_x]
+            v00 = src[i, src_y0, src_x0]
+            v01 = src[i, src_y0, src_x1]
+            v10 = src[i, src_y1, src_x0]
+            v11 = src[i, src_y1, src_x1]
+            v00_ok = np.isfinite(v00) and not (use_mask and mask[i, src_y0, src_x0])
+            v01_ok = np.isfinite(v01) and not (use_mask and mask[i, src_y0, src_x1])
+            v10_ok = np.isfinite(v10) and not (use_mask and mask[i, src_y1, src_x0])
+            v11_ok = np.isfinite(v11) and not (use_mask and mask[i, src_y1, src_x1])
+            if v00_ok and v01_ok and v10_ok and v11_ok:
+                ok = True
+                v0 = v00 + wx * (v01 - v00)
+                v1 = v10 + wx * (v11 - v10)
+                value = v0 + wy * (v1 - v0)
+            elif wx < 0.5:
+                # NEAREST according to weight
+                if wy < 0.5:
+                    ok = v00_ok
+                    value = v00
+                else:
+                    ok = v10_ok
+                    value = v10
+            else:
+                # NEAREST according to weight
+                if wy < 0.5:
+                    ok = v01_ok
+                    value = v01
+                else:
+                    ok = v11_ok
+                    value = v11
+            if ok:
+                out[i, out_y, out_x] = value
+            else:
+                out[i, out_y, out_x] = fill_value
+
+    return out
+
+
+_upsample_3d_serial = jit(nopython=True, nogil=True)(_upsample_3d.py_func)
@@ -28,14 +28,21 @@ Subset operations
 Components
 ==========
 """
-from typing import Dict
+import weakref
+from typing import Dict, Sequence, Tuple, Union
 
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely.geometry
 import xarray as xr
 
 from cate.core.op import op, op_input, op_return
 from cate.core.opimpl import subset_spatial_impl, subset_temporal_impl, subset_temporal_index_impl, \
     _get_geo_spatial_cf_attrs_from_var
-from cate.core.types import PolygonLike, TimeRangeLike, DatasetLike, PointLike, DictLike
+from cate.core.types import PolygonLike, TimeRangeLike, DatasetLike, PointLike, DictLike, VarNamesLike, \
+    GeometryLike, Arbitrary, ValidationError
+from cate.ops.select import select_var
 from cate.ops.normalize import adjust_spatial_attrs, adjust_temporal_attrs
 from cate.util.misc import to_scalar
 from cate.util.monitor import Monitor
@@ -96,6 +103,78 @@ def subset_temporal_index(ds: DatasetLike.TYPE,
     return subset_temporal_index_impl(ds, time_ind_min, time_ind_max)
 
 
+@op(tags=['geometric', 'spatial', 'subset', 'point', 'timeseries'], version='1.0')
+@op_input('ds', data_type=DatasetLike)
+@op_input('points', data_type=Arbitrary)
+@op_input('var', value_set_source='ds', data_type=VarNamesLike)
+@op_return(add_history=True)
+def extract_points(ds: DatasetLike.TYPE,
+                   points: Union[gpd.GeoDataFrame, GeometryLike.TYPE, Sequence[PointLike.TYPE]],
+                   var: VarNamesLike.TYPE = None,
+                   tolerance_default: float = 0.01) -> xr.Dataset:
+    """
+    Extract the values of variables at many point locations at once, for example to match
+    station data against gridded data. For each point the nearest grid cell is looked up.
+    All dimensions other than *lat* and *lon*, e.g. time, are kept, so the result contains
+    a time series per point.
+
+    The returned dataset has a new dimension *point* instead of *lat* and *lon*. The *lat* and *lon*
+    coordinates along *point* give the centers of the nearest grid cells. Values of points for which
+    there is no grid cell within the tolerance are NaN.
+
+    :param ds: The dataset, must have 1D lat and lon coordinates.
+    :param points: Either a geo data frame with point geometries, e.g. stations, whose index is used
+           to label the points, a multi-point geometry or WKT, or a sequence of points given by
+           longitude and latitude.
+    :param var: Variables to extract. If not given, all variables with lat and lon dimensions are used.
+    :param tolerance_default: The default longitude and latitude tolerance for the nearest neighbour lookup.
+           It will only be used, if it is not possible to deduce the resolution of the dataset.
+    :return: A dataset with the values of the variables at the points.
+    """
+    ds = DatasetLike.convert(ds)
+
+    if isinstance(points, gpd.GeoDataFrame):
+        lon = points.geometry.x.values
+        lat = points.geometry.y.values
+        labels = points.index.values
+    else:
+        if isinstance(points, (str, shapely.geometry.base.BaseGeometry)):
+            points = GeometryLike.convert(points)
+            points = points.geoms if isinstance(points, shapely.geometry.MultiPoint) else [points]
+        points = [PointLike.convert(point) for point in points]
+        lon = np.array([point.x for point in points], dtype=np.float64)
+        lat = np.array([point.y for point in points], dtype=np.float64)
+        labels = np.arange(len(points))
+
+    if 'lat' not in ds.indexes or 'lon' not in ds.indexes:
+        raise ValidationError('Cannot extract points. No (valid) geocoding found.')
+
+    var_names = VarNamesLike.convert(var)
+    if var_names:
+        ds = select_var(ds, var_names)
+    ds = ds[[name for name in ds.data_vars if 'lat' in ds[name].dims and 'lon' in ds[name].dims]]
+
+    tolerance = _get_tolerance(ds, tolerance_default)
+    lon_indices, lon_valid = _get_nearest_indices(ds.indexes['lon'], lon, tolerance)
+    lat_indices, lat_valid = _get_nearest_indices(ds.indexes['lat'], lat, tolerance)
+
+    # A single vectorised indexing operation extracts all variables at all points
+    retset = ds.isel(lon=xr.DataArray(lon_indices, dims='point'),
+                     lat=xr.DataArray(lat_indices, dims='point'))
+    valid = lon_valid & lat_valid
+    if not valid.all():
+        valid = xr.DataArray(valid, dims='point')
+        retset = retset.where(valid).assign_coords(lon=retset.lon.where(valid), lat=retset.lat.where(valid))
+    retset = retset.assign_coords(point=labels)
+
+    # The dataset is no longer a spatial dataset -> drop associated global attributes
+    for key in ['geospatial_lon_min', 'geospatial_lat_min', 'geospatial_lon_max', 'geospatial_lat_max',
+                'geospatial_lon_resolution', 'geospatial_lat_resolution', 'geospatial_bounds']:
+        retset.attrs.pop(key, None)
+
+    return retset
+
+
 def extract_point(ds: DatasetLike.TYPE,
                   point: PointLike.TYPE,
                   indexers: DictLike.TYPE = None,
@@ -119,8 +198,17 @@ def extract_point(ds: DatasetLike.TYPE,
     point = PointLike.convert(point)
     indexers = DictLike.convert(indexers) or {}
 
-    lon_lat_indexers = {'lon': point.x, 'lat': point.y}
+    if 'lat' not in ds.indexes or 'lon' not in ds.indexes:
+        return {}
+
+    # The grid cell is looked up once for all variables
     tolerance = _get_tolerance(ds, tolerance_default)
+    lon_indices, lon_valid = _get_nearest_indices(ds.indexes['lon'], np.array([point.x]), tolerance)
+    lat_indices, lat_valid = _get_nearest_indices(ds.indexes['lat'], np.array([point.y]), tolerance)
+    if not (lon_valid[0] and lat_valid[0]):
+        # if there is no point within the given tolerance, return an empty dict
+        return {}
+    lon_lat_indexers = {'lon': int(lon_indices[0]), 'lat': int(lat_indices[0])}
 
     variable_values = {}
     var_names = sorted(ds.data_vars.keys())
@@ -139,11 +227,7 @@ def extract_point(ds: DatasetLike.TYPE,
                 except KeyError:
                     # if there is no exact match for the "additional" dims, skip this variable
                     continue
-                try:
-                    point_data = lon_lat_data.sel(method='nearest', tolerance=tolerance, **lon_lat_indexers)
-                except KeyError:
-                    # if there is no point within the given tolerance, return an empty dict
-                    return {}
+                point_data = lon_lat_data.isel(**lon_lat_indexers)
                 if not variable_values:
                     variable_values['lat'] = float(point_data.lat)
                     variable_values['lon'] = float(point_data.lon)
@@ -153,6 +237,49 @@ def extract_point(ds: DatasetLike.TYPE,
     return variable_values
 
 
+#: Cache of sorted coordinate values, maps the id of a pandas index to a weak reference to it and its sorted values
+_SORTED_COORDS_CACHE = {}
+
+
+def _get_sorted_coords(index: pd.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the ascending values of a coordinate index and the positions of these values in the index.
+    The result is cached as long as the index exists. Indexes are shared by datasets derived from
+    each other, so repeated lookups, e.g. on mouse moves, do not sort coordinates again.
+    """
+    key = id(index)
+    entry = _SORTED_COORDS_CACHE.get(key)
+    if entry is not None and entry[0]() is index:
+        return entry[1]
+    values = np.asarray(index.values, dtype=np.float64)
+    if index.is_monotonic_increasing:
+        order = np.arange(values.size)
+    elif index.is_monotonic_decreasing:
+        order = np.arange(values.size - 1, -1, -1)
+    else:
+        order = np.argsort(values, kind='stable')
+    sorted_coords = values[order], order
+    _SORTED_COORDS_CACHE[key] = weakref.ref(index, lambda _: _SORTED_COORDS_CACHE.pop(key, None)), sorted_coords
+    return sorted_coords
+
+
+def _get_nearest_indices(index: pd.Index, values: np.ndarray, tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the positions of the coordinates in *index* nearest to *values* with a single vectorised search.
+
+    :return: A tuple (positions, valid), where *valid* is False for values with no coordinate within *tolerance*.
+    """
+    coords, order = _get_sorted_coords(index)
+    values = np.asarray(values, dtype=np.float64)
+    upper = np.clip(np.searchsorted(coords, values), 1, coords.size - 1) if coords.size > 1 \
+        else np.zeros(values.shape, dtype=np.int64)
+    lower = np.maximum(upper - 1, 0)
+    use_lower = np.abs(values - coords[lower]) < np.abs(coords[upper] - values)
+    nearest = np.where(use_lower, lower, upper)
+    valid = np.abs(coords[nearest] - values) <= tolerance
+    return order[nearest], valid
+
+
 def _get_tolerance(ds: xr.Dataset, tolerance_default: float):
     lon_res_attr_name = 'geospatial_lon_resolution'
     lat_res_attr_name = 'geospatial_lat_resolution'
@@ -29,11 +29,17 @@ Functions
 =========
 """
 
+from typing import Optional
+
+import dask
+import dask.array as da
+import numpy as np
 import xarray as xr
 
 from cate.core.op import op_input, op, op_return
+from cate.core.opimpl import get_polygon_mask_impl
 from cate.ops.select import select_var
-from cate.core.types import VarNamesLike, PointLike
+from cate.core.types import VarNamesLike, PointLike, PolygonLike, ValidationError
 from cate.util.monitor import Monitor
 
 
@@ -90,14 +96,17 @@ def tseries_point(ds: xr.Dataset,
     return retset
 
 
-@op(tags=['timeseries', 'temporal'], version='1.0')
+@op(tags=['timeseries', 'temporal'], version='1.1')
 @op_input('ds')
 @op_input('var', value_set_source='ds', data_type=VarNamesLike)
+@op_input('region', data_type=PolygonLike)
 @op_return(add_history=True)
 def tseries_mean(ds: xr.Dataset,
                  var: VarNamesLike.TYPE,
                  std_suffix: str = '_std',
                  calculate_std: bool = True,
+                 weighted: bool = True,
+                 region: PolygonLike.TYPE = None,
                  monitor: Monitor = Monitor.NONE) -> xr.Dataset:
     """
     Extract spatial mean timeseries of the provided variables, return the
@@ -109,28 +118,131 @@ def tseries_mean(ds: xr.Dataset,
     the data will be reduced by taking the mean of all data values at a single
     time position resulting in one dimensional timeseries data variable.
 
+    Means and standard deviations of all variables are computed in a single pass
+    over the data. If *weighted* is True, values are weighted by the area of their
+    grid cells, that is, the cosine of their latitude.
+
     :param ds: The dataset from which to perform timeseries extraction.
     :param var: Variables for which to perform timeseries extraction
     :param calculate_std: Whether to calculate std in addition to mean
     :param std_suffix: Std suffix to use for resulting datasets, if std is calculated.
+    :param weighted: Whether to weight values by the cosine of their latitude.
+    :param region: Optional polygon, only values whose grid cell centers fall into it are used.
+           Requires equidistant lat and lon coordinates.
     :param monitor: a progress monitor.
     :return: Dataset with timeseries variables
     """
     if not var:
         var = '*'
 
+    region = PolygonLike.convert(region)
+
     retset = select_var(ds, var)
-    names = retset.data_vars.keys()
-
-    with monitor.starting("Calculate mean", total_work=len(names)):
-        for name in names:
-            dims = list(ds[name].dims)
-            dims.remove('time')
-            with monitor.child(1).observing("Calculate mean"):
-                retset[name] = retset[name].mean(dim=dims, keep_attrs=True)
-            retset[name].attrs['Cate_Description'] = 'Mean aggregated over {} at each point in time.'.format(dims)
+    names = list(retset.data_vars.keys())
+
+    results = []
+    for name in names:
+        array = ds[name]
+        if 'time' not in array.dims:
+            raise ValidationError('Variable \'{}\' has no time dimension.'.format(name))
+        dims = [dim for dim in array.dims if dim != 'time']
+        array = array.transpose('time', *dims)
+        weights = _get_weights(array, weighted, region)
+        results.append(_weighted_moments(array.data, weights))
+
+    with monitor.starting("Calculate mean", total_work=1):
+        with monitor.child(1).observing("Calculate mean"):
+            # Moments of all variables are computed in a single traversal of the data
+            results = dask.compute(*results)
+
+    for name, (mean, std) in zip(names, results):
+        dims = [dim for dim in ds[name].dims if dim != 'time']
+        time = ds[name].time
+        retset[name] = xr.DataArray(mean, dims=['time'], coords={'time': time}, attrs=ds[name].attrs)
+        retset[name].attrs['Cate_Description'] = 'Mean aggregated over {} at each point in time.'.format(dims)
+        if calculate_std:
             std_name = name + std_suffix
-            retset[std_name] = ds[name].std(dim=dims)
+            retset[std_name] = xr.DataArray(std, dims=['time'], coords={'time': time})
             retset[std_name].attrs['Cate_Description'] = 'Accompanying std values for variable \'{}\''.format(name)
 
     return retset
+
+
+def _get_weights(array: xr.DataArray, weighted: bool, region) -> Optional[np.ndarray]:
+    """
+    Get the weights of the values of *array*, which has time as first dimension, as an array that
+    broadcasts against it, or None if all values have the same weight.
+    """
+    weights = None
+    if weighted and 'lat' in array.dims:
+        shape = [1] * array.ndim
+        shape[array.dims.index('lat')] = array.lat.size
+        weights = np.cos(np.deg2rad(array.lat.values)).reshape(shape)
+    if region is not None:
+        if 'lat' not in array.dims or 'lon' not in array.dims:
+            raise ValidationError('Variable \'{}\' has no lat and lon dimensions.'.format(array.name))
+        lat = array.lat.values
+        lon = array.lon.values
+        lat_step = lat[1] - lat[0] if lat.size > 1 else 1.
+        lon_step = lon[1] - lon[0] if lon.size > 1 else 1.
+        mask = get_polygon_mask_impl(region, (lon[0], lon_step, lon.size), (lat[0], lat_step, lat.size))
+        shape = [1] * array.ndim
+        shape[array.dims.index('lat')] = lat.size
+        shape[array.dims.index('lon')] = lon.size
+        if array.dims.index('lat') > array.dims.index('lon'):
+            mask = mask.T
+        mask = mask.reshape(shape).astype(np.float64)
+        weights = mask if weights is None else weights * mask
+    return weights
+
+
+def _weighted_moments(data, weights: Optional[np.ndarray]):
+    """
+    Compute the weighted mean and standard deviation of *data* over all but its first dimension,
+    ignoring NaNs. Dask arrays are processed chunk-wise: the moments of each chunk are computed
+    first and then merged.
+    """
+    if weights is None:
+        weights = np.ones((1,) * data.ndim)
+    if not isinstance(data, da.Array):
+        return _merge_moments(_block_moments(data, weights))
+    weights = da.from_array(np.broadcast_to(weights, (1,) + data.shape[1:]),
+                            chunks=((1,),) + data.chunks[1:])
+    moments = da.map_blocks(_block_moments, data, weights,
+                            chunks=(data.chunks[0],) + tuple((1,) * len(c) for c in data.chunks[1:]) + ((3,),),
+                            new_axis=data.ndim,
+                            dtype=np.float64)
+    return dask.delayed(_merge_moments)(moments)
+
+
+def _block_moments(block: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Compute sum of weights, weighted mean and weighted sum of squared deviations from
+    the mean of a block over all but its first dimension. The result has shape
+    (len(block), 1, ..., 1, 3).
+    """
+    axis = tuple(range(1, block.ndim))
+    valid = np.isfinite(block)
+    values = np.where(valid, block, 0.)
+    weights = np.where(valid, weights, 0.)
+    weight_sum = np.sum(weights, axis=axis, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.sum(weights * values, axis=axis, keepdims=True) / weight_sum
+    mean = np.where(weight_sum > 0, mean, 0.)
+    m2 = np.sum(weights * (values - mean) ** 2, axis=axis, keepdims=True)
+    return np.stack([weight_sum, mean, m2], axis=-1)
+
+
+def _merge_moments(moments: np.ndarray):
+    """
+    Merge the moments of blocks as computed by ``_block_moments`` into mean and standard
+    deviation along the first dimension, using the parallel variance algorithm.
+    """
+    moments = moments.reshape((moments.shape[0], -1, 3))
+    weight_sum, mean, m2 = moments[..., 0], moments[..., 1], moments[..., 2]
+    total_weight = np.sum(weight_sum, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_mean = np.sum(weight_sum * mean, axis=1) / total_weight
+        total_m2 = np.sum(m2 + weight_sum * (mean - total_mean[:, np.newaxis]) ** 2, axis=1)
+        std = np.sqrt(total_m2 / total_weight)
+    return total_mean, std
@@ -0,0 +1,283 @@
+# The MIT License (MIT)
+# Copyright (c) 2016, 2017 by the ESA CCI Toolbox development team and contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Description
+===========
+
+Zonal statistics operation, which computes statistics of dataset variables for many regions at once.
+
+Functions
+=========
+"""
+
+from typing import List, Sequence, Tuple
+
+import dask
+import dask.array as da
+import geopandas as gpd
+import numpy as np
+import scipy.sparse
+import shapely.geometry
+import xarray as xr
+
+from cate.core.op import op, op_input, op_return
+from cate.core.opimpl import get_polygon_mask_impl
+from cate.core.types import DatasetLike, DataFrameLike, ValidationError, VarNamesLike
+from cate.ops.select import select_var
+from cate.util.misc import to_list
+from cate.util.monitor import Monitor
+
+_ZONAL_STATS = ['mean', 'std', 'min', 'max', 'sum', 'count']
+
+#: Number of sub-pixels per pixel and axis used to estimate the coverage of pixels by regions
+_COVERAGE_SAMPLES = 5
+
+
+@op(tags=['geometric', 'spatial', 'statistics', 'timeseries'], version='1.0')
+@op_input('ds', data_type=DatasetLike)
+@op_input('gdf', data_type=DataFrameLike)
+@op_input('var', value_set_source='ds', data_type=VarNamesLike)
+@op_input('region_col', value_set_source='gdf')
+@op_return(add_history=True)
+def zonal_statistics(ds: DatasetLike.TYPE,
+                     gdf: gpd.GeoDataFrame,
+                     var: VarNamesLike.TYPE = None,
+                     stats: str = 'mean,std',
+                     region_col: str = None,
+                     weighted: bool = False,
+                     monitor: Monitor = Monitor.NONE) -> xr.Dataset:
+    """
+    Compute statistics of the given variables for all (multi-)polygons in a geo data frame, for example
+    for all countries or river basins, at each point in time.
+
+    All regions are rasterised once onto the grid of the dataset and the statistics of all regions and
+    variables are computed in a single pass over the data.
+
+    A pixel belongs to a region if its center falls into the region. If *weighted* is True, pixels belong
+    to all regions they overlap and are weighted by the fraction of their area covered by a region
+    and by their area, that is, the cosine of their latitude. Weights do not apply to *min*, *max* and
+    *count*.
+
+    The returned dataset contains for each variable *var* and statistic *stat* a variable named
+    'var_stat' that has a 'region' dimension followed by all non-spatial dimensions of the variable, e.g. time.
+
+    :param ds: The dataset, must have 1D, equidistant lat and lon coordinates.
+    :param gdf: A geo data frame with (multi-)polygon geometries in geographic coordinates.
+    :param var: Variables for which to compute statistics. If not given, all variables with lat and lon
+           dimensions are used.
+    :param stats: Comma separated list of statistics to compute, any of 'mean', 'std', 'min', 'max', 'sum'
+           and 'count'.
+    :param region_col: Name of a column of *gdf* that identifies regions. If not given, the index of *gdf* is used.
+    :param weighted: Whether to weight pixels by their area and by their coverage by regions.
+    :param monitor: a progress monitor.
+    :return: Dataset with statistics per region
+    """
+    ds = DatasetLike.convert(ds)
+    gdf = DataFrameLike.convert(gdf)
+
+    stats = to_list(stats) or []
+    if not stats:
+        raise ValidationError('At least one statistic must be given.')
+    for stat in stats:
+        if stat not in _ZONAL_STATS:
+            raise ValidationError('Unknown statistic "{}", must be one of {}.'.format(stat, ', '.join(_ZONAL_STATS)))
+
+    if 'lat' not in ds.coords or 'lon' not in ds.coords or ds.lat.ndim != 1 or ds.lon.ndim != 1:
+        raise ValidationError('Cannot compute zonal statistics. No (valid) geocoding found.')
+
+    if not isinstance(gdf, gpd.GeoDataFrame):
+        raise ValidationError('A geo data frame with polygon geometries is expected.')
+
+    if region_col:
+        if region_col not in gdf.columns:
+            raise ValidationError('Column "{}" not found in geo data frame.'.format(region_col))
+        regions = gdf[region_col].values
+    else:
+        regions = gdf.index.values
+
+    var_names = VarNamesLike.convert(var)
+    if var_names:
+        ds = select_var(ds, var_names)
+    var_names = [name for name in ds.data_vars if 'lat' in ds[name].dims and 'lon' in ds[name].dims]
+    if not var_names:
+        raise ValidationError('No variables with lat and lon dimensions found.')
+
+    with monitor.starting('Zonal statistics', total_work=10):
+        weights = _get_region_weights(gdf.geometry.values, ds.lat.values, ds.lon.values, weighted)
+        monitor.progress(1)
+
+        results = []
+        for name in var_names:
+            array = ds[name]
+            other_dims = [dim for dim in array.dims if dim not in ('lat', 'lon')]
+            results.append(_zonal_statistics_array(array.transpose(*other_dims, 'lat', 'lon').data,
+                                                   weights, stats))
+
+        # All variables and statistics are computed in a single pass over the data
+        with monitor.child(9).observing('Compute statistics'):
+            results = dask.compute(*results)
+
+    retset = xr.Dataset(coords={'region': regions})
+    for name, result in zip(var_names, results):
+        array = ds[name]
+        other_dims = [dim for dim in array.dims if dim not in ('lat', 'lon')]
+        coords = {dim: array[dim] for dim in other_dims if dim in array.coords}
+        for i, stat in enumerate(stats):
+            stat_array = xr.DataArray(result[..., i],
+                                      dims=other_dims + ['region'],
+                                      coords=coords,
+                                      attrs=dict(array.attrs))
+            stat_array.attrs['Cate_Description'] = '{} of \'{}\' values per region.'.format(stat.capitalize(), name)
+            if stat == 'count':
+                stat_array.attrs.pop('units', None)
+            retset['{}_{}'.format(name, stat)] = stat_array.transpose('region', *other_dims)
+
+    return retset
+
+
+def _get_region_weights(geometries: Sequence[shapely.geometry.base.BaseGeometry],
+                        lat: np.ndarray,
+                        lon: np.ndarray,
+                        weighted: bool) -> scipy.sparse.csr_matrix:
+    """
+    Rasterise regions into a sparse matrix of shape (number of regions, number of pixels) whose
+    non-zero entries are the weights of the pixels within a region.
+    """
+    lon_step = float(lon[1] - lon[0]) if lon.size > 1 else 1.
+    lat_step = float(lat[1] - lat[0]) if lat.size > 1 else 1.
+    if weighted:
+        samples = _COVERAGE_SAMPLES
+        area = np.cos(np.deg2rad(lat))
+    else:
+        samples = 1
+        area = None
+
+    rows, cols, values = [], [], []
+    for region_index, geometry in enumerate(geometries):
+        if geometry is None or geometry.is_empty \
+                or not isinstance(geometry, (shapely.geometry.Polygon, shapely.geometry.MultiPolygon)):
+            continue
+        lat_range = _get_index_range(lat, lat_step, geometry.bounds[1], geometry.bounds[3])
+        lon_range = _get_index_range(lon, lon_step, geometry.bounds[0], geometry.bounds[2])
+        if lat_range is None or lon_range is None:
+            continue
+        (lat_start, lat_stop), (lon_start, lon_stop) = lat_range, lon_range
+        height, width = lat_stop - lat_start, lon_stop - lon_start
+
+        # Rasterise sub-pixel centers within the region's bounding box
+        sub_lon_step = lon_step / samples
+        sub_lat_step = lat_step / samples
+        mask = get_polygon_mask_impl(geometry,
+                                     (float(lon[lon_start]) - (lon_step - sub_lon_step) / 2,
+                                      sub_lon_step, width * samples),
+                                     (float(lat[lat_start]) - (lat_step - sub_lat_step) / 2,
+                                      sub_lat_step, height * samples))
+        coverage = mask.reshape(height, samples, width, samples).mean(axis=(1, 3))
+        if area is not None:
+            coverage = coverage * area[lat_start:lat_stop, np.newaxis]
+
+        pixel_lat, pixel_lon = np.nonzero(coverage)
+        rows.append(np.full(pixel_lat.size, region_index))
+        cols.append((pixel_lat + lat_start) * lon.size + pixel_lon + lon_start)
+        values.append(coverage[pixel_lat, pixel_lon])
+
+    if rows:
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    return scipy.sparse.csr_matrix((values, (rows, cols)), shape=(len(geometries), lat.size * lon.size))
+
+
+def _get_index_range(coords: np.ndarray, step: float, min_value: float, max_value: float) -> Tuple[int, int]:
+    """
+    Get the index range (start, stop) of the pixels overlapping the interval [min_value, max_value].
+    """
+    index_0 = (min_value - coords[0]) / step
+    index_1 = (max_value - coords[0]) / step
+    start = max(int(np.floor(min(index_0, index_1) + 0.5)), 0)
+    stop = min(int(np.ceil(max(index_0, index_1) + 0.5)), coords.size)
+    if start >= stop:
+        return None
+    return start, stop
+
+
+def _zonal_statistics_array(data, weights: scipy.sparse.csr_matrix, stats: List[str]):
+    """
+    Compute the statistics of an array with lat and lon as last dimensions. The result has shape
+    (*other dimensions, number of regions, number of statistics). Dask arrays are processed chunk-wise.
+    """
+    num_regions = weights.shape[0]
+    # Only pixels that belong to any region need to be read from a chunk
+    pixels = np.unique(weights.indices)
+    weights = weights[:, pixels]
+    if not isinstance(data, da.Array):
+        return _zonal_statistics_block(data, pixels, weights, stats)
+    # Spatial slices must not be split between chunks
+    data = data.rechunk({data.ndim - 2: -1, data.ndim - 1: -1})
+    return data.map_blocks(_zonal_statistics_block, pixels, weights, stats,
+                           chunks=data.chunks[:-2] + ((num_regions,), (len(stats),)),
+                           dtype=np.float64)
+
+
+def _zonal_statistics_block(block: np.ndarray,
+                            pixels: np.ndarray,
+                            weights: scipy.sparse.csr_matrix,
+                            stats: List[str]) -> np.ndarray:
+    """
+    Compute the statistics of all regions for all spatial slices of a block.
+    *pixels* are the flat indices of the pixels that correspond to the columns of *weights*.
+    """
+    num_regions = weights.shape[0]
+    values = block.reshape((-1, block.shape[-2] * block.shape[-1]))[:, pixels].astype(np.float64)
+    valid = np.isfinite(values)
+    values_0 = np.where(valid, values, 0.)
+
+    result = np.full((values.shape[0], num_regions, len(stats)), np.nan)
+    weight_sum = values_sum = values_sq_sum = None
+    for i, stat in enumerate(stats):
+        if stat in ('mean', 'std', 'sum'):
+            if values_sum is None:
+                values_sum = (weights @ values_0.T).T
+                weight_sum = (weights @ valid.T.astype(np.float64)).T
+            if stat == 'sum':
+                result[..., i] = values_sum
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = np.where(weight_sum > 0., values_sum / weight_sum, np.nan)
+                if stat == 'mean':
+                    result[..., i] = mean
+                    continue
+                if values_sq_sum is None:
+                    values_sq_sum = (weights @ (values_0 * values_0).T).T
+                variance = np.where(weight_sum > 0., values_sq_sum / weight_sum, np.nan) - mean * mean
+            result[..., i] = np.sqrt(np.maximum(variance, 0.))
+        elif stat == 'count':
+            members = scipy.sparse.csr_matrix((np.ones_like(weights.data), weights.indices, weights.indptr),
+                                              shape=weights.shape)
+            result[..., i] = (members @ valid.T.astype(np.float64)).T
+        else:
+            # Grouped min/max over the pixels of each region, regions are the rows of the sparse matrix
+            non_empty = np.nonzero(np.diff(weights.indptr))[0]
+            if non_empty.size:
+                reduce = np.fmin if stat == 'min' else np.fmax
+                result[:, non_empty, i] = reduce.reduceat(values[:, weights.indices],
+                                                          weights.indptr[non_empty], axis=1)
+
+    return result.reshape(block.shape[:-2] + (num_regions, len(stats)))
@@ -95,7 +95,7 @@ class WorkspaceResourceHandler(WebAPIRequestHandler):
         workspace_manager = self.application.workspace_manager
         workspace = workspace_manager.get_workspace(base_dir)
         res_name = workspace.resource_cache.get_key(res_id)
-        resource = workspace.resource_cache[res_name]
+        resource = workspace.get_resource(res_name)
         return workspace, res_id, res_name, resource
 
 
@@ -312,11 +312,19 @@ class WebSocketService:
         with cwd(base_dir):
             return self.workspace_manager.run_op_in_workspace(base_dir, op_name, op_args, monitor=monitor)
 
+    def profile_op_in_workspace(self, base_dir: str, op_name: str, op_args: OpKwArgs,
+                                monitor: Monitor = Monitor.NONE) -> dict:
+        with cwd(base_dir):
+            return self.workspace_manager.profile_op_in_workspace(base_dir, op_name, op_args, monitor=monitor)
+
     def extract_pixel_values(self, base_dir: str, source: str,
                              point: Tuple[float, float], indexers: dict) -> Dict[str, Any]:
         with cwd(base_dir):
             from cate.ops.subset import extract_point
-            ds = self.workspace_manager.get_workspace(base_dir).resource_cache.get(source)
+            workspace = self.workspace_manager.get_workspace(base_dir)
+            if source not in workspace.resource_cache:
+                return {}
+            ds = workspace.get_resource(source)
             if ds is None:
                 return {}
             return extract_point(ds, point, indexers)
@@ -339,7 +347,7 @@ class WebSocketService:
         if res_name not in workspace.resource_cache:
             raise ValueError('Unknown resource "%s"' % res_name)
 
-        dataset = workspace.resource_cache[res_name]
+        dataset = workspace.get_resource(res_name)
         if not isinstance(dataset, xr.Dataset):
             raise ValueError('Resource "%s" must be a Dataset' % res_name)
 
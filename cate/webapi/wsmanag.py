@@ -175,6 +175,13 @@ class WebAPIWorkspaceManager(WorkspaceManager):
                                    timeout=WEBAPI_WORKSPACE_TIMEOUT,
                                    monitor=monitor)
 
+    def profile_op_in_workspace(self, base_dir: str, op_name: str, op_args: OpKwArgs,
+                                monitor: Monitor = Monitor.NONE) -> dict:
+        return self._invoke_method("profile_op_in_workspace",
+                                   dict(base_dir=base_dir, op_name=op_name, op_args=op_args),
+                                   timeout=WEBAPI_WORKSPACE_TIMEOUT,
+                                   monitor=monitor)
+
     def delete_workspace_resource(self, base_dir: str, res_name: str) -> Workspace:
         json_dict = self._invoke_method("delete_workspace_resource",
                                         dict(base_dir=base_dir, res_name=res_name),
@@ -224,6 +224,29 @@ class ResourceCommandTest(CliTestCase):
 
         self.remove_file(output_file)
 
+    def test_ws_run_profile(self):
+        output_file = '_timeseries_.nc'
+        trace_file = '_trace_.json'
+
+        self.assert_main(['ws', 'new'],
+                         expected_stdout=['Workspace created'])
+        self.assert_main(['res', 'read', 'ds', NETCDF_TEST_FILE],
+                         expected_stdout=['Resource "ds" set.'])
+        self.assert_main(['ws', 'run', '--profile', '--trace', trace_file,
+                          'write_netcdf4', 'obj=@ds', 'file=%s' % output_file],
+                         expected_stdout=["Operation 'write_netcdf4' executed.",
+                                          'Step',
+                                          'Trace written to %s' % trace_file])
+        self.assertTrue(os.path.isfile(trace_file))
+        with open(trace_file) as fp:
+            trace = json.load(fp)
+        self.assertEqual(len(trace['traceEvents']), 3)
+        self.assert_main(['ws', 'close'],
+                         expected_stdout=['Workspace closed.'])
+
+        self.remove_file(output_file)
+        self.remove_file(trace_file)
+
     def test_res_read_rename(self):
         input_file = NETCDF_TEST_FILE
 
@@ -265,7 +288,7 @@ class ResourceCommandTest(CliTestCase):
                              '  ds2 = cate.ops.io.read_object('
                              'file=%s, format=None) [OpStep]' % NETCDF_TEST_FILE,
                              '  ts = cate.ops.timeseries.tseries_mean('
-                             'ds=@ds2, var=temperature, std_suffix=_std, calculate_std=True) [OpStep]'])
+                             'ds=@ds2, var=temperature, std_suffix=_std, calculate_std=True, weighted=True, region=) [OpStep]'])
 
         self.assert_main(['res', 'set', 'ts', 'cate.ops.timeseries.tseries_mean', 'ds=@ds2', 'var=temperature'],
                          expected_status=1,
@@ -282,7 +305,7 @@ class ResourceCommandTest(CliTestCase):
                              '  ds2 = cate.ops.io.read_object('
                              'file=%s, format=None) [OpStep]' % NETCDF_TEST_FILE,
                              '  ts = cate.ops.timeseries.tseries_mean('
-                             'ds=@ds2, var=temperature, std_suffix=_std, calculate_std=True) [OpStep]'])
+                             'ds=@ds2, var=temperature, std_suffix=_std, calculate_std=True, weighted=True, region=) [OpStep]'])
 
         self.assert_main(['res', 'set', 'ts',
                           'cate.ops.timeseries.tseries_point', 'ds=@ds2', 'point=XYZ',
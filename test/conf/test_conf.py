@@ -47,6 +47,11 @@ class ConfTest(unittest.TestCase):
         self.assertTrue(value.endswith('/.cate/data_stores'))
         self.assertNotIn('~', value)
 
+    def test_get_regrid_weights_path(self):
+        value = conf.get_regrid_weights_path()
+        self.assertIsNotNone(value)
+        self.assertNotIn('~', value)
+
     def test_get_config(self):
         config = conf.get_config()
         self.assertIsNotNone(config)
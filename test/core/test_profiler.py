@@ -0,0 +1,99 @@
+import json
+from collections import OrderedDict
+from unittest import TestCase
+
+import numpy as np
+import xarray as xr
+
+from cate.core.op import op_input, op_output
+from cate.core.profiler import WorkflowProfiler, StepProfile
+from cate.core.workflow import OpStep, Workflow, ValueCache
+from cate.util.opmetainf import OpMetaInfo
+
+
+@op_input('x')
+@op_output('y')
+def op1(x):
+    return {'y': x + 1}
+
+
+@op_input('a')
+@op_output('b')
+def op2(a):
+    return {'b': xr.DataArray(np.full(1000, a, dtype=np.float64)).chunk(100).sum().compute()}
+
+
+def create_workflow():
+    step1 = OpStep(op1, node_id='op1')
+    step2 = OpStep(op2, node_id='op2')
+    workflow = Workflow(OpMetaInfo('myWorkflow', inputs=OrderedDict(p={}), outputs=OrderedDict(q={})))
+    workflow.add_steps(step1, step2)
+    step1.inputs.x.source = workflow.inputs.p
+    step2.inputs.a.source = step1.outputs.y
+    workflow.outputs.q.source = step2.outputs.b
+    workflow.inputs.p.value = 2
+    return workflow
+
+
+class WorkflowProfilerTest(TestCase):
+    def test_profile_workflow(self):
+        workflow = create_workflow()
+        value_cache = ValueCache()
+
+        profiler = WorkflowProfiler()
+        workflow.invoke(context=dict(profiler=profiler, value_cache=value_cache))
+        self.assertEqual(float(workflow.outputs.q.value), 3000.)
+
+        step_profiles = profiler.step_profiles
+        self.assertEqual([p.step_id for p in step_profiles], [workflow.id, 'op1', 'op2'])
+        self.assertEqual([p.depth for p in step_profiles], [0, 1, 1])
+        self.assertEqual([p.cache_hit for p in step_profiles], [None, False, False])
+        for step_profile in step_profiles:
+            self.assertIsNotNone(step_profile.wall_time)
+            self.assertIsNotNone(step_profile.cpu_time)
+            self.assertIsNotNone(step_profile.output_size)
+        self.assertEqual(step_profiles[1].dask_task_count, 0)
+        self.assertGreater(step_profiles[2].dask_task_count, 0)
+        self.assertGreaterEqual(step_profiles[0].dask_task_count, step_profiles[2].dask_task_count)
+
+        profiler = WorkflowProfiler()
+        workflow.invoke(context=dict(profiler=profiler, value_cache=value_cache))
+        self.assertEqual([p.cache_hit for p in profiler.step_profiles], [None, True, True])
+
+    def test_no_profiler(self):
+        workflow = create_workflow()
+        workflow.invoke()
+        self.assertEqual(float(workflow.outputs.q.value), 3000.)
+
+    def test_chrome_trace(self):
+        workflow = create_workflow()
+        profiler = WorkflowProfiler()
+        workflow.invoke(context=dict(profiler=profiler))
+
+        trace = profiler.to_chrome_trace()
+        # Must be JSON-serializable
+        json.dumps(trace)
+        trace_events = trace['traceEvents']
+        self.assertEqual(len(trace_events), 3)
+        self.assertEqual(trace_events[1]['name'], 'op1')
+        self.assertEqual(trace_events[1]['ph'], 'X')
+        self.assertEqual(trace_events[1]['cat'], 'test.core.test_profiler.op1')
+        self.assertIn('cpu_time', trace_events[1]['args'])
+        self.assertGreaterEqual(trace_events[0]['dur'], trace_events[1]['dur'] + trace_events[2]['dur'])
+
+    def test_format_summary(self):
+        profiler = WorkflowProfiler([StepProfile('wf', wall_time=0.5, cpu_time=0.25),
+                                     StepProfile('op1', depth=1, wall_time=0.5, cpu_time=0.25,
+                                                 dask_task_count=12, output_size=2 * 1024 * 1024, cache_hit=False)])
+        lines = profiler.format_summary().split('\n')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Step'))
+        self.assertTrue(lines[1].startswith('----'))
+        self.assertEqual(lines[2].split(), ['wf', '0.500', '0.250', '-', '-', '-', '-'])
+        self.assertEqual(lines[3].split(), ['op1', '0.500', '0.250', '-', '12', '-', '2.0', 'miss'])
+
+    def test_json(self):
+        profiler = WorkflowProfiler([StepProfile('op1', op_name='op1', wall_time=0.5, cache_hit=True)])
+        json_dict = profiler.to_json_dict()
+        profiler2 = WorkflowProfiler.from_json_dict(json.loads(json.dumps(json_dict)))
+        self.assertEqual(profiler2.to_json_dict(), json_dict)
@@ -571,7 +571,9 @@ class WorkflowStepTest(TestCase):
         workflow.invoke(context=dict(value_cache=value_cache))
         output_value = workflow.outputs.y.value
         self.assertEqual(output_value, 2 * (4 + 1) + 3 * (2 * (4 + 1)))
-        self.assertEqual(value_cache, {'jojo_87._child': {'op1': {'y': 5}, 'op2': {'b': 10}, 'op3': {'w': 40}}})
+        self.assertEqual(value_cache, {})
+        self.assertTrue(value_cache.has_child('jojo_87'))
+        self.assertEqual(value_cache.child('jojo_87'), {'op1': {'y': 5}, 'op2': {'b': 10}, 'op3': {'w': 40}})
 
 
 class OpStepTest(TestCase):
@@ -1214,10 +1216,23 @@ class ValueCacheTest(TestCase):
         self.assertIsInstance(child_vc, ValueCache)
         self.assertIn('bibo', vc)
         self.assertIs(vc['bibo'], bibo)
-        self.assertIn('bibo._child', vc)
-        self.assertIs(vc['bibo._child'], child_vc)
+        self.assertNotIn('bibo._child', vc)
+        self.assertEqual(list(vc.keys()), ['bibo'])
+        self.assertTrue(vc.has_child('bibo'))
+        self.assertIs(vc.child('bibo'), child_vc)
         self.assertIsNot(child_vc, vc)
 
+    def test_del_with_child(self):
+        bibo = ValueCacheTest.ClosableBibo()
+
+        vc = ValueCache()
+        vc['bibo'] = object()
+        vc.child('bibo')['bibo'] = bibo
+
+        del vc['bibo']
+        self.assertTrue(bibo.closed)
+        self.assertFalse(vc.has_child('bibo'))
+
     def test_get_id(self):
         vc = ValueCache()
         vc['bibo1'] = object()
@@ -1250,6 +1265,25 @@ class ValueCacheTest(TestCase):
         self.assertEqual(vc.get_id('bibo2'), 5)
         self.assertEqual(vc.get_id('bibo3'), 6)
 
+    def test_get_key(self):
+        vc = ValueCache()
+        vc['bibo1'] = object()
+        vc['bibo2'] = object()
+
+        self.assertEqual(vc.get_key(1), 'bibo1')
+        self.assertEqual(vc.get_key(2), 'bibo2')
+        self.assertEqual(vc.get_key(3), None)
+
+        del vc['bibo1']
+        self.assertEqual(vc.get_key(1), None)
+        self.assertEqual(vc.get_key(2), 'bibo2')
+
+        vc.pop('bibo2')
+        self.assertEqual(vc.get_key(2), None)
+
+        vc['bibo3'] = object()
+        self.assertEqual(vc.get_key(3), 'bibo3')
+
     def test_get_update_count(self):
         vc = ValueCache()
         vc['bibo1'] = object()
@@ -1287,10 +1321,12 @@ class ValueCacheTest(TestCase):
         vc.rename_key('bibo', 'bert')
 
         self.assertNotIn('bibo', vc)
-        self.assertNotIn('bibo._child', vc)
+        self.assertFalse(vc.has_child('bibo'))
 
         self.assertIn('bert', vc)
         self.assertIs(vc['bert'], bibo)
-        self.assertIn('bert._child', vc)
-        self.assertIs(vc['bert._child'], bibo_child)
+        self.assertTrue(vc.has_child('bert'))
+        self.assertIs(vc.child('bert'), bibo_child)
         self.assertEqual(vc.get_id('bert'), bibo_id)
+        self.assertEqual(vc.get_key(bibo_id), 'bert')
+        self.assertIs(vc.get_value_by_id(bibo_id), bibo)
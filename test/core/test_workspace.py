@@ -1,5 +1,6 @@
 import json
 import os
+import tempfile
 import unittest
 from collections import OrderedDict
 
@@ -9,6 +10,7 @@ import pandas as pd
 import xarray as xr
 from shapely.geometry import Point
 
+from cate.conf import conf
 from cate.core.types import ValidationError
 from cate.core.workflow import Workflow, OpStep
 from cate.core.workspace import Workspace, mk_op_arg, mk_op_args, mk_op_kwargs
@@ -586,3 +588,128 @@ class WorkspaceTest(unittest.TestCase):
         self.assertEqual(ws2.base_dir, ws.base_dir)
         self.assertEqual(ws2.workflow.op_meta_info.qualified_name, ws.workflow.op_meta_info.qualified_name)
         self.assertEqual(len(ws2.workflow.steps), len(ws.workflow.steps))
+
+    def test_save_writes_changed_resources_only(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            ws = Workspace.create(base_dir)
+            ws.set_resource('cate.ops.io.read_netcdf', mk_op_kwargs(file=NETCDF_TEST_FILE_1), res_name='X')
+            ws.set_resource_persistence('X', True)
+            ws.execute_workflow('X')
+
+            res_file = os.path.join(ws.workspace_dir, 'X.nc')
+            ws.save()
+            self.assertTrue(os.path.isfile(res_file))
+            self.assertFalse(os.path.exists(res_file + '.tmp'))
+            mtime_1 = os.stat(res_file).st_mtime_ns
+
+            # Unchanged resource must not be written again
+            ws.save()
+            self.assertEqual(os.stat(res_file).st_mtime_ns, mtime_1)
+
+            ws.set_resource('cate.ops.io.read_netcdf', mk_op_kwargs(file=NETCDF_TEST_FILE_2),
+                            res_name='X', overwrite=True)
+            ws.set_resource_persistence('X', True)
+            ws.execute_workflow('X')
+            future = ws.save(asynchronous=True)
+            self.assertIsNotNone(future)
+            future.result()
+            mtime_2 = os.stat(res_file).st_mtime_ns
+            self.assertNotEqual(mtime_2, mtime_1)
+            ws.close()
+
+            ws2 = Workspace.open(base_dir)
+            self.assertIn('X', ws2.resource_cache)
+            self.assertIsInstance(ws2.resource_cache['X'], xr.Dataset)
+            # Resource read from file must not be written again
+            ws2.save()
+            self.assertEqual(os.stat(res_file).st_mtime_ns, mtime_2)
+            ws2.close()
+
+    def test_save_and_open_zarr_and_parquet_resources(self):
+
+        def dataset_op() -> xr.Dataset:
+            return xr.Dataset(data_vars=dict(a=(('time', 'lat', 'lon'), np.random.rand(4, 6, 8))),
+                              coords=dict(time=np.arange(4), lat=np.arange(6), lon=np.arange(8))).chunk(
+                dict(time=1, lat=3, lon=4))
+
+        def data_frame_op() -> pd.DataFrame:
+            return pd.DataFrame(dict(a=[1, 2, 3], b=[0.5, 1.5, 2.5]))
+
+        def geo_data_frame_op() -> gpd.GeoDataFrame:
+            return gpd.GeoDataFrame(dict(a=[1, 2], geometry=[Point(1, 2), Point(3, 4)]))
+
+        from cate.core.op import OP_REGISTRY
+
+        old_format = conf.get_dataset_persistence_format()
+        op_regs = [OP_REGISTRY.add_op(dataset_op), OP_REGISTRY.add_op(data_frame_op),
+                   OP_REGISTRY.add_op(geo_data_frame_op)]
+        try:
+            conf.set_config(dict(dataset_persistence_format='zarr'))
+            with tempfile.TemporaryDirectory() as base_dir:
+                ws = Workspace.create(base_dir)
+                for op_reg, res_name in zip(op_regs, ['ds', 'df', 'gdf']):
+                    ws.set_resource(op_reg.op_meta_info.qualified_name, {}, res_name=res_name)
+                    ws.set_resource_persistence(res_name, True)
+                ws.execute_workflow()
+                ws.save()
+                ws.close()
+
+                self.assertTrue(os.path.isdir(os.path.join(ws.workspace_dir, 'ds.zarr')))
+                self.assertTrue(os.path.isfile(os.path.join(ws.workspace_dir, 'df.parquet')))
+                self.assertTrue(os.path.isfile(os.path.join(ws.workspace_dir, 'gdf.geoparquet')))
+
+                ws2 = Workspace.open(base_dir)
+                ds = ws2.resource_cache['ds']
+                self.assertIsInstance(ds, xr.Dataset)
+                self.assertEqual(ds.a.chunks, ((1, 1, 1, 1), (3, 3), (4, 4)))
+                df = ws2.resource_cache['df']
+                self.assertIsInstance(df, pd.DataFrame)
+                self.assertEqual(list(df['a']), [1, 2, 3])
+                gdf = ws2.resource_cache['gdf']
+                self.assertIsInstance(gdf, gpd.GeoDataFrame)
+                self.assertEqual(list(gdf.geometry), [Point(1, 2), Point(3, 4)])
+                ws2.close()
+        finally:
+            conf.set_config(dict(dataset_persistence_format=old_format))
+            for op_reg in op_regs:
+                OP_REGISTRY.remove_op(op_reg.wrapped_op)
+
+    def test_open_lazy(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            ws = Workspace.create(base_dir)
+            ws.set_resource('cate.ops.io.read_netcdf', mk_op_kwargs(file=NETCDF_TEST_FILE_1), res_name='X')
+            ws.set_resource_persistence('X', True)
+            ws.set_resource('cate.ops.timeseries.tseries_mean', mk_op_kwargs(ds="@X", var="precipitation"),
+                            res_name='Y')
+            ws.execute_workflow()
+            expected_resources = ws.to_json_dict()['resources']
+            ws.save()
+            ws.close()
+
+            res_file = os.path.join(ws.workspace_dir, 'X.nc')
+            mtime = os.stat(res_file).st_mtime_ns
+
+            ws2 = Workspace.open(base_dir, lazy=True)
+            self.assertIs(ws2.resource_cache['X'], UNDEFINED)
+            self.assertIs(ws2.resource_cache['Y'], UNDEFINED)
+
+            resources = ws2.to_json_dict()['resources']
+            self.assertEqual([r['name'] for r in resources], ['X', 'Y'])
+            self.assertEqual(resources[0]['dataType'], 'xarray.core.dataset.Dataset')
+            self.assertEqual([v['name'] for v in resources[0]['variables']],
+                             [v['name'] for v in expected_resources[0]['variables']])
+            self.assertEqual(resources[0]['dimSizes'], expected_resources[0]['dimSizes'])
+            res_id_x = resources[0]['id']
+
+            ds_y = ws2.get_resource('Y')
+            self.assertIsInstance(ds_y, xr.Dataset)
+            self.assertIn('precipitation', ds_y)
+            # Persistent resource has been read from file, not recomputed
+            ds_x = ws2.resource_cache['X']
+            self.assertIsInstance(ds_x, xr.Dataset)
+            self.assertEqual(os.path.abspath(ds_x.encoding['source']), os.path.abspath(res_file))
+            self.assertEqual(ws2.resource_cache.get_id('X'), res_id_x)
+
+            ws2.save()
+            self.assertEqual(os.stat(res_file).st_mtime_ns, mtime)
+            ws2.close()
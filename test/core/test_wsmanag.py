@@ -191,6 +191,34 @@ class WorkspaceManagerTestMixin:
 
         self.del_base_dir(base_dir)
 
+    def test_profile_op_in_workspace(self):
+        base_dir = self.new_base_dir('TESTOMAT')
+
+        workspace_manager = self.new_workspace_manager()
+        workspace_manager.new_workspace(base_dir)
+        workspace_manager.save_workspace(base_dir)
+        workspace_manager.set_workspace_resource(base_dir,
+                                                 'cate.ops.io.read_netcdf',
+                                                 dict(file=dict(value=NETCDF_TEST_FILE)),
+                                                 res_name='ds')
+
+        run_file_path = os.path.abspath(os.path.join('TESTOMAT', 'precip_and_temp_runcopy.nc'))
+        profile = workspace_manager.profile_op_in_workspace(base_dir, 'write_netcdf4',
+                                                            mk_op_kwargs(obj='@ds', file=run_file_path))
+        self.assertTrue(os.path.isfile(run_file_path))
+
+        step_profiles = profile['step_profiles']
+        self.assertEqual(len(step_profiles), 3)
+        self.assertEqual(step_profiles[0]['depth'], 0)
+        self.assertEqual(step_profiles[1]['step_id'], 'ds')
+        self.assertEqual(step_profiles[1]['depth'], 1)
+        self.assertEqual(step_profiles[1]['cache_hit'], True)
+        self.assertEqual(step_profiles[2]['op_name'], 'cate.ops.io.write_netcdf4')
+        self.assertEqual(step_profiles[2]['depth'], 0)
+
+        workspace_manager.close_workspace(base_dir)
+        self.del_base_dir(base_dir)
+
     def test_persistence(self):
         base_dir = self.new_base_dir('TESTOMAT')
 
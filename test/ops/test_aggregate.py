@@ -2,6 +2,9 @@
 Tests for aggregation operations
 """
 
+import os
+import time
+import unittest
 from unittest import TestCase
 
 import xarray as xr
@@ -14,6 +17,8 @@ from cate.util.monitor import ConsoleMonitor
 
 from cate.ops import long_term_average, temporal_aggregation, reduce
 from cate.ops import adjust_temporal_attrs
+from cate.ops import aggregate
+from cate.ops.utility import dummy_ds
 
 
 class TestLTA(TestCase):
@@ -122,6 +127,64 @@ class TestLTA(TestCase):
             long_term_average(ds)
         self.assertIn('inconsistent seasons', str(err.exception))
 
+    def test_methods(self):
+        """
+        Test statistics other than the mean and chunked input
+        """
+        data = np.random.RandomState(0).normal(size=[3, 4, 730])
+        data[0, 0, 5] = np.nan
+        ds = xr.Dataset({
+            'first': (['lat', 'lon', 'time'], data),
+            'lat': np.linspace(-45, 45, 3),
+            'lon': np.linspace(-135, 135, 4),
+            'time': pd.date_range('2001-01-01', '2002-12-31')})
+        ds = adjust_temporal_attrs(ds)
+        expected = {'mean': np.nanmean, 'sum': np.nansum, 'std': np.nanstd,
+                    'min': np.nanmin, 'max': np.nanmax, 'median': np.nanmedian,
+                    'count': lambda a, axis: np.sum(~np.isnan(a), axis=axis)}
+        pairs = np.stack([data[..., :365], data[..., 365:]], axis=-1)
+
+        for chunked_ds in [ds, ds.chunk(chunks={'time': 100, 'lat': 2})]:
+            for method, func in expected.items():
+                actual = long_term_average(chunked_ds, method=method)
+                self.assertEqual(actual['first'].dims, ('time', 'lat', 'lon'))
+                self.assertEqual(actual['first'].attrs['cell_methods'],
+                                 'time: {} over years'.format(method))
+                np.testing.assert_allclose(actual['first'].transpose('lat', 'lon', 'time').values,
+                                           func(pairs, axis=-1))
+
+            actual = long_term_average(chunked_ds, method='percentile', percentile=25)
+            self.assertEqual(actual['first'].attrs['cell_methods'],
+                             'time: percentile 25 over years')
+            np.testing.assert_allclose(actual['first'].transpose('lat', 'lon', 'time').values,
+                                       np.nanpercentile(pairs, 25, axis=-1))
+
+        with self.assertRaises(ValueError) as err:
+            long_term_average(ds, method='mode')
+        self.assertIn('must be one of', str(err.exception))
+
+    def test_chunked_daily(self):
+        """
+        Test daily input with single time step chunks, as opened by cate
+        """
+        data = np.random.RandomState(0).normal(size=[3, 4, 3650])
+        ds = xr.Dataset({
+            'first': (['lat', 'lon', 'time'], data),
+            'lat': np.linspace(-45, 45, 3),
+            'lon': np.linspace(-135, 135, 4),
+            'time': pd.date_range('2001-01-01', periods=3650)})
+        ds = adjust_temporal_attrs(ds).chunk(chunks={'time': 1})
+        expected = long_term_average(ds.compute(), method='std')
+        actual = long_term_average(ds, method='std')
+        np.testing.assert_allclose(actual['first'].values, expected['first'].values)
+
+        # Partial results span all keys, they must not be much larger than the input
+        data = ds['first'].data
+        keys = pd.DatetimeIndex(ds.time.values).dayofyear.values - 1
+        partials = aggregate._map_time_chunks(aggregate._segment_moments, data, keys, 3 * 366, 366)
+        self.assertEqual(4, len(partials))
+        self.assertLess(sum(partial.nbytes for partial in partials), 1.5 * data.nbytes)
+
     def test_registered(self):
         """
         Test registered operation execution
@@ -303,6 +366,75 @@ class TestTemporalAggregation(TestCase):
 
         self.assertTrue(actual.broadcast_equals(ex))
 
+    def test_methods(self):
+        """
+        Test aggregation methods on chunked and unchunked datasets
+        """
+        data = np.random.RandomState(0).normal(size=[3, 4, 366])
+        data[0, 0, 10:20] = np.nan
+        data[1, 1, 31:60] = np.nan
+        ds = xr.Dataset({
+            'first': (['lat', 'lon', 'time'], data),
+            'lat': np.linspace(-45, 45, 3),
+            'lon': np.linspace(-135, 135, 4),
+            'time': pd.date_range('2000-01-01', '2000-12-31')})
+        ds = adjust_temporal_attrs(ds)
+        months = pd.DatetimeIndex(ds.time.values).month.values
+        expected = {'mean': np.nanmean, 'sum': np.nansum, 'std': np.nanstd, 'var': np.nanvar,
+                    'min': np.nanmin, 'max': np.nanmax, 'median': np.nanmedian}
+
+        for chunked_ds in [ds, ds.chunk(chunks={'time': 7, 'lat': 2})]:
+            for method, func in expected.items():
+                actual = temporal_aggregation(chunked_ds, method=method)
+                self.assertEqual(actual['first'].dims, ('lat', 'lon', 'time'))
+                self.assertEqual(actual['first'].shape, (3, 4, 12))
+                for month in range(1, 13):
+                    with np.errstate(invalid='ignore'):
+                        np.testing.assert_allclose(actual['first'].values[..., month - 1],
+                                                   func(data[..., months == month], axis=-1))
+
+    def test_weighted(self):
+        """
+        Test aggregation weighted by the duration of time steps
+        """
+        ds = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.arange(24.).reshape([24, 1, 1]) * np.ones([24, 2, 3])),
+            'lat': np.linspace(-45, 45, 2),
+            'lon': np.linspace(-90, 90, 3),
+            'time': pd.date_range('2000-01-01', freq='MS', periods=24)}).chunk(chunks={'time': 5})
+        ds = adjust_temporal_attrs(ds)
+
+        actual = temporal_aggregation(ds, output_resolution='season', weighted=True)
+        # DJF 2000/2001, Dec 2000 has 31 days, Jan 2001 31 days, Feb 2001 28 days
+        self.assertAlmostEqual(float(actual['first'][4, 0, 0]), (11 * 31 + 12 * 31 + 13 * 28) / 90)
+        # MAM 2000, 31 + 30 + 31 days
+        self.assertAlmostEqual(float(actual['first'][1, 0, 0]), (2 * 31 + 3 * 30 + 4 * 31) / 92)
+
+        unweighted = temporal_aggregation(ds, output_resolution='season')
+        self.assertAlmostEqual(float(unweighted['first'][4, 0, 0]), 12.)
+
+        with self.assertRaises(ValueError) as err:
+            temporal_aggregation(ds, output_resolution='season', method='max', weighted=True)
+        self.assertIn('does not support weighting', str(err.exception))
+
+    @unittest.skipUnless(os.environ.get('CATE_ENABLE_BENCHMARKS', None) == '1', 'CATE_ENABLE_BENCHMARKS != 1')
+    def test_benchmark(self):
+        """
+        Compare run times with xarray's resample on a 10-year daily global cube
+        """
+        ds = dummy_ds(lon_dim=180, lat_dim=90, time_dim=3653)
+        ds = adjust_temporal_attrs(ds.chunk(chunks={'time': 1}))
+
+        for method in ['mean', 'std', 'median']:
+            t1 = time.perf_counter()
+            expected = getattr(ds.resample(time='MS'), method)().compute()
+            t2 = time.perf_counter()
+            actual = temporal_aggregation(ds, method=method).compute()
+            t3 = time.perf_counter()
+            print('{}: xarray resample took {:.2f}s, temporal_aggregation took {:.2f}s'
+                  .format(method, t2 - t1, t3 - t2))
+            np.testing.assert_allclose(actual['temperature'].values, expected['temperature'].values)
+
     def test_registered(self):
         """
         Test registered operation execution
@@ -140,3 +140,38 @@ class TestAnimateMap(TestCase):
                             var='second',
                             true_range=True,
                             file=tmp_file)
+
+    def test_render_frames(self):
+        # Frames rendered by worker processes must equal frames rendered in-process, in order
+        from cate.ops.animate import _render_frames
+        from cate.util.monitor import Monitor
+
+        var = xr.DataArray(np.random.rand(3, 5, 10),
+                           dims=['time', 'lat', 'lon'],
+                           coords=dict(lat=np.linspace(-89.5, 89.5, 5), lon=np.linspace(-179.5, 179.5, 10)))
+        frames = [var.isel(time=i) for i in range(3)]
+        render_kwargs = dict(projection='Robinson', central_lon=0.0, extents=None, title='Title',
+                             contour_plot=False, plot_kwargs=dict(vmin=0.0, vmax=1.0))
+
+        expected = []
+        _render_frames(iter(frames), 3, render_kwargs, expected.append, Monitor.NONE, max_workers=1)
+        actual = []
+        _render_frames(iter(frames), 3, render_kwargs, actual.append, Monitor.NONE, max_workers=2)
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(len(actual), 3)
+        for expected_frame, actual_frame in zip(expected, actual):
+            np.testing.assert_array_equal(actual_frame, expected_frame)
+
+    def test_render_frames_cancelled(self):
+        from cate.ops.animate import _render_frames
+        from cate.util.monitor import ConsoleMonitor, Cancellation
+
+        var = xr.DataArray(np.random.rand(2, 5, 10), dims=['time', 'lat', 'lon'])
+        frames = [var.isel(time=i) for i in range(2)]
+        for max_workers in (1, 2):
+            monitor = ConsoleMonitor()
+            monitor.cancel()
+            rendered = []
+            with self.assertRaises(Cancellation):
+                _render_frames(iter(frames), 2, {}, rendered.append, monitor, max_workers=max_workers)
+            self.assertEqual(rendered, [])
@@ -6,7 +6,10 @@ from unittest import TestCase
 
 import os
 import sys
+import time
+import unittest
 import numpy as np
+import pandas as pd
 import xarray as xr
 from datetime import datetime
 import tempfile
@@ -229,6 +232,65 @@ class TestExternal(TestCase):
                 # Test that actual is also a dask array
                 self.assertFalse(not actual.chunks)
 
+    def test_climatology_cache(self):
+        """
+        Test that climatologies are opened once and reopened when the file changes
+        """
+        ref = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.arange(12.).reshape([12, 1, 1]) * np.ones([12, 4, 8])),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8)})
+
+        ds = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.zeros([30, 4, 8])),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8),
+            'time': pd.date_range('2000-03-01', periods=30, freq='MS')})
+
+        with create_tmp_file() as tmp_file:
+            ref.to_netcdf(tmp_file, 'w')
+            clim = anomaly._get_climatology(tmp_file)
+            self.assertIs(clim, anomaly._get_climatology(tmp_file))
+
+            actual = anomaly.anomaly_external(ds, tmp_file)
+            expected = -((np.arange(30) + 2) % 12)
+            np.testing.assert_array_equal(actual.first.values[:, 0, 0], expected)
+            actual = anomaly.anomaly_external(ds.chunk({'time': 7}), tmp_file)
+            self.assertEqual((7, 7, 7, 7, 2), actual.first.chunks[0])
+            np.testing.assert_array_equal(actual.first.values[:, 0, 0], expected)
+
+            ref['first'] = ref.first + 1
+            ref.to_netcdf(tmp_file, 'w')
+            # Make sure the modification time changes on coarse file systems
+            os.utime(tmp_file, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+            self.assertIsNot(clim, anomaly._get_climatology(tmp_file))
+            actual = anomaly.anomaly_external(ds, tmp_file)
+            np.testing.assert_array_equal(actual.first.values[:, 0, 0], expected - 1)
+
+    @unittest.skipUnless(os.environ.get('CATE_ENABLE_BENCHMARKS', None) == '1', 'CATE_ENABLE_BENCHMARKS != 1')
+    def test_benchmark(self):
+        """
+        Compare run times with xarray's groupby arithmetic on a 40-year monthly cube
+        """
+        ds = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.random.random_sample([480, 180, 360]).astype(np.float32)),
+            'lat': np.linspace(-89.5, 89.5, 180),
+            'lon': np.linspace(-179.5, 179.5, 360),
+            'time': pd.date_range('1980-01-01', periods=480, freq='MS')})
+        ref = ds.groupby('time.month').mean().rename(month='time')
+
+        with create_tmp_file() as tmp_file:
+            ref.to_netcdf(tmp_file, 'w')
+            for dataset in [ds, ds.chunk({'time': 12})]:
+                t1 = time.perf_counter()
+                expected = (dataset.groupby('time.month') - ref.rename(time='month').assign_coords(
+                    month=np.arange(1, 13))).compute()
+                t2 = time.perf_counter()
+                actual = anomaly.anomaly_external(dataset, tmp_file).compute()
+                t3 = time.perf_counter()
+                print('groupby took {:.2f}s, anomaly_external took {:.2f}s'.format(t2 - t1, t3 - t2))
+                np.testing.assert_allclose(actual.first.values, expected.first.values)
+
     def test_registered(self):
         """
         Test the operation when it is invoked through the operation registry
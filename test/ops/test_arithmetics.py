@@ -10,6 +10,7 @@ import pandas as pd
 import xarray as xr
 
 from cate.core.op import OP_REGISTRY
+from cate.core.types import ValidationError
 from cate.ops import arithmetics
 from cate.util.misc import object_to_qualified_name
 
@@ -53,6 +54,28 @@ class TestDsArithmetics(TestCase):
             arithmetics.ds_arithmetics(dataset, 'not')
         self.assertTrue('not implemented' in str(err.exception))
 
+    def test_chunked(self):
+        dataset = xr.Dataset({
+            'first': (['lat', 'lon', 'time'], np.random.rand(45, 90, 3), dict(units='K')),
+            'second': (['lat', 'lon', 'time'], np.arange(45 * 90 * 3, dtype=np.int32).reshape((45, 90, 3)) % 10),
+            'lat': np.linspace(-88, 88, 45),
+            'lon': np.linspace(-178, 178, 90)},
+            attrs=dict(title='test'))
+
+        expected = arithmetics.ds_arithmetics(dataset, 'exp, -1, log1p, *2, +3')
+        actual = arithmetics.ds_arithmetics(dataset.chunk(dict(lat=15, lon=30)), 'exp, -1, log1p, *2, +3')
+        self.assertIsNotNone(actual.first.chunks)
+        # All operations are fused into a single layer on top of the chunked input
+        self.assertEqual(len(actual.first.data.dask.layers), 2)
+        self.assertEqual(actual.first.dtype, expected.first.dtype)
+        self.assertEqual(actual.second.dtype, expected.second.dtype)
+        self.assertEqual(actual.first.attrs, dict(units='K'))
+        self.assertEqual(actual.attrs['title'], 'test')
+        assert_dataset_equal(expected.compute(), actual.compute())
+
+        np.testing.assert_allclose(expected.first.values, 2 * dataset.first.values + 3)
+        np.testing.assert_allclose(expected.second.values, 2 * dataset.second.values + 3)
+
     def test_registered(self):
         """
         Test the operation when invoked through the OP_REGISTRY
@@ -285,6 +308,80 @@ class ComputeDatasetTest(TestCase):
             'lon': lon})
         assert_dataset_equal(expected, actual)
 
+    def test_compiled_compute(self):
+        from unittest.mock import patch
+
+        dataset = xr.Dataset({
+            'da1': (['lat', 'lon', 'time'], np.random.rand(45, 90, 3).astype(np.float32), dict(units='K')),
+            'da2': (['lat', 'lon', 'time'], np.random.rand(45, 90, 3)),
+            'lat': np.linspace(-88, 88, 45),
+            'lon': np.linspace(-178, 178, 90)
+        })
+        script = ("_x = 0.5 * da2\n"
+                  "x1 = np.where(da1 > 0.5, 2 * da1 - 3 * _x, -1)\n"
+                  "x2 = np.sqrt(da1) + np.arctan2(da1, _x) * np.pi\n")
+        _x = 0.5 * dataset.da2.values
+        expected_x1 = np.where(dataset.da1.values > 0.5, 2 * dataset.da1.values - 3 * _x, -1)
+        expected_x2 = np.sqrt(dataset.da1.values) + np.arctan2(dataset.da1.values, _x) * np.pi
+
+        # Evaluate with numexpr, if installed, and with numpy
+        for numexpr in (arithmetics.numexpr, None):
+            with patch.object(arithmetics, 'numexpr', numexpr):
+                actual = arithmetics.compute_dataset(ds=dataset, script=script)
+                self.assertEqual(set(actual.data_vars), {'x1', 'x2'})
+                self.assertEqual(actual.x1.dims, ('lat', 'lon', 'time'))
+                self.assertEqual(actual.x1.attrs, dict(units='K'))
+                np.testing.assert_allclose(actual.x1.values, expected_x1, rtol=1e-5)
+                np.testing.assert_allclose(actual.x2.values, expected_x2, rtol=1e-5)
+
+                chunked_dataset = dataset.chunk(dict(lat=15))
+                actual = arithmetics.compute_dataset(ds=chunked_dataset, script=script, copy=True)
+                self.assertEqual(set(actual.data_vars), {'da1', 'da2', 'x1', 'x2'})
+                self.assertIsNotNone(actual.x1.chunks)
+                self.assertEqual(actual.x1.chunks, chunked_dataset.da1.chunks)
+                np.testing.assert_allclose(actual.x1.values, expected_x1, rtol=1e-5)
+                np.testing.assert_allclose(actual.x2.values, expected_x2, rtol=1e-5)
+
+    def test_compiled_compute_attrs(self):
+        dataset = xr.Dataset({
+            'a': (['lat', 'lon'], np.ones([45, 90]), dict(units='K', long_name='A', source='s')),
+            'b': (['lat', 'lon'], np.ones([45, 90]), dict(units='m', source='s', comment='c')),
+            'lat': np.linspace(-88, 88, 45),
+            'lon': np.linspace(-178, 178, 90)
+        })
+        # Conflicting attributes are dropped, like in xarray arithmetic
+        for script in ("x = a * 2.5 + b", "x = (a > 0.2) & (b > 0)"):
+            self.assertIsNotNone(arithmetics._compile_script(script, dataset))
+            actual = arithmetics.compute_dataset(ds=dataset, script=script)
+            self.assertEqual(actual.x.attrs, dict(long_name='A', source='s', comment='c'))
+            expected = arithmetics._exec_script(script, (xr.DataArray,), None, dataset)
+            self.assertEqual(actual.x.attrs, expected['x'].attrs)
+        actual = arithmetics.compute_dataset(ds=dataset, script="x = np.sqrt(a)")
+        self.assertEqual(actual.x.attrs, dict(units='K', long_name='A', source='s'))
+
+    def test_compiled_compute_errors(self):
+        dataset = xr.Dataset({'i': (['x'], np.arange(3, dtype=np.int32))})
+        # Scripts that can't be compiled are reported as script errors
+        for script in ("x = i + 3000000000", "x = i * (1 / 0)"):
+            self.assertIsNone(arithmetics._compile_script(script, dataset))
+            with self.assertRaises(ValidationError) as cm:
+                arithmetics.compute_dataset(ds=dataset, script=script)
+            self.assertTrue(str(cm.exception).startswith('Error in Python script:'))
+
+    def test_compute_not_compiled(self):
+        dataset = xr.Dataset({
+            'da1': (['lat', 'lon'], np.ones([45, 90])),
+            'lat': np.linspace(-88, 88, 45),
+            'lon': np.linspace(-178, 178, 90)
+        })
+        # Scripts outside the compiled subset are executed as Python code
+        self.assertIsNone(arithmetics._compile_script("x = da1.mean(dim='lon')", dataset))
+        actual = arithmetics.compute_dataset(ds=dataset, script="x = da1.mean(dim='lon')")
+        np.testing.assert_array_equal(actual.x.values, np.ones([45]))
+        self.assertIsNone(arithmetics._compile_script("x = da1 * 2 ** -1", dataset))
+        actual = arithmetics.compute_dataset(ds=dataset, script="x = da1 * 2 ** -1")
+        np.testing.assert_array_equal(actual.x.values, np.full([45, 90], 0.5))
+
 
 class ComputeDataFrameTest(TestCase):
 
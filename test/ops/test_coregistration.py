@@ -6,8 +6,13 @@ when using default upsampling/downsampling methods.
 
 """
 
+import os
+import shutil
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
+import dask.array
 import numpy as np
 import xarray as xr
 from numpy.testing import assert_almost_equal, assert_array_equal
@@ -16,7 +21,7 @@ from cate.core.op import OP_REGISTRY
 from cate.util.misc import object_to_qualified_name
 
 from cate.ops import coregister
-from cate.ops.coregistration import _find_intersection
+from cate.ops.coregistration import _find_intersection, _get_conservative_weights
 from ..util.test_monitor import RecordingMonitor
 
 
@@ -48,32 +53,10 @@ class TestCoregistration(TestCase):
         ds_coarse_resampled = coregister(ds_fine, ds_coarse, monitor=rm)
         self.assertEqual([('start', 'coregister dataset', 2),
                           ('progress', 0.0, 'coregister dataarray', 0),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 0),
-                          ('progress', 0.125, None, 6),
-                          ('progress', 0.125, None, 13),
-                          ('progress', 0.125, None, 19),
-                          ('progress', 0.125, None, 25),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 25),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 25),
-                          ('progress', 0.125, None, 31),
-                          ('progress', 0.125, None, 38),
-                          ('progress', 0.125, None, 44),
-                          ('progress', 0.125, None, 50),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 50),
+                          ('progress', 1.0, None, 50),
                           ('progress', 0.0, 'coregister dataarray', 50),
                           ('progress', 0.0, 'coregister dataarray', 50),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 50),
-                          ('progress', 0.125, None, 56),
-                          ('progress', 0.125, None, 63),
-                          ('progress', 0.125, None, 69),
-                          ('progress', 0.125, None, 75),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 75),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 75),
-                          ('progress', 0.125, None, 81),
-                          ('progress', 0.125, None, 88),
-                          ('progress', 0.125, None, 94),
-                          ('progress', 0.125, None, 100),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 100),
+                          ('progress', 1.0, None, 100),
                           ('progress', 0.0, 'coregister dataarray', 100),
                           ('done',)], rm.records)
 
@@ -455,104 +438,10 @@ class TestCoregistration(TestCase):
 
         self.assertEqual([('start', 'coregister dataset', 2),
                           ('progress', 0.0, 'coregister dataarray', 0),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 0),
-                          ('progress', 0.03125, None, 2),
-                          ('progress', 0.03125, None, 3),
-                          ('progress', 0.03125, None, 5),
-                          ('progress', 0.03125, None, 6),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 6),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 6),
-                          ('progress', 0.03125, None, 8),
-                          ('progress', 0.03125, None, 9),
-                          ('progress', 0.03125, None, 11),
-                          ('progress', 0.03125, None, 13),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 13),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 13),
-                          ('progress', 0.03125, None, 14),
-                          ('progress', 0.03125, None, 16),
-                          ('progress', 0.03125, None, 17),
-                          ('progress', 0.03125, None, 19),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 19),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 19),
-                          ('progress', 0.03125, None, 20),
-                          ('progress', 0.03125, None, 22),
-                          ('progress', 0.03125, None, 23),
-                          ('progress', 0.03125, None, 25),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 25),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 25),
-                          ('progress', 0.03125, None, 27),
-                          ('progress', 0.03125, None, 28),
-                          ('progress', 0.03125, None, 30),
-                          ('progress', 0.03125, None, 31),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 31),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 31),
-                          ('progress', 0.03125, None, 33),
-                          ('progress', 0.03125, None, 34),
-                          ('progress', 0.03125, None, 36),
-                          ('progress', 0.03125, None, 38),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 38),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 38),
-                          ('progress', 0.03125, None, 39),
-                          ('progress', 0.03125, None, 41),
-                          ('progress', 0.03125, None, 42),
-                          ('progress', 0.03125, None, 44),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 44),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 44),
-                          ('progress', 0.03125, None, 45),
-                          ('progress', 0.03125, None, 47),
-                          ('progress', 0.03125, None, 48),
-                          ('progress', 0.03125, None, 50),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 50),
+                          ('progress', 1.0, None, 50),
                           ('progress', 0.0, 'coregister dataarray', 50),
                           ('progress', 0.0, 'coregister dataarray', 50),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 50),
-                          ('progress', 0.03125, None, 52),
-                          ('progress', 0.03125, None, 53),
-                          ('progress', 0.03125, None, 55),
-                          ('progress', 0.03125, None, 56),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 56),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 56),
-                          ('progress', 0.03125, None, 58),
-                          ('progress', 0.03125, None, 59),
-                          ('progress', 0.03125, None, 61),
-                          ('progress', 0.03125, None, 63),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 63),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 63),
-                          ('progress', 0.03125, None, 64),
-                          ('progress', 0.03125, None, 66),
-                          ('progress', 0.03125, None, 67),
-                          ('progress', 0.03125, None, 69),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 69),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 69),
-                          ('progress', 0.03125, None, 70),
-                          ('progress', 0.03125, None, 72),
-                          ('progress', 0.03125, None, 73),
-                          ('progress', 0.03125, None, 75),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 75),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 75),
-                          ('progress', 0.03125, None, 77),
-                          ('progress', 0.03125, None, 78),
-                          ('progress', 0.03125, None, 80),
-                          ('progress', 0.03125, None, 81),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 81),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 81),
-                          ('progress', 0.03125, None, 83),
-                          ('progress', 0.03125, None, 84),
-                          ('progress', 0.03125, None, 86),
-                          ('progress', 0.03125, None, 88),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 88),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 88),
-                          ('progress', 0.03125, None, 89),
-                          ('progress', 0.03125, None, 91),
-                          ('progress', 0.03125, None, 92),
-                          ('progress', 0.03125, None, 94),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 94),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 94),
-                          ('progress', 0.03125, None, 95),
-                          ('progress', 0.03125, None, 97),
-                          ('progress', 0.03125, None, 98),
-                          ('progress', 0.03125, None, 100),
-                          ('progress', 0.0, 'coregister dataarray: resample slice', 100),
+                          ('progress', 1.0, None, 100),
                           ('progress', 0.0, 'coregister dataarray', 100),
                           ('done',)], rm.records)
 
@@ -770,3 +659,94 @@ class TestCoregistration(TestCase):
         ds_coreg = coregister(ds_subset, ds_fine, monitor=rm)
         self.assertEqual([], rm.records)
         assert_almost_equal(ds_coreg['first'].values, ds_subset['first'].values)
+
+    def test_lazy(self):
+        """
+        Test that coregistration is lazy and resamples chunk-wise
+        """
+        ds_fine = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.array([np.eye(4, 8)] * 4)),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8),
+            'time': np.array([1, 2, 3, 4])})
+
+        ds_coarse = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.array([np.eye(3, 6)] * 4)),
+            'lat': np.linspace(-60, 60, 3),
+            'lon': np.linspace(-150, 150, 6),
+            'time': np.array([1, 2, 3, 4])}).chunk(chunks={'time': 2, 'lat': 3, 'lon': 3})
+
+        ds_coarse_resampled = coregister(ds_fine, ds_coarse)
+        self.assertIsInstance(ds_coarse_resampled['first'].data, dask.array.Array)
+        self.assertEqual(((2, 2), (4,), (8,)), ds_coarse_resampled['first'].data.chunks)
+
+        ds_coarse_eager = coregister(ds_fine, ds_coarse.compute())
+        self.assertEqual(((1, 1, 1, 1), (4,), (8,)), ds_coarse_eager['first'].data.chunks)
+        assert_almost_equal(ds_coarse_resampled['first'].values, ds_coarse_eager['first'].values)
+
+    def test_conservative(self):
+        """
+        Test conservative regridding
+        """
+        ds_fine = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.array([np.arange(32.).reshape(4, 8),
+                                                        np.arange(32.).reshape(4, 8)])),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8),
+            'time': np.array([1, 2])})
+
+        ds_coarse = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.array([np.eye(2, 4), np.eye(2, 4) * 2.])),
+            'lat': np.linspace(-45, 45, 2),
+            'lon': np.linspace(-135, 135, 4),
+            'time': np.array([1, 2])}).chunk(chunks={'time': 1})
+
+        # Relative areas of the fine grid's pixel rows
+        area = np.diff(np.sin(np.deg2rad([-90., -45., 0., 45., 90.])))
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with patch('cate.ops.coregistration.get_regrid_weights_path', return_value=tmp_dir):
+                _get_conservative_weights.cache_clear()
+
+                # Test that the fine dataset has been aggregated using the
+                # areas of the pixel overlaps as weights
+                ds_fine_resampled = coregister(ds_coarse, ds_fine, method_ds='conservative')
+                values = ds_fine['first'].values[0]
+                expected = np.zeros((2, 4))
+                for lat in range(2):
+                    for lon in range(4):
+                        rows = slice(2 * lat, 2 * lat + 2)
+                        cols = slice(2 * lon, 2 * lon + 2)
+                        expected[lat, lon] = ((area[rows, None] * values[rows, cols]).sum()
+                                              / (2 * area[rows].sum()))
+                assert_almost_equal(ds_fine_resampled['first'].values[0], expected)
+                self.assertEqual(1, len(os.listdir(tmp_dir)))
+
+                # Test that the area weighted sum is preserved
+                total = (area[:, None] * values).sum()
+                total_resampled = (np.array([area[:2].sum(), area[2:].sum()])[:, None] * 2
+                                   * ds_fine_resampled['first'].values[0]).sum()
+                self.assertAlmostEqual(total, total_resampled)
+
+                # Test that the coarse dataset has been distributed to all
+                # overlapping pixels of the finer grid
+                ds_coarse_resampled = coregister(ds_fine, ds_coarse, method_us='conservative')
+                self.assertIsInstance(ds_coarse_resampled['first'].data, dask.array.Array)
+                assert_almost_equal(ds_coarse_resampled['first'].values[1],
+                                    np.kron(np.eye(2, 4) * 2., np.ones((2, 2))))
+                self.assertEqual(2, len(os.listdir(tmp_dir)))
+
+                # Test that missing values are ignored and that weights are
+                # read from the cache directory
+                _get_conservative_weights.cache_clear()
+                ds_fine['first'][0, 0, 0] = np.nan
+                ds_fine_resampled = coregister(ds_coarse, ds_fine, method_ds='conservative')
+                self.assertEqual(2, len(os.listdir(tmp_dir)))
+                assert_almost_equal(ds_fine_resampled['first'].values[0, 0, 0],
+                                    (area[0] * values[0, 1] + area[1] * (values[1, 0] + values[1, 1]))
+                                    / (area[0] + 2 * area[1]))
+                assert_almost_equal(ds_fine_resampled['first'].values[0, 1], expected[1])
+        finally:
+            _get_conservative_weights.cache_clear()
+            shutil.rmtree(tmp_dir)
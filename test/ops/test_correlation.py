@@ -209,6 +209,79 @@ class TestPearson(TestCase):
         self.assertTrue(np.all(np.isclose(correlation['p_value'].values,
                                           pv_sp)))
 
+    def test_missing_values(self):
+        """
+        Test that missing values are excluded pairwise
+        """
+        x = np.linspace(0, 9, 10)
+        y = np.sin(x)
+        x[2] = np.nan
+        y[7] = np.nan
+        valid = np.isfinite(x) & np.isfinite(y)
+        cc_sp, pv_sp = pearsonr(x[valid], y[valid])
+
+        x_3d = np.empty((10, 2, 3))
+        y_3d = np.empty((10, 2, 3))
+        x_3d[:] = x[:, np.newaxis, np.newaxis]
+        y_3d[:] = y[:, np.newaxis, np.newaxis]
+        # A pixel with less than three valid pairs
+        y_3d[2:, 0, 0] = np.nan
+
+        ds1 = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], x_3d),
+            'lat': np.linspace(-45, 45, 2),
+            'lon': np.linspace(-90, 90, 3),
+            'time': np.arange(10)}).chunk(chunks={'time': 3})
+
+        ds2 = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], y_3d),
+            'lat': np.linspace(-45, 45, 2),
+            'lon': np.linspace(-90, 90, 3),
+            'time': np.arange(10)}).chunk(chunks={'time': 3})
+
+        correlation = pearson_correlation(ds1, ds2, 'first', 'first')
+        corr_coef = correlation['corr_coef'].values
+        p_value = correlation['p_value'].values
+        self.assertTrue(np.isnan(p_value[0, 0]))
+        self.assertTrue(np.allclose(corr_coef.flatten()[1:], cc_sp))
+        self.assertTrue(np.allclose(p_value.flatten()[1:], pv_sp))
+
+    def test_lag(self):
+        """
+        Test lagged correlations
+        """
+        x = np.random.RandomState(42).normal(size=20)
+        y = np.roll(x, 2) + 0.1 * np.linspace(0, 1, 20)
+
+        x_3d = np.empty((20, 2, 3))
+        x_3d[:] = x[:, np.newaxis, np.newaxis]
+
+        ds1 = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], x_3d),
+            'lat': np.linspace(-45, 45, 2),
+            'lon': np.linspace(-90, 90, 3),
+            'time': np.arange(20)}).chunk(chunks={'time': 5})
+
+        ds2 = xr.Dataset({
+            'first': (['time'], y),
+            'time': np.arange(20)})
+
+        correlation = pearson_correlation(ds1, ds2, 'first', 'first', max_lag=3)
+        self.assertEqual(list(correlation['lag'].values), [-3, -2, -1, 0, 1, 2, 3])
+        self.assertEqual(correlation['corr_coef'].dims, ('lag', 'lat', 'lon'))
+        for lag in range(-3, 4):
+            if lag >= 0:
+                cc_sp, pv_sp = pearsonr(x[:20 - lag], y[lag:])
+            else:
+                cc_sp, pv_sp = pearsonr(x[-lag:], y[:20 + lag])
+            self.assertTrue(np.allclose(correlation['corr_coef'].sel(lag=lag).values, cc_sp))
+            self.assertTrue(np.allclose(correlation['p_value'].sel(lag=lag).values, pv_sp))
+        self.assertEqual(int(correlation['corr_coef'].mean(dim=['lat', 'lon']).argmax()), 5)
+
+        with self.assertRaises(ValueError) as err:
+            pearson_correlation(ds1, ds2, 'first', 'first', max_lag=18)
+        self.assertIn('maximum lag', str(err.exception))
+
     def test_broadcasting(self):
         """
         Test a (3d, 1d) input pair
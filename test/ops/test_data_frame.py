@@ -1,3 +1,6 @@
+import os
+import time
+import unittest
 from unittest import TestCase
 
 import geopandas as gpd
@@ -10,7 +13,7 @@ from shapely.geometry import Point
 from cate.core.types import ValidationError
 from cate.core.types import GeoDataFrameProxy
 from cate.ops.data_frame import data_frame_min, data_frame_max, data_frame_query, data_frame_find_closest, \
-    great_circle_distance, data_frame_aggregate, data_frame_subset
+    great_circle_distance, great_circle_distances, data_frame_aggregate, data_frame_subset
 
 test_point = 'POINT (597842.4375881671 5519903.13366397)'
 
@@ -173,6 +176,34 @@ class TestDataFrameOps(TestCase):
                                 region=TestDataFrameOps.test_region_4326)
         self.assertEqual(len(df2), 1)
 
+    def test_data_frame_subset_region_ops(self):
+        gdf = TestDataFrameOps.gdf
+        region = 'POLYGON((15 5, 25 5, 25 35, 15 35, 15 5))'
+        expected = dict(almost_equals=[], contains=[], crosses=[], disjoint=[1, 2, 3], intersects=[4, 5, 6],
+                        touches=[], within=[4, 5, 6])
+        for region_op, expected_values in expected.items():
+            df2 = data_frame_subset(gdf, region_op=region_op, region=region)
+            self.assertIsInstance(df2, gpd.GeoDataFrame)
+            self.assertEqual(expected_values, list(df2['A']), msg=region_op)
+
+        # Regions for which the other operations select features
+        boxes_gdf = gpd.GeoDataFrame({'A': [1, 2, 3]},
+                                     geometry=[shapely.geometry.box(0, 0, 10, 10),
+                                               shapely.geometry.box(10, 0, 20, 10),
+                                               shapely.geometry.box(0, 10, 10, 20)])
+        cases = [(gdf, 'touches', 'POLYGON((15 5, 20 5, 20 35, 15 35, 15 5))', [4, 5, 6]),
+                 (gdf, 'within', 'POLYGON((15 5, 20 5, 20 35, 15 35, 15 5))', []),
+                 (boxes_gdf, 'touches', 'POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))', [1, 2, 3]),
+                 (boxes_gdf, 'touches', 'POLYGON((5 5, 15 5, 15 15, 5 15, 5 5))', []),
+                 (boxes_gdf, 'contains', 'POLYGON((12 2, 14 2, 14 4, 12 4, 12 2))', [2]),
+                 (boxes_gdf, 'contains', 'POLYGON((5 2, 14 2, 14 4, 5 4, 5 2))', []),
+                 (boxes_gdf, 'almost_equals', shapely.geometry.box(10, 0, 20, 10).wkt, [2]),
+                 (boxes_gdf, 'almost_equals', shapely.geometry.box(10, 0, 20.0000001, 10).wkt, [2]),
+                 (boxes_gdf, 'almost_equals', shapely.geometry.box(10, 0, 20.001, 10).wkt, [])]
+        for df, region_op, region, expected_values in cases:
+            df2 = data_frame_subset(df, region_op=region_op, region=region)
+            self.assertEqual(expected_values, list(df2['A']), msg=region_op + ' ' + region)
+
     def test_data_frame_find_closest(self):
         df2 = data_frame_find_closest(TestDataFrameOps.gdf, 'POINT(20 30)',
                                       dist_col_name='dist')
@@ -220,6 +251,52 @@ class TestDataFrameOps(TestCase):
         self.assertEqual(shapely.wkt.loads('POINT(20 30)'), df2['geometry'].iloc[0])
         self.assertEqual(shapely.wkt.loads('POINT(20 20)'), df2['geometry'].iloc[1])
 
+    def test_data_frame_find_closest_polygons(self):
+        gdf = gpd.GeoDataFrame({'A': [1, 2, 3, 4],
+                                'geometry': gpd.GeoSeries([shapely.geometry.box(9, 9, 11, 11),
+                                                           None,
+                                                           shapely.wkt.loads('POINT(20 20)'),
+                                                           shapely.geometry.box(-11, -11, -9, -9)])})
+        df2 = data_frame_find_closest(gdf, 'POINT(12 12)', max_results=10, dist_col_name='dist')
+        self.assertEqual([1, 3, 4], list(df2['A']))
+        np.testing.assert_allclose(df2['dist'].values,
+                                   great_circle_distances(12, 12, np.array([10, 20, -10]), np.array([10, 20, -10])))
+
+        df2 = data_frame_find_closest(gdf, 'POINT(12 12)', max_results=10, max_dist=1.)
+        self.assertEqual(0, len(df2))
+        self.assertIn('distance', df2)
+
+    def test_data_frame_find_closest_proxy(self):
+        df2 = data_frame_find_closest(TestDataFrameOps.gdfp, 'POINT(21 28)', max_results=2)
+        self.assertEqual([4, 5], list(df2['A']))
+
+    def test_great_circle_distances(self):
+        lon = np.array([20., 10., -170., 21.])
+        lat = np.array([30., 20., -30., 28.])
+        expected = [great_circle_distance(Point(21, 28), Point(x, y)) for x, y in zip(lon, lat)]
+        np.testing.assert_allclose(great_circle_distances(21., 28., lon, lat), expected)
+
+    @unittest.skipUnless(os.environ.get('CATE_ENABLE_BENCHMARKS', None) == '1', 'CATE_ENABLE_BENCHMARKS != 1')
+    def test_data_frame_find_closest_benchmark(self):
+        """
+        Compare run times with a loop over the rows of a 1M-row GeoDataFrame
+        """
+        num_rows = 1000000
+        random = np.random.RandomState(0)
+        gdf = gpd.GeoDataFrame({'A': np.arange(num_rows)},
+                               geometry=gpd.points_from_xy(random.uniform(-180, 180, num_rows),
+                                                           random.uniform(-90, 90, num_rows)))
+        location = Point(10, 50)
+
+        t1 = time.perf_counter()
+        distances = [great_circle_distance(location, geometry.representative_point()) for geometry in gdf.geometry]
+        expected = np.argsort(distances, kind='stable')[:10]
+        t2 = time.perf_counter()
+        actual = data_frame_find_closest(gdf, location, max_results=10, max_dist=5.)
+        t3 = time.perf_counter()
+        print('loop over rows took {:.2f}s, data_frame_find_closest took {:.2f}s'.format(t2 - t1, t3 - t2))
+        self.assertEqual(list(expected), list(actual['A']))
+
     def test_data_frame_aggregate(self):
         # Generate mock data
         data = {'name': ['A', 'B', 'C'],
@@ -271,6 +348,28 @@ class TestDataFrameOps(TestCase):
         rdf = data_frame_aggregate(df=gdf, var_names=var_names_valid, aggregate_geometry=True)
         self.assertIsNotNone(rdf.geometry)
 
+    def test_data_frame_aggregate_values(self):
+        df = pd.DataFrame({'f': [1.5, np.nan, 3.0, 4.5, -2.0],
+                           'i': [3, 1, 4, 1, 5],
+                           'b': [True, False, True, True, False]})
+        expected = df.agg(['count', 'mean', 'median', 'sum', 'std', 'min', 'max'])
+        rdf = data_frame_aggregate(df=df)
+        for column in ['f', 'i', 'b']:
+            for aggregation in expected.index:
+                self.assertAlmostEqual(expected[column][aggregation], rdf[column + '_' + aggregation].iloc[0],
+                                       msg=column + '_' + aggregation)
+        self.assertEqual(5, rdf['i_max'].iloc[0])
+        self.assertEqual(True, rdf['b_max'].iloc[0])
+
+    def test_data_frame_aggregate_geometry(self):
+        boxes = [shapely.geometry.box(x, y, x + 2, y + 2) for x in range(0, 20, 1) for y in range(0, 20, 1)]
+        gdf = gpd.GeoDataFrame({'A': np.arange(len(boxes) + 1)}, geometry=boxes + [None])
+        rdf = data_frame_aggregate(df=gdf, var_names='A', aggregate_geometry=True)
+        self.assertAlmostEqual(21 * 21, rdf.geometry.iloc[0].area)
+
+        rdf = data_frame_aggregate(df=gdf.iloc[:0], var_names='A', aggregate_geometry=True)
+        self.assertTrue(rdf.geometry.iloc[0].is_empty)
+
 
 class GreatCircleDistanceTest(TestCase):
     def test_great_circle_distance(self):
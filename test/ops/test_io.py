@@ -230,3 +230,118 @@ class TestIO(TestCase):
                                           '0,1,51.0,10.2,-1,0.8\n'
                                           '1,2,51.1,11.4,0,0.5\n'
                                           '2,3,51.2,11.8,-1,0.3\n')
+
+    def test_write_csv_with_dataset_formatting(self):
+        import io
+        import numpy as np
+        import pandas as pd
+        import xarray as xr
+
+        ds = xr.Dataset(data_vars=dict(a=(('time', 'lat'), np.array([[1.5, np.nan], [2., 3.]]))),
+                        coords=dict(time=pd.date_range('2000-01-01', periods=2).astype('datetime64[us]'),
+                                    lat=[10., 20.]))
+
+        # Date-times are written in full ISO format, NaN as "nan" unless na_rep is given
+        file = io.StringIO()
+        write_csv(ds, file=file)
+        self.assertEqual(file.getvalue(), 'index,time,lat,a\n'
+                                          '0,2000-01-01T00:00:00.000000,10.0,1.5\n'
+                                          '1,2000-01-01T00:00:00.000000,20.0,nan\n'
+                                          '2,2000-01-02T00:00:00.000000,10.0,2.0\n'
+                                          '3,2000-01-02T00:00:00.000000,20.0,3.0\n')
+
+        file = io.StringIO()
+        write_csv(ds, file=file, na_rep='NA')
+        self.assertEqual(file.getvalue().splitlines()[2], '1,2000-01-01T00:00:00.000000,20.0,NA')
+
+    def test_write_csv_with_chunked_dataset(self):
+        import io
+        import numpy as np
+        import xarray as xr
+        from cate.ops.io import _iter_csv_chunks
+
+        values = np.arange(7 * 3 * 4, dtype=np.float64).reshape((7, 3, 4))
+        values[2, 1, 3] = np.nan
+        ds = xr.Dataset(data_vars=dict(a=(('time', 'lat', 'lon'), values),
+                                       b=(('time', 'lat', 'lon'), values.astype(np.float32) / 2)),
+                        coords=dict(time=np.arange(7), lat=[50.5, 51.5, 52.5], lon=[1.5, 2.5, 3.5, 4.5]))
+
+        file = io.StringIO()
+        write_csv(ds, file=file, na_rep='NaN')
+        expected = file.getvalue()
+        lines = expected.splitlines()
+        self.assertEqual(len(lines), 1 + 7 * 3 * 4)
+        self.assertEqual(lines[0], 'index,time,lat,lon,a,b')
+        self.assertEqual(lines[1 + 2 * 12 + 1 * 4 + 3], '31,2,51.5,4.5,NaN,NaN')
+        self.assertEqual(lines[-1], '83,6,52.5,4.5,83.0,41.5')
+
+        file = io.StringIO()
+        write_csv(ds.chunk(dict(time=3, lat=2)), file=file, na_rep='NaN')
+        self.assertEqual(file.getvalue(), expected)
+
+        chunked_ds = ds.chunk(dict(time=3))
+        chunks = list(_iter_csv_chunks([chunked_ds.time, chunked_ds.lat, chunked_ds.lon],
+                                       [chunked_ds.a, chunked_ds.b], 7 * 3 * 4, chunk_size=25))
+        # Two time steps per chunk, split at the dask block boundaries of 3 + 3 + 1 time steps
+        self.assertEqual([len(chunk) for chunk in chunks], [24, 12, 24, 12, 12])
+        file = io.StringIO()
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(file, header=i == 0, index=False, na_rep='NaN', lineterminator='\n')
+        self.assertEqual(file.getvalue(), expected)
+
+    def test_write_csv_compressed(self):
+        import gzip
+        import io
+        import tempfile
+        import pandas as pd
+        import xarray as xr
+
+        ds = xr.Dataset(data_vars=dict(a=('time', [1.5, 2.5])), coords=dict(time=[1, 2]))
+        df = pd.DataFrame(data=dict(a=[1.5, 2.5]))
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            file = os.path.join(dir_path, 'ds.csv.gz')
+            write_csv(ds, file=file, compress=True)
+            with gzip.open(file, 'rt') as fp:
+                self.assertEqual(fp.read(), 'index,time,a\n0,1,1.5\n1,2,2.5\n')
+
+            file = os.path.join(dir_path, 'df.csv.gz')
+            write_csv(df, file=file, compress=True)
+            with gzip.open(file, 'rt') as fp:
+                self.assertEqual(fp.read(), 'index,a\n0,1.5\n1,2.5\n')
+
+        with self.assertRaises(ValidationError) as cm:
+            write_csv(ds, file=io.StringIO(), compress=True)
+        self.assertEqual(str(cm.exception), 'Compressed CSV output requires a file path.')
+
+    @unittest.skipUnless(os.environ.get('CATE_ENABLE_BENCHMARKS', None) == '1', 'CATE_ENABLE_BENCHMARKS != 1')
+    def test_write_csv_benchmark(self):
+        import io
+        import itertools
+        import time
+        import numpy as np
+        import xarray as xr
+
+        ds = xr.Dataset(data_vars=dict(a=(('time', 'lat', 'lon'), np.random.random((10, 90, 180))),
+                                       b=(('time', 'lat', 'lon'), np.random.random((10, 90, 180)))),
+                        coords=dict(time=np.arange(10), lat=np.linspace(-89, 89, 90), lon=np.linspace(-179, 179, 180)))
+
+        # The row-by-row writer used before write_csv() became chunk-wise
+        def write_csv_row_by_row(stream):
+            coord_vars = [ds.time, ds.lat, ds.lon]
+            data_vars = [ds.a, ds.b]
+            stream.write(','.join(['index'] + [var.name for var in coord_vars + data_vars]) + '\n')
+            for row, index in enumerate(itertools.product(*[range(len(var)) for var in coord_vars])):
+                stream.write(str(row))
+                for i, coord_var in enumerate(coord_vars):
+                    stream.write(',' + str(coord_var.values[index[i]]))
+                for data_var in data_vars:
+                    stream.write(',' + str(data_var.values[index]))
+                stream.write('\n')
+
+        t0 = time.perf_counter()
+        write_csv_row_by_row(io.StringIO())
+        t1 = time.perf_counter()
+        write_csv(ds, file=io.StringIO())
+        t2 = time.perf_counter()
+        print('write_csv_row_by_row() took {:.2f}s, write_csv() took {:.2f}s'.format(t1 - t0, t2 - t1))
@@ -6,6 +6,8 @@ import calendar
 from datetime import datetime
 from unittest import TestCase
 
+import dask
+import dask.array as da
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -771,6 +773,31 @@ class Fix360Test(TestCase):
         self.assertEqual(1., new_ds.attrs['geospatial_lon_resolution'])
         self.assertEqual(1., new_ds.attrs['geospatial_lat_resolution'])
 
+    def test_fix_360_lon_lazy(self):
+        # About 24 GB of data, much more than the memory available to the tests
+        lon_size = 3600
+        lat_size = 1800
+        time_size = 500
+        first = da.random.random((time_size, lat_size, lon_size), chunks=(1, 900, 1800))
+        ds = xr.Dataset({'first': (['time', 'lat', 'lon'], first, {'units': 'K'}, {'_FillValue': -1.})},
+                        coords={'lon': np.linspace(0.05, 359.95, lon_size),
+                                'lat': np.linspace(-89.95, 89.95, lat_size),
+                                'time': pd.date_range('2000-01-01', periods=time_size)})
+
+        def no_compute(*args, **kwargs):
+            raise AssertionError('data must not be computed')
+
+        with dask.config.set(scheduler=no_compute):
+            new_ds = normalize(ds)
+
+        self.assertIsInstance(new_ds.first.data, da.Array)
+        self.assertEqual(ds.first.data.chunksize, new_ds.first.data.chunksize)
+        self.assertEqual({'units': 'K'}, new_ds.first.attrs)
+        self.assertEqual({'_FillValue': -1.}, new_ds.first.encoding)
+        assert_array_almost_equal(new_ds.lon[[0, -1]], [-179.95, 179.95])
+        assert_array_almost_equal(new_ds.first[0, 0, :1800], ds.first[0, 0, 1800:])
+        assert_array_almost_equal(new_ds.first[0, 0, 1800:], ds.first[0, 0, :1800])
+
 
 class NormalizeDimOrder(TestCase):
     """
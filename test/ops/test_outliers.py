@@ -82,3 +82,45 @@ class TestOutliers(TestCase):
                          ret_first.attrs['ancillary_variables']))
         self.assertTrue(('second ' in
                          ret_first.attrs['ancillary_variables']))
+
+    def test_outliers_multiple_vars(self):
+        ds = xr.Dataset({
+            'first': xr.DataArray(np.arange(16, dtype=float).reshape(4, 4), dims=('x', 'y')),
+            'second': xr.DataArray(np.arange(16, dtype=float).reshape(4, 4) * 10 + 100, dims=('x', 'y'))})
+        ds['first'][1, 1] = np.nan
+
+        for dataset in [ds, ds.chunk({'x': 2})]:
+            ret_ds = outliers.detect_outliers(dataset, '*')
+            # Thresholds are computed for each variable separately
+            self.assertEqual(int(ds['first'].count()) - 2, int(ret_ds['first'].count()))
+            self.assertEqual(14, int(ret_ds['second'].count()))
+            self.assertTrue(np.isnan(ret_ds['second'].values[0, 0]))
+            self.assertTrue(np.isnan(ret_ds['second'].values[3, 3]))
+
+        ret_ds = outliers.detect_outliers(ds.chunk({'x': 2}), '*', mask=True)
+        self.assertIsNotNone(ret_ds['second_outlier_mask'].chunks)
+
+    def test_outliers_approximate(self):
+        values = np.random.RandomState(0).normal(size=(40, 50, 60))
+        values[0, 0, :5] = np.nan
+        ds = xr.Dataset({
+            'first': xr.DataArray(values, dims=('t', 'x', 'y')),
+            'second': xr.DataArray(np.ones((40, 50, 60)), dims=('t', 'x', 'y'))}).chunk({'t': 10})
+
+        expected = outliers._exact_quantiles([ds['first']], (0.05, 0.95))[0]
+        actual = outliers._approximate_quantiles([ds['first'], ds['second']], (0.05, 0.95))
+        value_range = np.nanmax(values) - np.nanmin(values)
+        np.testing.assert_allclose(actual[0], expected, atol=value_range / outliers._HISTOGRAM_BINS)
+        np.testing.assert_allclose(actual[1], (1., 1.), atol=1. / outliers._HISTOGRAM_BINS)
+
+        ret_ds = outliers.detect_outliers(ds, 'first', approximate=True)
+        self.assertIsNotNone(ret_ds['first'].chunks)
+        self.assertAlmostEqual(0.9, float(ret_ds['first'].count()) / np.isfinite(values).sum(), places=3)
+
+    def test_outliers_approximate_sparse(self):
+        # Neighbouring sorted values fall into bins far apart
+        ds = xr.Dataset({'first': xr.DataArray([1., 2., 3., 4., 100.], dims='x')})
+        expected = outliers._exact_quantiles([ds['first']], (0.05, 0.5, 0.95))[0]
+        actual = outliers._approximate_quantiles([ds['first']], (0.05, 0.5, 0.95))[0]
+        np.testing.assert_allclose(actual, expected, atol=99. / outliers._HISTOGRAM_BINS)
+        self.assertAlmostEqual(80.8, actual[2], places=2)
@@ -80,6 +80,35 @@ class TestPlotMap(TestCase):
             plot_map(dataset, indexers="time='2000-01-01'", file=tmp_file)
             self.assertTrue(os.path.isfile(tmp_file))
 
+    def test_plot_map_large_grid(self):
+        # A global 0.025 degree grid must be decimated to the figure resolution before it is plotted,
+        # so the full-resolution slice (400 MB) is never materialised
+        import tracemalloc
+        import dask.array as da
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import QuadMesh
+
+        num_lat, num_lon = 7200, 14400
+        dataset = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], da.random.random((1, num_lat, num_lon), chunks=(1, 900, 1800))),
+            'lat': np.linspace(-90 + 0.0125, 90 - 0.0125, num_lat),
+            'lon': np.linspace(-180 + 0.0125, 180 - 0.0125, num_lon),
+            'time': pd.date_range('2000-01-01', periods=1)})
+
+        tracemalloc.start()
+        try:
+            figure = plot_map(dataset)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        try:
+            self.assertLess(peak, 128 * 1024 * 1024)
+            quad_meshes = [c for c in figure.axes[0].collections if isinstance(c, QuadMesh)]
+            self.assertEqual(len(quad_meshes), 1)
+            self.assertLessEqual(quad_meshes[0].get_array().size, 800 * 400)
+        finally:
+            plt.close(figure)
+
     def test_plot_map_exceptions(self):
         # Test if the corner cases are detected without creating a plot for it.
 
@@ -349,6 +378,28 @@ class TestPlotHovmoeller(TestCase):
             plot_hovmoeller(dataset, var='first', x_axis='time', y_axis='depth', file=tmp_file)
             self.assertTrue(os.path.isfile(tmp_file))
 
+    def test_decimation(self):
+        """
+        Test that the plotted data doesn't exceed the figure resolution
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import QuadMesh
+
+        dataset = xr.Dataset({
+            'first': (['time', 'lat', 'lon'], np.random.rand(5000, 1800, 2)),
+            'lat': np.linspace(-89.95, 89.95, 1800),
+            'lon': [-90., 90.],
+            'time': pd.date_range('2000-01-01', periods=5000)})
+
+        figure = plot_hovmoeller(dataset, x_axis='time', y_axis='lat', contour=False)
+        try:
+            width, height = figure.get_size_inches() * figure.dpi
+            quad_mesh = [c for c in figure.axes[0].collections if isinstance(c, QuadMesh)][0]
+            self.assertLessEqual(quad_mesh.get_array().size, width * height)
+            self.assertLess(quad_mesh.get_array().size, 5000 * 1800)
+        finally:
+            plt.close(figure)
+
     def test_exceptions(self):
         """
         Test error conditions
@@ -9,6 +9,7 @@ import numpy as np
 import pandas as pd
 
 from cate.ops.plot_helpers import check_bounding_box, in_notebook, get_var_data, get_vars_data, determine_cmap_params
+from cate.ops.plot_helpers import decimate_var_data
 from cate.core.types import ValidationError
 
 
@@ -183,6 +184,42 @@ class TestGetVarData(TestCase):
                          "any variables: ['dummy']", str(cm.exception))
 
 
+class TestDecimateVarData(TestCase):
+    """
+    Test decimate_var_data()
+    """
+
+    def test_nominal(self):
+        values = np.arange(35.).reshape((5, 7))
+        values[0, 0] = np.nan
+        var = xr.DataArray(values, dims=['lat', 'lon'],
+                           coords=dict(lat=np.arange(5.), lon=np.arange(7.)),
+                           attrs=dict(units='K'))
+
+        decimated = decimate_var_data(var, dict(lat=3, lon=3))
+        # Blocks of 2 x 3 cells, padded at the upper boundaries; NaN values are ignored
+        np.testing.assert_equal(decimated.values, [[5.4, 7.5, 9.5],
+                                                   [18.5, 21.5, 23.5],
+                                                   [29., 32., 34.]])
+        np.testing.assert_equal(decimated.lat.values, [0.5, 2.5, 4.])
+        np.testing.assert_equal(decimated.lon.values, [1., 4., 6.])
+        self.assertEqual(decimated.attrs, dict(units='K'))
+
+        # Integer data are subsampled
+        decimated = decimate_var_data(var.fillna(0).astype(np.int32), dict(lat=3, lon=3))
+        np.testing.assert_equal(decimated.values, [[0, 3, 6], [14, 17, 20], [28, 31, 34]])
+
+        # Small enough
+        self.assertIs(decimate_var_data(var, dict(lat=5, lon=100)), var)
+
+    def test_dask(self):
+        var = xr.DataArray(np.random.rand(100, 60), dims=['time', 'lat']).chunk(dict(time=10))
+        decimated = decimate_var_data(var, dict(time=10, lat=100))
+        self.assertIsNotNone(decimated.chunks)
+        self.assertEqual(decimated.shape, (10, 60))
+        np.testing.assert_allclose(decimated.values, var.values.reshape((10, 10, 60)).mean(axis=1))
+
+
 class TestDetermineCmapParams(TestCase):
     """
     Test determine_cmap_params()
@@ -0,0 +1,94 @@
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+from numpy.testing import assert_almost_equal
+
+import cate.ops.resampling as rs
+
+SRC = np.array([[0.9, 0.5, 3.0, 4.0],
+                [1.1, 1.5, 1.0, 2.0],
+                [4.0, 2.1, 3.0, 5.0],
+                [3.0, 4.9, 3.0, 1.0]])
+
+
+class ResamplerTest(unittest.TestCase):
+    def test_same_as_resample_2d(self):
+        src = np.random.RandomState(42).random_sample((3, 2, 12, 18))
+        src[0, 0, 2, 3] = np.nan
+        src[2, 1, :4, :5] = np.nan
+        for dst_shape in [(12, 18), (4, 6), (5, 7), (12, 9), (20, 18), (24, 36), (8, 30), (30, 8)]:
+            for ds_method in [rs.DS_FIRST, rs.DS_MEAN, rs.DS_VAR, rs.DS_STD]:
+                for us_method in [rs.US_NEAREST, rs.US_LINEAR]:
+                    resampler = rs.Resampler(src.shape[-2:], dst_shape, ds_method, us_method)
+                    actual = resampler.resample(src, fill_value=np.nan)
+                    self.assertEqual(src.shape[:-2] + dst_shape, actual.shape)
+                    for index in np.ndindex(*src.shape[:-2]):
+                        desired = rs.resample_2d(src[index], dst_shape[1], dst_shape[0],
+                                                 ds_method, us_method, fill_value=np.nan)
+                        assert_almost_equal(actual[index], desired)
+
+    def test_last(self):
+        src = np.array([SRC, SRC[::-1]])
+        actual = rs.Resampler((4, 4), (2, 2), ds_method=rs.DS_LAST).resample(src)
+        assert_almost_equal(actual, [[[1.5, 2.], [4.9, 1.]],
+                                     [[2.1, 5.], [0.5, 4.]]])
+
+    def test_mode(self):
+        src = np.array([SRC.round(), SRC.round() + 1])
+        actual = rs.Resampler((4, 4), (2, 2), ds_method=rs.DS_MODE).resample(src)
+        assert_almost_equal(actual, [[[1., 3.], [4., 3.]],
+                                     [[2., 4.], [5., 4.]]])
+
+    def test_masked(self):
+        src = np.ma.masked_array(np.array([SRC, SRC]), mask=np.zeros((2, 4, 4), dtype=np.bool_))
+        src[1, 0, 0] = np.ma.masked
+        src[1, 0, 1] = np.ma.masked
+        src[1, 1, 0] = np.ma.masked
+        src[1, 1, 1] = np.ma.masked
+        actual = rs.Resampler((4, 4), (2, 2), rs.DS_MEAN).resample(src)
+        self.assertIsInstance(actual, np.ma.MaskedArray)
+        assert_almost_equal(actual[0], [[1.0, 2.5], [3.5, 3.0]])
+        self.assertTrue(actual.mask[1, 0, 0])
+        assert_almost_equal(actual[1, 1], [3.5, 3.0])
+
+    def test_no_op(self):
+        resampler = rs.Resampler((4, 4), (4, 4))
+        self.assertIs(SRC, resampler.resample(SRC))
+
+    def test_get_resampler(self):
+        resampler = rs.get_resampler((4, 4), (2, 2), rs.DS_MEAN, rs.US_LINEAR)
+        self.assertIs(resampler, rs.get_resampler((4, 4), (2, 2), rs.DS_MEAN, rs.US_LINEAR))
+        self.assertIsNot(resampler, rs.get_resampler((4, 4), (2, 2), rs.DS_FIRST, rs.US_LINEAR))
+        self.assertEqual((4, 4), resampler.src_shape)
+        self.assertEqual((2, 2), resampler.dst_shape)
+
+    def test_concurrent_cold_calls(self):
+        # Cold calls from several threads, as made by dask's threaded scheduler, used to hang.
+        # Numba's compilation state is per process, hence a new process is needed.
+        script = '\n'.join([
+            'from concurrent.futures import ThreadPoolExecutor',
+            'import numpy as np',
+            'import cate.ops.resampling as rs',
+            'def resample(i):',
+            '    resampler = rs.get_resampler((40, 60), (10, 15) if i % 2 else (80, 120))',
+            '    return resampler.resample(np.ones((3, 40, 60))).shape',
+            'with ThreadPoolExecutor(4) as executor:',
+            '    shapes = list(executor.map(resample, range(8)))',
+            'assert shapes == [(3, 80, 120), (3, 10, 15)] * 4, shapes',
+            'assert rs.get_resampler((40, 60), (10, 15)).resample(np.ones((3, 40, 60))).shape == (3, 10, 15)',
+        ])
+        result = subprocess.run([sys.executable, '-c', script], timeout=300,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(0, result.returncode, result.stderr.decode())
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            rs.Resampler((4, 4), (2, 2), ds_method=rs.US_LINEAR)
+        with self.assertRaises(ValueError):
+            rs.Resampler((4, 4), (2, 2), us_method=rs.DS_MEAN)
+        with self.assertRaises(ValueError):
+            rs.Resampler((4, 4), (2, 2)).resample(np.zeros((3, 4)))
+        with self.assertRaises(ValueError):
+            rs.Resampler((4, 4), (2, 2), ds_method=rs.DS_MODE).resample(SRC, mode_rank=0)
@@ -4,12 +4,15 @@ Tests for subsetting operations
 from datetime import datetime
 from unittest import TestCase
 
+import geopandas as gpd
 import numpy as np
 import xarray as xr
 import pandas as pd
+import shapely.geometry
+import shapely.wkt
 
 from cate.core.op import OP_REGISTRY
-from cate.core.opimpl import subset_spatial_impl
+from cate.core.opimpl import get_polygon_mask_impl, subset_spatial_impl
 from cate.core.types import ValidationError
 from cate.ops import subset
 from cate.util.misc import object_to_qualified_name
@@ -253,9 +256,15 @@ class TestSubsetSpatial(TestCase):
             'lat': np.linspace(-89.5, 89.5, 180),
             'lon': np.linspace(-179.5, 179.5, 360)})
 
-        with self.assertRaises(Exception) as cm:
-            subset.subset_spatial(dataset, antimeridian_pol)
-        self.assertIn('anti-meridian', str(cm.exception))
+        actual = subset.subset_spatial(dataset, antimeridian_pol)
+        self.assertEqual(360, len(actual.lon))
+        # Inside the polygon, on both sides of the anti-meridian
+        self.assertTrue((actual['first'].sel(method='nearest', lon=175.5, lat=25.5) == 1).all())
+        self.assertTrue((actual['first'].sel(method='nearest', lon=-160.5, lat=30.5) == 1).all())
+        # Outside of the polygon
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=150.5, lat=25.5)).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=-150.5, lat=25.5)).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=0.5, lat=25.5)).all())
 
     def test_antimeridian_arbitrary_inverted(self):
         antimeridian_pol = str('POLYGON(('
@@ -273,9 +282,63 @@ class TestSubsetSpatial(TestCase):
             'lat': np.linspace(89.5, -89.5, 180),
             'lon': np.linspace(-179.5, 179.5, 360)})
 
-        with self.assertRaises(Exception) as cm:
-            subset.subset_spatial(dataset, antimeridian_pol)
-        self.assertIn('anti-meridian', str(cm.exception))
+        actual = subset.subset_spatial(dataset, antimeridian_pol)
+        self.assertEqual(360, len(actual.lon))
+        # Inside the polygon, on both sides of the anti-meridian
+        self.assertTrue((actual['first'].sel(method='nearest', lon=175.5, lat=25.5) == 1).all())
+        self.assertTrue((actual['first'].sel(method='nearest', lon=-160.5, lat=30.5) == 1).all())
+        # Outside of the polygon
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=150.5, lat=25.5)).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=-150.5, lat=25.5)).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=0.5, lat=25.5)).all())
+
+    def test_generic_masked_holes(self):
+        """
+        Test masking with polygons with holes and multi-polygons
+        """
+        dataset = xr.Dataset({
+            'first': (['lat', 'lon', 'time'], np.ones([180, 360, 6])),
+            'lat': np.linspace(-89.5, 89.5, 180),
+            'lon': np.linspace(-179.5, 179.5, 360)})
+
+        with_hole = 'POLYGON((-40 -40, 40 -40, 40 40, -40 40, -40 -40), (-20 -20, 20 -20, 20 20, -20 20, -20 -20))'
+        actual = subset.subset_spatial(dataset, with_hole)
+        self.assertTrue((actual['first'].sel(method='nearest', lon=30.5, lat=0.5) == 1).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=0.5, lat=0.5)).all())
+
+        multi_polygon = 'MULTIPOLYGON(((-40 -40, -10 -40, -40 -10, -40 -40)), ((10 10, 40 10, 40 40, 10 10)))'
+        actual = subset_spatial_impl(dataset, multi_polygon)
+        self.assertEqual((82, 82, 6), actual['first'].shape)
+        self.assertTrue((actual['first'].sel(method='nearest', lon=-35.5, lat=-35.5) == 1).all())
+        self.assertTrue((actual['first'].sel(method='nearest', lon=35.5, lat=15.5) == 1).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=0.5, lat=0.5)).all())
+        self.assertTrue(np.isnan(actual['first'].sel(method='nearest', lon=15.5, lat=35.5)).all())
+
+    def test_generic_masked_grid_aligned(self):
+        """
+        Test masking with a polygon whose edges and vertices fall onto grid points
+        """
+        triangle = shapely.wkt.loads('POLYGON((10 10, 20 30, 30 10, 10 10))')
+
+        # Grid points on the boundary, including all vertices, are part of the mask
+        mask = get_polygon_mask_impl(triangle, (0., 1., 41), (0., 1., 41))
+        lon, lat = np.meshgrid(np.arange(41.), np.arange(41.))
+        expected = shapely.covers(triangle, shapely.points(lon, lat))
+        np.testing.assert_array_equal(mask, expected)
+        self.assertTrue(mask[30, 20])
+        self.assertTrue(mask[10, 30])
+        self.assertTrue(mask[20, 15])
+
+        # Pixels that only touch the polygon's apex are selected
+        dataset = xr.Dataset({
+            'first': (['lat', 'lon'], np.ones([180, 360])),
+            'lat': np.linspace(-89.5, 89.5, 180),
+            'lon': np.linspace(-179.5, 179.5, 360)})
+        actual = subset.subset_spatial(dataset, triangle.wkt)
+        self.assertEqual(1, actual['first'].sel(lon=19.5, lat=30.5))
+        self.assertEqual(1, actual['first'].sel(lon=20.5, lat=30.5))
+        self.assertEqual(1, actual['first'].sel(lon=30.5, lat=9.5))
+        self.assertTrue(np.isnan(actual['first'].sel(lon=21.5, lat=30.5)))
 
     def test_select_single_center(self):
         """
@@ -617,3 +680,49 @@ class TestExtractPoint(TestCase):
 
         result = subset.extract_point(self._ds, (12.2, 23.2), indexers={'d1': 1.1, 'd2': '2000-03-01'})
         self.assertEqual({'lat': 23.0, 'lon': 12.0, 'v2': 106.0, 'v4': 53.0}, result)
+
+
+class TestExtractPoints(TestCase):
+    def setUp(self):
+        self._ds = xr.Dataset(
+            {
+                'v1': (['time', 'lat', 'lon'], np.arange(24, dtype=np.float64).reshape((2, 3, 4))),
+                'v2': (['lat', 'lon'], np.arange(12, dtype=np.float64).reshape((3, 4))),
+                'v3': (['time'], np.array([1., 2.]))
+            },
+            coords={
+                'lon': np.array([10., 11., 12., 13.]),
+                'lat': np.array([24., 23., 22.]),
+                'time': [datetime(2000, 3, 1), datetime(2000, 4, 1)]
+            }
+        )
+
+    def test_points(self):
+        result = subset.extract_points(self._ds, [(12.2, 23.4), (10.4, 21.6), (0., 0.)])
+        self.assertEqual(['v1', 'v2'], list(result.data_vars))
+        self.assertEqual(('time', 'point'), result.v1.dims)
+        np.testing.assert_array_equal([12., 10., np.nan], result.lon.values)
+        np.testing.assert_array_equal([23., 22., np.nan], result.lat.values)
+        np.testing.assert_array_equal([[6., 8., np.nan], [18., 20., np.nan]], result.v1.values)
+        np.testing.assert_array_equal([6., 8., np.nan], result.v2.values)
+
+    def test_geo_data_frame(self):
+        stations = gpd.GeoDataFrame({'geometry': [shapely.geometry.Point(13.1, 24.), shapely.geometry.Point(11, 22)]},
+                                    index=['A', 'B'])
+        result = subset.extract_points(self._ds.chunk(), stations, var='v1')
+        self.assertEqual(['A', 'B'], list(result.point.values))
+        np.testing.assert_array_equal([[3., 9.], [15., 21.]], result.v1.values)
+
+    def test_nearest_indices(self):
+        index = self._ds.indexes['lat']
+        indices, valid = subset._get_nearest_indices(index, np.array([25.6, 24.4, 23.5, 22.1, 20.]), 1.)
+        np.testing.assert_array_equal([0, 0, 0, 2, 2], indices)
+        np.testing.assert_array_equal([False, True, True, True, False], valid)
+        self.assertIs(subset._get_sorted_coords(index), subset._get_sorted_coords(index))
+
+    def test_registered(self):
+        reg_op = OP_REGISTRY.get_op(object_to_qualified_name(subset.extract_points))
+        result = reg_op(ds=self._ds, points=['12, 23'], var='v2')
+        np.testing.assert_array_equal([6.], result.v2.values)
+        result = reg_op(ds=self._ds, points='MULTIPOINT((12 23), (13 22))', var='v2')
+        np.testing.assert_array_equal([6., 11.], result.v2.values)
@@ -95,6 +95,38 @@ class TimeSeriesMean(TestCase):
         actual = tseries_mean(dataset, var='')
         assertDatasetEqual(actual, expected)
 
+    def test_tseries_mean_weighted(self):
+        data = np.random.RandomState(0).rand(6, 4, 8)
+        data[0, 1, 2] = np.nan
+        dataset = xr.Dataset({
+            'abs': (['time', 'lat', 'lon'], data),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8),
+            'time': np.arange(6)})
+        weights = np.cos(np.deg2rad(dataset.lat))
+        expected_mean = dataset.abs.weighted(weights).mean(dim=['lat', 'lon'])
+        expected_std = dataset.abs.weighted(weights).std(dim=['lat', 'lon'])
+
+        for ds in [dataset, dataset.chunk({'time': 4, 'lat': 3, 'lon': 5})]:
+            actual = tseries_mean(ds, var='abs')
+            np.testing.assert_allclose(actual.abs.values, expected_mean.values)
+            np.testing.assert_allclose(actual.abs_std.values, expected_std.values)
+
+            actual = tseries_mean(ds, var='abs', weighted=False, calculate_std=False)
+            np.testing.assert_allclose(actual.abs.values, dataset.abs.mean(dim=['lat', 'lon']).values)
+            self.assertNotIn('abs_std', actual)
+
+    def test_tseries_mean_region(self):
+        dataset = xr.Dataset({
+            'abs': (['lat', 'lon', 'time'], np.ones([4, 8, 6])),
+            'lat': np.linspace(-67.5, 67.5, 4),
+            'lon': np.linspace(-157.5, 157.5, 8),
+            'time': np.arange(6)})
+        dataset.abs[2:, 4:] = 3.
+        actual = tseries_mean(dataset, var='abs', region='POLYGON((0 0, 180 0, 180 90, 0 90, 0 0))')
+        np.testing.assert_allclose(actual.abs.values, np.full(6, 3.))
+        np.testing.assert_allclose(actual.abs_std.values, np.zeros(6))
+
     def registered(self):
         """
         Test tseries_point as a registered operation
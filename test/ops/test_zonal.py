@@ -0,0 +1,102 @@
+"""
+Tests for zonal statistics operations
+"""
+
+from unittest import TestCase
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely.geometry
+import xarray as xr
+
+from cate.core.op import OP_REGISTRY
+from cate.core.types import ValidationError
+from cate.ops.zonal import zonal_statistics
+from cate.util.misc import object_to_qualified_name
+
+
+def _make_dataset():
+    data = np.arange(3 * 18 * 36, dtype=np.float64).reshape((3, 18, 36))
+    data[0, 9, 18] = np.nan
+    return xr.Dataset({
+        'first': (['time', 'lat', 'lon'], data),
+        'second': (['time', 'lat', 'lon'], data * 2),
+        'lat': np.linspace(-85, 85, 18),
+        'lon': np.linspace(-175, 175, 36),
+        'time': pd.date_range('2000-01-01', periods=3)})
+
+
+def _make_gdf():
+    return gpd.GeoDataFrame({'name': ['a', 'b', 'c'],
+                             'geometry': [shapely.geometry.box(-20, -20, 20, 20),
+                                          shapely.geometry.box(0, 0, 60, 40),
+                                          shapely.geometry.MultiPolygon([shapely.geometry.box(-180, -90, -150, -60),
+                                                                         shapely.geometry.box(150, 60, 180, 90)])]})
+
+
+class ZonalStatisticsTest(TestCase):
+    def assertStats(self, ds, retset, region, box_list, stats):
+        values = np.concatenate([ds.first.sel(lon=slice(x1, x2), lat=slice(y1, y2)).values.reshape((3, -1))
+                                 for x1, y1, x2, y2 in box_list], axis=1)
+        expected = dict(mean=np.nanmean(values, axis=1),
+                        std=np.nanstd(values, axis=1),
+                        min=np.nanmin(values, axis=1),
+                        max=np.nanmax(values, axis=1),
+                        sum=np.nansum(values, axis=1),
+                        count=np.sum(np.isfinite(values), axis=1))
+        for stat in stats:
+            np.testing.assert_allclose(retset['first_' + stat].sel(region=region).values, expected[stat])
+
+    def test_nominal(self):
+        ds = _make_dataset()
+        stats = ['mean', 'std', 'min', 'max', 'sum', 'count']
+        retset = zonal_statistics(ds, _make_gdf(), var='first', stats=','.join(stats), region_col='name')
+
+        self.assertEqual(['first_' + stat for stat in stats], list(retset.data_vars))
+        self.assertEqual(('region', 'time'), retset.first_mean.dims)
+        self.assertEqual(['a', 'b', 'c'], list(retset.region.values))
+        self.assertStats(ds, retset, 'a', [(-20, -20, 20, 20)], stats)
+        self.assertStats(ds, retset, 'b', [(0, 0, 60, 40)], stats)
+        self.assertStats(ds, retset, 'c', [(-180, -90, -150, -60), (150, 60, 180, 90)], stats)
+        self.assertEqual([15, 16, 16], list(retset.first_count.sel(region='a').values))
+
+    def test_all_vars_and_index(self):
+        ds = _make_dataset()
+        retset = zonal_statistics(ds, _make_gdf())
+        self.assertEqual(['first_mean', 'first_std', 'second_mean', 'second_std'], list(retset.data_vars))
+        self.assertEqual([0, 1, 2], list(retset.region.values))
+        np.testing.assert_allclose(retset.second_mean.values, 2 * retset.first_mean.values)
+
+    def test_dask(self):
+        ds = _make_dataset()
+        expected = zonal_statistics(ds, _make_gdf(), stats='mean,min,count')
+        actual = zonal_statistics(ds.chunk({'time': 1, 'lat': 6}), _make_gdf(), stats='mean,min,count')
+        for name in expected.data_vars:
+            np.testing.assert_allclose(actual[name].values, expected[name].values)
+
+    def test_weighted(self):
+        ds = xr.Dataset({'first': (['lat', 'lon'], np.ones((18, 36)))},
+                        coords={'lat': np.linspace(-85, 85, 18), 'lon': np.linspace(-175, 175, 36)})
+        ds.first[:, 18:] = 3.
+        # Covers 40 percent of the pixels on each side of the meridian
+        gdf = gpd.GeoDataFrame({'geometry': [shapely.geometry.box(-4, 0, 4, 10)]})
+        retset = zonal_statistics(ds, gdf, stats='mean,sum', weighted=True)
+        self.assertAlmostEqual(2., float(retset.first_mean[0]))
+        self.assertAlmostEqual(0.4 * 4. * np.cos(np.deg2rad(5.)), float(retset.first_sum[0]), places=5)
+
+    def test_validation(self):
+        ds = _make_dataset()
+        with self.assertRaises(ValidationError):
+            zonal_statistics(ds, _make_gdf(), stats='median')
+        with self.assertRaises(ValidationError):
+            zonal_statistics(ds, _make_gdf(), region_col='id')
+        with self.assertRaises(ValidationError):
+            zonal_statistics(ds, pd.DataFrame({'a': [1, 2]}))
+        with self.assertRaises(ValidationError):
+            zonal_statistics(ds.drop_vars('lat'), _make_gdf())
+
+    def test_registered(self):
+        reg_op = OP_REGISTRY.get_op(object_to_qualified_name(zonal_statistics))
+        retset = reg_op(ds=_make_dataset(), gdf=_make_gdf(), stats='max')
+        self.assertEqual(['first_max', 'second_max'], list(retset.data_vars))